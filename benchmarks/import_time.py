@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+"""\
+Measure how long it takes to import macromol_dataframe.
+
+Each benchmark runs in a fresh interpreter, because that's the situation that 
+matters in practice: data loader workers using the "spawn" start method have 
+to import this package from scratch.
+"""
+
+import subprocess
+import statistics
+import sys
+
+from time import perf_counter
+
+BENCHMARKS = {
+        'python': 'pass',
+        'import': 'import macromol_dataframe',
+        'coords': 'import macromol_dataframe as mmdf; mmdf.transform_coords',
+        'atoms': 'import macromol_dataframe as mmdf; mmdf.transform_atom_coords',
+        'mmcif': 'import macromol_dataframe as mmdf; mmdf.read_mmcif',
+        'all': 'from macromol_dataframe import *',
+}
+
+def time_import(code):
+    start = perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True)
+    return perf_counter() - start
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description=__doc__.split('\n\n')[0],
+    )
+    parser.add_argument(
+            '-n', '--runs', type=int, default=10,
+            help="the number of times to run each benchmark",
+    )
+    args = parser.parse_args()
+
+    print(f"{'benchmark':<10}  {'median (ms)':>11}  {'min (ms)':>8}")
+
+    for name, code in BENCHMARKS.items():
+        times_ms = [1000 * time_import(code) for _ in range(args.runs)]
+        print(f'{name:<10}  {statistics.median(times_ms):>11.1f}  {min(times_ms):>8.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+"""\
+Compare the speed of reading mmCIF and BinaryCIF files.
+
+Each structure in the test suite is converted to BinaryCIF, then read 
+repeatedly in both formats.  The conversion itself isn't timed.
+"""
+
+import macromol_dataframe as mmdf
+import statistics
+import tempfile
+
+from pathlib import Path
+from time import perf_counter
+
+PDB_DIR = Path(__file__).parents[1] / 'tests' / 'pdb'
+
+def time_read(read, path, runs):
+    times_ms = []
+
+    for _ in range(runs):
+        start = perf_counter()
+        read(path)
+        times_ms.append(1000 * (perf_counter() - start))
+
+    return statistics.median(times_ms)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description=__doc__.split('\n\n')[0],
+    )
+    parser.add_argument(
+            '-n', '--runs', type=int, default=10,
+            help="the number of times to read each file",
+    )
+    args = parser.parse_args()
+
+    print(f"{'structure':<10}  {'mmcif (ms)':>10}  {'bcif (ms)':>9}  {'speedup':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for cif_path in sorted(PDB_DIR.glob('*.cif.gz')):
+            pdb_id = cif_path.name.split('.')[0]
+            bcif_path = Path(tmp_dir) / f'{pdb_id}.bcif'
+            mmdf.convert_mmcif_to_bcif(cif_path, bcif_path)
+
+            mmcif_ms = time_read(mmdf.read_mmcif, cif_path, args.runs)
+            bcif_ms = time_read(mmdf.read_bcif, bcif_path, args.runs)
+
+            print(f'{pdb_id:<10}  {mmcif_ms:>10.1f}  {bcif_ms:>9.1f}  {mmcif_ms / bcif_ms:>6.1f}x')
+
+if __name__ == '__main__':
+    main()
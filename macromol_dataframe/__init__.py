@@ -4,9 +4,170 @@ Manipulate macromolecular coordinate data using data frames.
 
 __version__ = '0.9.0'
 
-from .mmcif import *
-from .pymol import *
-from .atoms import *
-from .residues import *
-from .coords import *
-from .error import *
+# The submodules are imported lazily (see PEP 562), because some of them 
+# depend on packages that are slow to import, e.g. `gemmi` and `scipy`.  This 
+# matters most for data loader worker processes, which each have to import 
+# this package from scratch.  The table below maps each public name to the 
+# submodule that defines it.
+
+_LAZY_IMPORTS = {
+        'mmcif': [
+            'Structure',
+            'AssemblyTemplate',
+            'Column',
+            'MmcifError',
+            'read_mmcif',
+            'read_biological_assembly',
+            'read_asymmetric_unit',
+            'scan_mmcif',
+            'write_mmcif',
+            'select_model',
+            'make_biological_assembly',
+            'get_pdb_path',
+        ],
+        'bcif': [
+            'read_bcif',
+            'write_bcif',
+            'convert_mmcif_to_bcif',
+        ],
+        'dataset': [
+            'write_atoms_dataset',
+            'scan_atoms_dataset',
+        ],
+        'pymol': [
+            'from_pymol',
+            'set_ascii_dataframe_format',
+        ],
+        'atoms': [
+            'Atoms',
+            'prune_hydrogen',
+            'prune_water',
+            'get_atom_coords',
+            'replace_atom_coords',
+            'transform_atom_coords',
+            'quantize_atom_coords',
+            'dequantize_atom_coords',
+            'QUANTIZED_COORD_SCALE',
+            'match_atoms',
+            'superimpose_atoms',
+        ],
+        'residues': [
+            'ONE_LETTER_CODES',
+            'assign_residue_ids',
+            'explode_residue_conformations',
+            'select_residue_conformations',
+            'make_residue_table',
+        ],
+        'canonical': [
+            'CANONICAL_KEY_COLS',
+            'canonicalize_atoms',
+            'is_canonical_atoms',
+            'AtomIndex',
+        ],
+        'coords': [
+            'Coord',
+            'Coord3',
+            'Coord4',
+            'Coords',
+            'Coords3',
+            'Coords4',
+            'Matrix33',
+            'Frame',
+            'Frames',
+            'make_coord_frame',
+            'make_coord_frame_from_rotation_vector',
+            'make_coord_frame_from_rotation_matrix',
+            'invert_coord_frame',
+            'get_origin',
+            'get_rotation_matrix',
+            'transform_coords',
+            'superimpose_coords',
+            'calc_rmsd',
+            'homogenize_coords',
+        ],
+        'neighborhoods': [
+            'NeighborhoodSampler',
+        ],
+        'voxels': [
+            'Channels',
+            'voxelize_atoms',
+        ],
+        'collate': [
+            'ELEMENT_VOCAB',
+            'COMP_ID_VOCAB',
+            'ATOM_ID_VOCAB',
+            'AtomBatch',
+            'collate_atoms',
+        ],
+        'sasa': [
+            'VDW_RADII_A',
+            'calc_atom_sasa',
+            'calc_residue_sasa',
+        ],
+        'bonds': [
+            'BONDS_SCHEMA',
+            'STANDARD_BONDS',
+            'find_bonds',
+            'select_bonds',
+            'make_bond_csr',
+        ],
+        'ensemble': [
+            'ENSEMBLE_KEY_COLS',
+            'Ensemble',
+            'make_ensemble',
+        ],
+        'crystal': [
+            'make_crystal_packing',
+            'find_crystal_symmetry_mates',
+        ],
+        'cache': [
+            'CacheStats',
+            'StructureCache',
+            'SharedStructureCache',
+        ],
+        'hashing': [
+            'HASH_COLS',
+            'hash_atoms',
+            'fingerprint_atoms',
+        ],
+        'index': [
+            'INDEX_SCHEMA',
+            'read_mmcif_header',
+            'index_pdb',
+            'index_mmcif_paths',
+        ],
+        'error': [
+            'TidyError',
+        ],
+}
+_MODULE_FROM_NAME = {
+        name: module
+        for module, names in _LAZY_IMPORTS.items()
+        for name in names
+}
+
+__all__ = list(_MODULE_FROM_NAME)
+
+def __getattr__(name):
+    from importlib import import_module
+
+    # Submodules used to be imported eagerly, so keep them accessible as 
+    # attributes even if they haven't been explicitly imported.
+    if name in _LAZY_IMPORTS:
+        return import_module(f'.{name}', __name__)
+
+    try:
+        module = _MODULE_FROM_NAME[name]
+    except KeyError:
+        raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}"
+        ) from None
+
+    value = getattr(import_module(f'.{module}', __name__), name)
+
+    # Cache the value, so that this function is only called once per name.
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *__all__})
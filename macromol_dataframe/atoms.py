@@ -1,10 +1,12 @@
 import polars as pl
+import numpy as np
 
 from .coords import (
         Coords3, Coords4, Frame, transform_coords, homogenize_coords,
+        superimpose_coords,
 )
 
-from typing import Union
+from typing import List, Mapping, Optional, Tuple, Union
 from typing_extensions import TypeAlias
 
 Atoms: TypeAlias = pl.DataFrame
@@ -53,21 +55,280 @@ def get_atom_coords(
         homogeneous: bool=False,
 ) -> Union[Coords3, Coords4]:
     coords = atoms.select('x', 'y', 'z').to_numpy()
+
+    # Quantized coordinates are decoded directly into single precision.  No 
+    # binary float can exactly represent most multiples of 0.001Å, but single 
+    # precision is close enough that rounding to the nearest 0.001Å recovers 
+    # the original integer, for any coordinate below about 8000Å.
+    if _is_quantized(atoms):
+        coords = coords.astype(np.float32) / np.float32(QUANTIZED_COORD_SCALE)
+
     return homogenize_coords(coords) if homogeneous else coords
 
 def replace_atom_coords(atoms: Atoms, coords: Union[Coords3, Coords4]):
-    return (
+    atoms_replaced = (
             atoms.with_columns(
                 x=coords[:,0],
                 y=coords[:,1],
                 z=coords[:,2],
             )
     )
+    if _is_quantized(atoms):
+        atoms_replaced = quantize_atom_coords(
+                atoms_replaced,
+                dtype=atoms.schema['x'],
+        )
+
+    return atoms_replaced
+
+def quantize_atom_coords(
+        atoms: Atoms,
+        *,
+        dtype: pl._typing.PolarsDataType = pl.Int32,
+) -> Atoms:
+    """
+    Store the coordinates as integer multiples of 0.001Å.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms with floating point coordinates.
+
+        dtype:
+            The integer data type to use for the ``x``, ``y``, and ``z`` 
+            columns.  32-bit integers can represent coordinates up to about 
+            ±2.1×10⁶Å (±0.2 mm), while 16-bit integers only reach ±32Å.
+
+    Returns:
+        A dataframe with the same columns as *atoms*, but with integer 
+        coordinates.  This is the same encoding used for coordinates by 
+        BinaryCIF.
+
+    The coordinates in the PDB have three decimal places, so this encoding is 
+    lossless for coordinates that were read directly from an mmCIF file.  
+    32-bit integers take half the memory of the default 64-bit floats.  
+    The same result can be obtained more efficiently by reading the file with 
+    ``coord_dtype=pl.Int32``.
+
+    Quantized coordinates are understood by every function in this library 
+    that reads or writes coordinates, including `get_atom_coords()` (which 
+    decodes them into single precision floats) and `replace_atom_coords()` 
+    (which re-encodes them, rounding to the nearest 0.001Å).  Use 
+    `dequantize_atom_coords()` before working with the coordinate columns 
+    directly.
+    """
+    if _is_quantized(atoms):
+        return atoms.cast({'x': dtype, 'y': dtype, 'z': dtype})
+
+    return atoms.with_columns(
+            (pl.col('x', 'y', 'z') * QUANTIZED_COORD_SCALE)
+            .round()
+            .cast(dtype)
+    )
+
+def dequantize_atom_coords(
+        atoms: Atoms,
+        *,
+        dtype: pl._typing.PolarsDataType = pl.Float64,
+) -> Atoms:
+    """
+    Convert coordinates stored as integer multiples of 0.001Å back into 
+    floating point numbers.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms, e.g. created by `quantize_atom_coords()`.  
+            If the coordinates aren't quantized, they will only be cast to 
+            the given data type.
+
+        dtype:
+            The data type to use for the ``x``, ``y``, and ``z`` columns.  
+            Must be either ``pl.Float32`` or ``pl.Float64``.
+
+    Returns:
+        A dataframe with the same columns as *atoms*, but with floating point 
+        coordinates.  The round trip from double precision coordinates read 
+        from an mmCIF file, through `quantize_atom_coords()`, and back is 
+        exact.
+    """
+    if not _is_quantized(atoms):
+        return atoms.cast({'x': dtype, 'y': dtype, 'z': dtype})
+
+    # Do the division with numpy, because polars multiplies by the reciprocal 
+    # instead.  That isn't exact, so it wouldn't always recover the original 
+    # coordinates.
+    np_dtype = np.float32 if dtype == pl.Float32 else np.float64
+    coords = atoms.select('x', 'y', 'z').to_numpy().astype(np_dtype)
+    coords /= np_dtype(QUANTIZED_COORD_SCALE)
+
+    return atoms.with_columns(
+            x=coords[:,0],
+            y=coords[:,1],
+            z=coords[:,2],
+    )
+
+QUANTIZED_COORD_SCALE = 1000
 
 def transform_atom_coords(
         atoms_x: Atoms,
-        frame_xy: Frame,
+        frame_xy: Union[Frame, Mapping[str, Frame]],
+        *,
+        key: str = 'structure_id',
 ) -> Atoms:
+    """
+    Apply the given coordinate transformation to every atom.
+
+    Arguments:
+        atoms_x:
+            A dataframe of atoms, with coordinates in frame X.
+
+        frame_xy:
+            Either a single matrix that transforms coordinates from frame X to 
+            frame Y, or a mapping from the values of the *key* column to such 
+            matrices.  The latter makes it possible to transform many 
+            structures, each by a different frame, in a single call.
+
+        key:
+            The name of the column used to look up the frame for each atom, if 
+            *frame_xy* is a mapping.  Every value in this column must be a key 
+            in *frame_xy*.
+
+    Returns:
+        A dataframe with the same columns as *atoms_x*, but with coordinates 
+        in frame Y.
+    """
     coords_x = get_atom_coords(atoms_x, homogeneous=True)
-    coords_y = transform_coords(coords_x, frame_xy)
+
+    if not isinstance(frame_xy, Mapping):
+        coords_y = transform_coords(coords_x, frame_xy)
+        return replace_atom_coords(atoms_x, coords_y)
+
+    keys = list(frame_xy)
+    frame_i = (
+            atoms_x
+            .get_column(key)
+            .replace_strict(keys, range(len(keys)), return_dtype=pl.UInt32)
+            .to_numpy()
+    )
+
+    # Sort the atoms by frame, so that each frame can be applied to a 
+    # contiguous block of coordinates with a single matrix multiplication.
+    order = np.argsort(frame_i, kind='stable')
+    bounds = np.flatnonzero(np.diff(frame_i[order])) + 1
+    coords_y = np.empty_like(coords_x)
+
+    for indices in np.split(order, bounds):
+        if len(indices) == 0:
+            continue
+        frame = frame_xy[keys[frame_i[indices[0]]]]
+        coords_y[indices] = transform_coords(coords_x[indices], frame)
+
     return replace_atom_coords(atoms_x, coords_y)
+
+def match_atoms(
+        atoms_a: Atoms,
+        atoms_b: Atoms,
+        *,
+        on: Optional[List[str]] = None,
+) -> Tuple[Atoms, Atoms]:
+    """
+    Pair up equivalent atoms from two structures.
+
+    Arguments:
+        atoms_a:
+            A dataframe of atoms.
+
+        atoms_b:
+            Another dataframe of atoms, e.g. a different model or symmetry 
+            mate of the same structure.
+
+        on:
+            The columns used to decide which atoms are equivalent.  By 
+            default, these are whichever of ``subchain_id``, ``seq_id``, 
+            ``alt_id``, and ``atom_id`` are present in both dataframes.  
+            Within each dataframe, these columns must uniquely identify each 
+            atom.  Null alternate location ids match each other, but atoms 
+            with null values in any of the other columns (e.g. waters, which 
+            don't have sequence ids) are never matched.
+
+    Returns:
+        Two dataframes with the same number of rows, containing only the atoms 
+        present in both structures.  The rows of each are in the same order, 
+        so the *i*-th atom of one corresponds to the *i*-th atom of the other.  
+        The order of *atoms_a* is preserved.
+    """
+    if on is None:
+        on = [
+                x for x in ['subchain_id', 'seq_id', 'alt_id', 'atom_id']
+                if x in atoms_a.columns and x in atoms_b.columns
+        ]
+
+    def select_keys(atoms, index):
+        keys = atoms.select(on).with_row_index(index)
+        if 'alt_id' in on:
+            keys = keys.with_columns(pl.col('alt_id').fill_null(''))
+        return keys
+
+    pairs = (
+            select_keys(atoms_a, 'index_a')
+            .join(
+                select_keys(atoms_b, 'index_b'),
+                on=on,
+                how='inner',
+                validate='1:1',
+            )
+            .sort('index_a')
+    )
+    return (
+            atoms_a[pairs['index_a']],
+            atoms_b[pairs['index_b']],
+    )
+
+def superimpose_atoms(
+        atoms_x: Atoms,
+        atoms_y: Atoms,
+        *,
+        on: Optional[List[str]] = None,
+        weights: Optional[str] = None,
+) -> Frame:
+    """
+    Find the rigid-body transformation that best superimposes one structure 
+    onto another.
+
+    Arguments:
+        atoms_x:
+            The atoms to move.
+
+        atoms_y:
+            The atoms to superimpose onto.
+
+        on:
+            The columns used to pair up equivalent atoms.  See 
+            `match_atoms()`.
+
+        weights:
+            The name of a column to weight each pair of atoms by, e.g. 
+            ``occupancy``.  The weight of each pair is the product of the 
+            values from each structure.  By default, every pair is weighted 
+            equally.
+
+    Returns:
+        A matrix that transforms coordinates from frame X to frame Y.  Pass 
+        this matrix to `transform_atom_coords()` to superimpose *atoms_x* onto 
+        *atoms_y*.
+    """
+    atoms_x, atoms_y = match_atoms(atoms_x, atoms_y, on=on)
+
+    if weights is not None:
+        weights = (
+                atoms_x.get_column(weights).to_numpy() *
+                atoms_y.get_column(weights).to_numpy()
+        )
+
+    return superimpose_coords(
+            get_atom_coords(atoms_x),
+            get_atom_coords(atoms_y),
+            weights,
+    )
+
+def _is_quantized(atoms: Atoms) -> bool:
+    return atoms.schema['x'].is_integer()
@@ -0,0 +1,581 @@
+import polars as pl
+import numpy as np
+import gemmi.cif
+import gzip
+
+from .atoms import Atoms, dequantize_atom_coords
+from .mmcif import (
+        Structure, MmcifError, _add_path_to_mmcif_error, _extract_structure,
+)
+from pathlib import Path
+
+from typing import Dict, List, Optional, Union
+
+def read_bcif(
+        bcif_path: Union[Path, str],
+        *,
+        coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+        bonds: bool = False,
+        unit_cell: bool = False,
+) -> Structure:
+    """
+    Parse the information in a BinaryCIF file into a number of data frames.
+
+    Arguments:
+        bcif_path:
+            The path to the BinaryCIF file to read.  The file may be 
+            compressed with gzip, e.g. ``1abc.bcif.gz``.
+
+        coord_dtype:
+            The data type to use for the ``x``, ``y``, and ``z`` columns.  See 
+            `read_mmcif()`.
+
+        bonds:
+            If True, parse the bond categories.  See `read_mmcif()`.
+
+        unit_cell:
+            If True, parse the unit cell categories.  See `read_mmcif()`.
+
+    Returns:
+        The same information as `read_mmcif()`, in the same format.
+
+    BinaryCIF is a MessagePack encoding of the mmCIF data model.  Each column 
+    is stored as a typed, compressed array, so there's no need to tokenize and 
+    parse any text.  This makes reading BinaryCIF files much faster than 
+    reading the equivalent mmCIF files.  Only the columns that are actually 
+    needed are decoded.
+
+    This function requires the optional ``msgpack`` dependency.
+    """
+    with _add_path_to_mmcif_error(bcif_path):
+        cif = _read_bcif_block(bcif_path)
+        return _extract_structure(
+                cif,
+                coord_dtype=coord_dtype,
+                bonds=bonds,
+                unit_cell=unit_cell,
+        )
+
+def write_bcif(
+        bcif_path: Union[Path, str],
+        atoms: Atoms,
+        name: Optional[str] = None,
+) -> None:
+    """
+    Write the given atoms to a new BinaryCIF file.
+
+    Arguments:
+        bcif_path:
+            The path of the file to write.  If this path already exists, it 
+            will be overwritten.  If the path ends with ``.gz``, the file will 
+            be compressed with gzip.
+
+        atoms:
+            A dataframe containing the atoms to include in the output file, 
+            e.g. as returned by `read_asymmetric_unit()`.  The ``x``, ``y``, 
+            ``z``, and ``element`` columns are required.  Any of the other 
+            columns created by `read_mmcif()` will be included if present, and 
+            any other columns will be ignored.
+
+        name:
+            An identifier to include in the BinaryCIF file.  By default, this 
+            is taken from the last component of the given path.
+
+    Unlike `write_mmcif()`, this function preserves all of the columns 
+    created by `read_mmcif()`, so reading the resulting file with `read_bcif()` 
+    gives back the same atoms.  Note that only the ``_atom_site`` category is 
+    written, though.  To convert a complete mmCIF file, including the 
+    information needed to build biological assemblies, use 
+    `convert_mmcif_to_bcif()`.
+
+    This function requires the optional ``msgpack`` dependency.
+    """
+    atoms = dequantize_atom_coords(atoms)
+
+    if 'seq_label' in atoms.columns:
+        # Split the sequence labels back into numbers and insertion codes.
+        atoms = (
+                atoms
+                .with_columns(
+                    pl.col('seq_label').str.extract_groups(
+                        r'^(?P<seq_label_1>-?[0-9]+)?(?P<seq_label_2>.*)$'
+                    ),
+                )
+                .unnest('seq_label')
+        )
+        atoms = atoms.with_columns(
+                pl.col('seq_label_1').cast(pl.Int64),
+                pl.col('seq_label_2').replace('', None),
+        )
+
+    columns = {
+            v: atoms[k]
+            for k, v in _ATOM_SITE_COLUMNS.items()
+            if k in atoms.columns
+    }
+    category = _encode_category('atom_site', columns, atoms.height)
+
+    name = name or Path(bcif_path).name.split('.')[0]
+    _write_bcif_blocks(bcif_path, [_encode_block(name, [category])])
+
+def convert_mmcif_to_bcif(
+        cif_path: Union[Path, str],
+        bcif_path: Union[Path, str],
+) -> None:
+    """
+    Convert a text mmCIF file into a BinaryCIF file.
+
+    Arguments:
+        cif_path:
+            The path to the mmCIF file to read.
+
+        bcif_path:
+            The path of the BinaryCIF file to write.  If this path already 
+            exists, it will be overwritten.  If the path ends with ``.gz``, the 
+            file will be compressed with gzip.
+
+    Every category in the mmCIF file is converted, not just those that are 
+    used by `read_mmcif()`.  Columns where every value is an integer or a 
+    decimal number are stored as numbers, and every other column is stored as 
+    strings.  The PDB makes BinaryCIF files available for download, but it 
+    can still be useful to convert a local mirror.
+
+    This function requires the optional ``msgpack`` dependency.
+    """
+    block = gemmi.cif.read(str(cif_path)).sole_block()
+    categories = []
+
+    for key_prefix in block.get_mmcif_category_names():
+        loop = block.get_mmcif_category(key_prefix)
+        columns = {
+                k: _infer_column_dtype(pl.Series(
+                    k,
+                    [v if isinstance(v, str) else None for v in vs],
+                    dtype=pl.String,
+                ))
+                for k, vs in loop.items()
+        }
+        num_rows = len(next(iter(loop.values()), []))
+        categories.append(
+                _encode_category(key_prefix[1:-1], columns, num_rows)
+        )
+
+    _write_bcif_blocks(bcif_path, [_encode_block(block.name, categories)])
+
+class _BcifBlock:
+    """
+    A data block from a BinaryCIF file, with the same interface that the 
+    ``_extract_*()`` functions in `mmcif` need from a `gemmi.cif.Block`.
+    """
+
+    def __init__(self, block):
+        self.name = block['header']
+        self._categories = {
+                x['name'].lstrip('_'): x
+                for x in block['categories']
+        }
+
+    def get_dataframe(self, key_prefix: str, names: List[str]) -> pl.DataFrame:
+        """
+        Decode the given columns from the given category.  Columns that 
+        aren't present in the file are skipped.  If the category isn't 
+        present in the file, the returned data frame will be empty.
+        """
+        try:
+            category = self._categories[key_prefix]
+        except KeyError:
+            return pl.DataFrame()
+
+        columns = {x['name']: x for x in category['columns']}
+        names = [k for k in names if k in columns]
+
+        # If none of the requested columns are present, still return a data 
+        # frame with the right number of rows, so that the caller can tell the 
+        # difference between missing columns and a missing category.
+        if not names and category['columns']:
+            names = [category['columns'][0]['name']]
+
+        return pl.DataFrame([_decode_column(columns[k]) for k in names])
+
+def _read_bcif_block(bcif_path):
+    import msgpack
+
+    data = Path(bcif_path).read_bytes()
+
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+
+    try:
+        bcif = msgpack.unpackb(data)
+        blocks = bcif['dataBlocks']
+    except (ValueError, TypeError, KeyError, msgpack.UnpackException):
+        raise MmcifError("not a BinaryCIF file") from None
+
+    if len(blocks) != 1:
+        err = MmcifError("expected exactly one data block")
+        err.blame = [f"found {len(blocks)} data blocks"]
+        raise err
+
+    return _BcifBlock(blocks[0])
+
+def _write_bcif_blocks(bcif_path, blocks):
+    import msgpack
+    from . import __version__
+
+    data = msgpack.packb(
+            {
+                'version': _BCIF_VERSION,
+                'encoder': f'macromol_dataframe {__version__}',
+                'dataBlocks': blocks,
+            },
+            use_bin_type=True,
+    )
+
+    if str(bcif_path).endswith('.gz'):
+        data = gzip.compress(data)
+
+    Path(bcif_path).write_bytes(data)
+
+def _decode_column(column):
+    values = _decode(column['data'])
+
+    if isinstance(values, pl.Series):
+        series = values.alias(column['name'])
+    else:
+        series = pl.Series(column['name'], values)
+
+    if mask := column.get('mask'):
+        # A mask value of 1 means that the value is "not specified" (`.` in 
+        # mmCIF), and 2 means that it's "unknown" (`?`).  Both are null.
+        series = series.set(pl.Series(_decode(mask) != 0), None)
+
+    return series
+
+def _decode(encoded_data):
+    data = encoded_data['data']
+
+    # Encodings are listed in the order they were applied, so they have to be 
+    # undone in reverse.
+    for encoding in reversed(encoded_data['encoding']):
+        try:
+            decode = _DECODERS[encoding['kind']]
+        except KeyError:
+            err = MmcifError("unknown BinaryCIF encoding")
+            err.blame = [f"encoding: {encoding['kind']!r}"]
+            raise err from None
+
+        data = decode(data, encoding)
+
+    return data
+
+def _decode_byte_array(data, encoding):
+    return np.frombuffer(data, dtype=_DTYPES[encoding['type']])
+
+def _decode_fixed_point(data, encoding):
+    # Divide in double precision, even if the output is single precision, so 
+    # that the results are correctly rounded.
+    dtype = _DTYPES[encoding['srcType']]
+    values = data.astype(np.float64) / encoding['factor']
+    return values.astype(dtype, copy=False)
+
+def _decode_interval_quantization(data, encoding):
+    lo, hi, n = encoding['min'], encoding['max'], encoding['numSteps']
+    dtype = _DTYPES[encoding['srcType']]
+    return (lo + (hi - lo) / (n - 1) * data).astype(dtype, copy=False)
+
+def _decode_run_length(data, encoding):
+    values, counts = data[0::2], data[1::2]
+    return np.repeat(values, counts).astype(
+            _DTYPES[encoding['srcType']],
+            copy=False,
+    )
+
+def _decode_delta(data, encoding):
+    dtype = _DTYPES[encoding['srcType']]
+    out = np.cumsum(data, dtype=dtype)
+    out += encoding['origin']
+    return out
+
+def _decode_integer_packing(data, encoding):
+    # Values too big to fit in the packed type are stored as a sequence of 
+    # elements equal to the upper (or lower) limit of that type, followed by 
+    # one element that isn't.  The unpacked value is the sum of the sequence.
+    info = np.iinfo(data.dtype)
+
+    if encoding['isUnsigned']:
+        is_end = data != info.max
+    else:
+        is_end = (data != info.max) & (data != info.min)
+
+    data = data.astype(np.int32)
+
+    if is_end.all():
+        return data
+
+    starts = np.flatnonzero(is_end)[:-1] + 1
+    return np.add.reduceat(data, np.concatenate([[0], starts]))
+
+def _decode_string_array(data, encoding):
+    indices = _decode(dict(
+            encoding=encoding['dataEncoding'],
+            data=data,
+    ))
+    offsets = _decode(dict(
+            encoding=encoding['offsetEncoding'],
+            data=encoding['offsets'],
+    ))
+    string_data = encoding['stringData']
+    strings = [
+            string_data[i:j]
+            for i, j in zip(offsets[:-1], offsets[1:])
+    ]
+
+    # An index of -1 indicates an empty string.
+    strings = pl.Series([''] + strings, dtype=pl.String)
+    return strings.gather(indices.astype(np.int64) + 1)
+
+def _encode_block(name, categories):
+    return {
+            'header': name,
+            'categories': categories,
+    }
+
+def _encode_category(name, columns, num_rows):
+    return {
+            'name': f'_{name}',
+            'rowCount': num_rows,
+            'columns': [
+                _encode_column(k, v)
+                for k, v in columns.items()
+            ],
+    }
+
+def _encode_column(name, series):
+    mask = None
+
+    if series.null_count():
+        mask = _encode_integers(
+                series.is_null().cast(pl.UInt8).to_numpy(),
+        )
+
+    if series.dtype.is_integer():
+        data = _encode_integers(series.fill_null(0).to_numpy())
+    elif series.dtype.is_float():
+        data = _encode_floats(series.fill_null(0).to_numpy())
+    else:
+        data = _encode_strings(series.cast(pl.String))
+
+    return {
+            'name': name,
+            'data': data,
+            'mask': mask,
+    }
+
+def _encode_integers(values):
+    values = values.astype(np.int32)
+
+    # Try a few common combinations of encodings, and keep whichever gives 
+    # the smallest output.
+    candidates = [
+            _encode_byte_array(values, _INT32),
+            _pack_integers([], values),
+            _pack_integers(*_encode_delta(values)),
+            _pack_integers(*_encode_run_length([], values)),
+            _pack_integers(*_encode_run_length(*_encode_delta(values))),
+    ]
+    return min(candidates, key=lambda x: len(x['data']))
+
+def _encode_floats(values):
+    for digits in range(_MAX_FIXED_POINT_DIGITS + 1):
+        factor = 10**digits
+        scaled = np.round(values.astype(np.float64) * factor)
+
+        if np.abs(scaled).max(initial=0) > np.iinfo(np.int32).max:
+            break
+
+        decoded = (scaled / factor).astype(values.dtype)
+        if np.array_equal(decoded, values):
+            encoding = {
+                    'kind': 'FixedPoint',
+                    'factor': factor,
+                    'srcType': _DTYPE_CODES[values.dtype],
+            }
+            data = _encode_integers(scaled.astype(np.int32))
+            data['encoding'] = [encoding, *data['encoding']]
+            return data
+
+    return _encode_byte_array(values, values.dtype)
+
+def _encode_strings(series):
+    strings = series.drop_nulls().unique().sort()
+    indices = (
+            (series.rank('dense') - 1)
+            .fill_null(-1)
+            .cast(pl.Int32)
+            .to_numpy()
+    )
+    lengths = strings.str.len_chars().cast(pl.Int32).to_numpy()
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+
+    indices = _encode_integers(indices)
+    offsets = _encode_integers(offsets)
+
+    encoding = {
+            'kind': 'StringArray',
+            'dataEncoding': indices['encoding'],
+            'stringData': ''.join(strings),
+            'offsetEncoding': offsets['encoding'],
+            'offsets': offsets['data'],
+    }
+    return {
+            'encoding': [encoding],
+            'data': indices['data'],
+    }
+
+def _encode_byte_array(values, dtype):
+    dtype = np.dtype(dtype).newbyteorder('<')
+    return {
+            'encoding': [{
+                'kind': 'ByteArray',
+                'type': _DTYPE_CODES[dtype],
+            }],
+            'data': values.astype(dtype).tobytes(),
+    }
+
+def _encode_delta(values):
+    if len(values) == 0:
+        return [], values
+
+    encoding = {
+            'kind': 'Delta',
+            'origin': int(values[0]),
+            'srcType': _DTYPE_CODES[_INT32],
+    }
+    deltas = np.diff(values, prepend=values[0])
+    return [encoding], deltas
+
+def _encode_run_length(encodings, values):
+    encoding = {
+            'kind': 'RunLength',
+            'srcType': _DTYPE_CODES[_INT32],
+            'srcSize': len(values),
+    }
+
+    if len(values) == 0:
+        return [*encodings, encoding], values
+
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    counts = np.diff(starts, append=len(values))
+
+    runs = np.empty(2 * len(starts), dtype=np.int32)
+    runs[0::2] = values[starts]
+    runs[1::2] = counts
+
+    return [*encodings, encoding], runs
+
+def _pack_integers(encodings, values):
+    is_unsigned = len(values) == 0 or values.min() >= 0
+    candidates = [_encode_byte_array(values, _INT32)]
+
+    for byte_count in [1, 2]:
+        dtype = np.dtype(f'<{"u" if is_unsigned else "i"}{byte_count}')
+        info = np.iinfo(dtype)
+
+        # Every value is stored as zero or more copies of the upper (or lower) 
+        # limit of the packed type, followed by the remainder.
+        upper = np.int64(info.max)
+        lower = np.int64(info.min) if not is_unsigned else None
+        values_64 = values.astype(np.int64)
+
+        if is_unsigned:
+            num_limits = values_64 // upper
+            limits = np.full(len(values), upper)
+        else:
+            is_neg = values_64 < 0
+            num_limits = np.where(is_neg, values_64 // lower, values_64 // upper)
+            limits = np.where(is_neg, lower, upper)
+
+        # Don't bother packing if the result wouldn't be smaller.
+        num_elements = num_limits + 1
+        if num_elements.sum() * byte_count >= 4 * len(values):
+            continue
+
+        remainders = values_64 - num_limits * limits
+        packed = np.repeat(limits, num_elements)
+        packed[np.cumsum(num_elements) - 1] = remainders
+
+        encoding = {
+                'kind': 'IntegerPacking',
+                'byteCount': byte_count,
+                'isUnsigned': bool(is_unsigned),
+                'srcSize': len(values),
+        }
+        data = _encode_byte_array(packed, dtype)
+        data['encoding'] = [encoding, *data['encoding']]
+        candidates.append(data)
+
+    data = min(candidates, key=lambda x: len(x['data']))
+    data['encoding'] = [*encodings, *data['encoding']]
+    return data
+
+def _infer_column_dtype(series):
+    values = series.drop_nulls()
+
+    if values.is_empty():
+        return series
+
+    # Only convert values that can be converted back to exactly the same 
+    # strings, e.g. not ids with leading zeros.
+    as_int = values.cast(pl.Int32, strict=False)
+    if as_int.null_count() == 0 and (as_int.cast(pl.String) == values).all():
+        return series.cast(pl.Int32)
+
+    if values.str.contains(r'^-?[0-9]+\.[0-9]+$').all():
+        return series.cast(pl.Float64)
+
+    return series
+
+_BCIF_VERSION = '0.3.0'
+_MAX_FIXED_POINT_DIGITS = 6
+
+_INT32 = np.dtype('<i4')
+_DTYPES = {
+        1: np.dtype('<i1'),
+        2: np.dtype('<i2'),
+        3: np.dtype('<i4'),
+        4: np.dtype('<u1'),
+        5: np.dtype('<u2'),
+        6: np.dtype('<u4'),
+        32: np.dtype('<f4'),
+        33: np.dtype('<f8'),
+}
+_DTYPE_CODES = {v: k for k, v in _DTYPES.items()}
+
+_DECODERS = {
+        'ByteArray': _decode_byte_array,
+        'FixedPoint': _decode_fixed_point,
+        'IntervalQuantization': _decode_interval_quantization,
+        'RunLength': _decode_run_length,
+        'Delta': _decode_delta,
+        'IntegerPacking': _decode_integer_packing,
+        'StringArray': _decode_string_array,
+}
+
+_ATOM_SITE_COLUMNS: Dict[str, str] = dict(
+        model_id='pdbx_PDB_model_num',
+        chain_id='auth_asym_id',
+        subchain_id='label_asym_id',
+        entity_id='label_entity_id',
+        alt_id='label_alt_id',
+        seq_id='label_seq_id',
+        seq_label_1='auth_seq_id',
+        seq_label_2='pdbx_PDB_ins_code',
+        comp_id='label_comp_id',
+        atom_id='label_atom_id',
+        element='type_symbol',
+        x='Cartn_x',
+        y='Cartn_y',
+        z='Cartn_z',
+        occupancy='occupancy',
+        b_factor='B_iso_or_equiv',
+)
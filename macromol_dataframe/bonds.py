@@ -0,0 +1,405 @@
+import polars as pl
+import numpy as np
+import functools
+
+from .atoms import Atoms
+from numpy.typing import NDArray
+
+from typing import Optional, Tuple
+
+BONDS_SCHEMA = dict(
+        atom_i=pl.UInt32,
+        atom_j=pl.UInt32,
+        type=pl.String,
+)
+
+def find_bonds(
+        atoms: Atoms,
+        struct_conn: Optional[pl.DataFrame] = None,
+        chem_comp_bonds: Optional[pl.DataFrame] = None,
+) -> pl.DataFrame:
+    """
+    Identify the covalent bonds (and other connections) between the given 
+    atoms.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms, e.g. `Structure.asym_atoms`.  This dataframe 
+            must have ``subchain_id``, ``seq_id``, ``comp_id``, and 
+            ``atom_id`` columns.  The ``seq_label`` and ``alt_id`` columns are 
+            also used, if present.  If there are ``structure_id``, 
+            ``model_id``, or ``symmetry_mate`` columns, atoms will only be 
+            bonded to other atoms with the same values in these columns.
+
+        struct_conn:
+            Connections that can't be inferred from the names of the atoms 
+            alone, e.g. `Structure.struct_conn` (which is only parsed if 
+            `read_mmcif()` is called with ``bonds=True``).  This typically 
+            includes disulfide bonds, bonds to ligands, and metal 
+            coordination.  Connections involving crystal symmetry operators 
+            are ignored.
+
+        chem_comp_bonds:
+            The bonds within each type of residue, e.g. 
+            `Structure.chem_comp_bonds`.  These are used in addition to the 
+            bonds in `STANDARD_BONDS`.  Most mmCIF files from the PDB don't 
+            include this information, but some do, and it's the only way to 
+            find bonds within ligands.
+
+    Returns:
+        A dataframe with the columns described by `BONDS_SCHEMA`, and one 
+        row for each bond:
+
+        - ``atom_i``, ``atom_j``: The row indices of the bonded atoms in 
+          *atoms*, with ``atom_i < atom_j``.  The rows of this dataframe are 
+          sorted by these columns.
+
+        - ``type``: ``residue`` for bonds within a single residue, 
+          ``polymer`` for peptide and phosphodiester bonds between 
+          consecutive residues, or the connection type given by 
+          *struct_conn* (e.g. ``disulf``, ``covale``, ``metalc``) for 
+          anything else.
+
+    Atoms with different alternate location ids are never bonded to each 
+    other, but atoms without an alternate location id can be bonded to atoms 
+    with any.  Note that `STANDARD_BONDS` doesn't include hydrogen atoms, so 
+    hydrogens will only be bonded if *chem_comp_bonds* is given.
+    """
+    group_cols = [
+            x for x in ['structure_id', 'model_id', 'symmetry_mate']
+            if x in atoms.columns
+    ]
+    atoms = (
+            atoms
+            .select(
+                *group_cols,
+                'subchain_id',
+                'seq_id',
+                'comp_id',
+                'atom_id',
+                _optional_col(atoms, 'seq_label'),
+                _optional_col(atoms, 'alt_id'),
+            )
+            .with_row_index('atom_i')
+    )
+
+    # Identify each residue by the index of its first atom.  Non-polymer 
+    # residues (e.g. waters) don't have sequence ids, so use the sequence 
+    # labels to tell them apart.
+    residue_cols = [*group_cols, 'subchain_id', 'seq_id', 'seq_label']
+    atoms = atoms.with_columns(
+            residue=pl.col('atom_i').min().over(residue_cols),
+    )
+
+    residue_bonds = _find_residue_bonds(atoms, chem_comp_bonds)
+    polymer_bonds = pl.concat([
+            _find_polymer_bonds(atoms, group_cols, 'C', 'N'),
+            _find_polymer_bonds(atoms, group_cols, "O3'", 'P'),
+    ])
+    bonds = [residue_bonds, polymer_bonds]
+
+    if struct_conn is not None:
+        conn_bonds = _find_struct_conn_bonds(atoms, group_cols, struct_conn)
+        bonds = [
+                residue_bonds,
+                _drop_replaced_polymer_bonds(atoms, polymer_bonds, conn_bonds),
+                conn_bonds,
+        ]
+
+    return (
+            pl.concat(bonds)
+            .select(
+                atom_i=pl.min_horizontal('atom_i', 'atom_j'),
+                atom_j=pl.max_horizontal('atom_i', 'atom_j'),
+                type='type',
+            )
+            .unique(['atom_i', 'atom_j'], keep='first', maintain_order=True)
+            .sort('atom_i', 'atom_j')
+            .cast(BONDS_SCHEMA)
+    )
+
+def select_bonds(bonds: pl.DataFrame, indices) -> pl.DataFrame:
+    """
+    Find the bonds between a subset of the original atoms.
+
+    Arguments:
+        bonds:
+            A dataframe of bonds, e.g. from `find_bonds()`.
+
+        indices:
+            For each atom in the subset, the row index of that atom in the 
+            original dataframe.  The easiest way to get these indices is to 
+            add a row index column before filtering the atoms, e.g.:
+
+                >>> atoms = atoms.with_row_index('i')  # doctest: +SKIP
+                >>> atoms = prune_hydrogen(atoms)  # doctest: +SKIP
+                >>> bonds = select_bonds(bonds, atoms['i'])  # doctest: +SKIP
+
+            This works for any way of filtering or reordering the atoms.
+
+    Returns:
+        A dataframe of the bonds between atoms that are both in the subset, 
+        with the row indices updated to refer to the subset.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    num_atoms = max(
+            indices.max(initial=-1),
+            bonds['atom_i'].max() or 0,
+            bonds['atom_j'].max() or 0,
+    ) + 1
+
+    new_indices = np.full(num_atoms, -1, dtype=np.int64)
+    new_indices[indices] = np.arange(len(indices))
+
+    i = new_indices[bonds['atom_i'].to_numpy()]
+    j = new_indices[bonds['atom_j'].to_numpy()]
+    keep = (i >= 0) & (j >= 0)
+
+    return (
+            bonds
+            .with_columns(
+                atom_i=np.minimum(i, j),
+                atom_j=np.maximum(i, j),
+            )
+            .filter(keep)
+            .sort('atom_i', 'atom_j')
+            .cast(BONDS_SCHEMA)
+    )
+
+def make_bond_csr(
+        bonds: pl.DataFrame,
+        num_atoms: int,
+) -> Tuple[NDArray[int], NDArray[int]]:
+    """
+    Convert the given bonds into an adjacency list in compressed sparse row 
+    (CSR) format.
+
+    Arguments:
+        bonds:
+            A dataframe of bonds, e.g. from `find_bonds()`.
+
+        num_atoms:
+            The number of atoms in the dataframe that the bonds refer to.
+
+    Returns:
+        A tuple of two integer arrays, ``offsets`` and ``neighbors``.  The 
+        neighbors of atom *i* are ``neighbors[offsets[i]:offsets[i+1]]``, in 
+        sorted order.  Every bond appears twice, once in each direction.  
+        These are the same arrays used by `scipy.sparse.csr_array` (as 
+        ``indptr`` and ``indices``) and by most graph neural network 
+        libraries.
+    """
+    i = bonds['atom_i'].to_numpy().astype(np.int64)
+    j = bonds['atom_j'].to_numpy().astype(np.int64)
+
+    src = np.concatenate([i, j])
+    dst = np.concatenate([j, i])
+    order = np.lexsort((dst, src))
+
+    offsets = np.zeros(num_atoms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_atoms), out=offsets[1:])
+
+    return offsets, dst[order]
+
+def _find_residue_bonds(atoms, chem_comp_bonds):
+    bond_table = _get_standard_bond_table()
+
+    if chem_comp_bonds is not None:
+        bond_table = pl.concat([
+            bond_table,
+            chem_comp_bonds.select(bond_table.columns),
+        ])
+
+    return (
+            atoms
+            .join(
+                bond_table.unique(),
+                left_on=['comp_id', 'atom_id'],
+                right_on=['comp_id', 'atom_id_1'],
+            )
+            .join(
+                atoms,
+                left_on=['residue', 'comp_id', 'atom_id_2'],
+                right_on=['residue', 'comp_id', 'atom_id'],
+                suffix='_j',
+            )
+            .filter(_is_compatible_alt_id('alt_id', 'alt_id_j'))
+            .select(
+                'atom_i',
+                atom_j='atom_i_j',
+                type=pl.lit('residue'),
+            )
+    )
+
+def _find_polymer_bonds(atoms, group_cols, atom_id_i, atom_id_j):
+    chain_cols = [*group_cols, 'subchain_id']
+
+    atoms_i = (
+            atoms
+            .filter(pl.col('atom_id') == atom_id_i)
+            .drop_nulls('seq_id')
+    )
+    atoms_j = (
+            atoms
+            .filter(pl.col('atom_id') == atom_id_j)
+            .drop_nulls('seq_id')
+            .with_columns(pl.col('seq_id') - 1)
+    )
+
+    return (
+            atoms_i
+            .join(
+                atoms_j,
+                on=[*chain_cols, 'seq_id'],
+                suffix='_j',
+            )
+            .filter(_is_compatible_alt_id('alt_id', 'alt_id_j'))
+            .select(
+                'atom_i',
+                atom_j='atom_i_j',
+                type=pl.lit('polymer'),
+            )
+    )
+
+def _drop_replaced_polymer_bonds(atoms, polymer_bonds, conn_bonds):
+    # Some nonstandard residues are linked to the next residue through an 
+    # atom other than the usual backbone atom, e.g. the side chain carboxyl 
+    # of γ-linked glutamate (GGL).  The PDB records these links explicitly, 
+    # so if the second atom of an inferred polymer bond is explicitly bonded 
+    # to the preceding residue, trust the explicit bond instead.
+    residues = atoms['residue']
+    conn_i = conn_bonds['atom_i'].to_numpy()
+    conn_j = conn_bonds['atom_j'].to_numpy()
+
+    links = pl.DataFrame({
+        'atom_j': np.concatenate([conn_j, conn_i]),
+        'residue_i': residues.gather(np.concatenate([conn_i, conn_j])),
+    })
+
+    return (
+            polymer_bonds
+            .with_columns(
+                residue_i=residues.gather(polymer_bonds['atom_i']),
+            )
+            .join(links, on=['atom_j', 'residue_i'], how='anti')
+            .drop('residue_i')
+    )
+
+def _find_struct_conn_bonds(atoms, group_cols, struct_conn):
+    # Atoms outside of polymers don't have sequence ids, so match them using 
+    # -1 instead of null.  Joins never match null values.
+    key_cols = ['subchain_id', 'seq_id', 'seq_label', 'comp_id', 'atom_id']
+    atoms = atoms.with_columns(
+            pl.col('seq_id').fill_null(-1),
+            pl.col('seq_label').fill_null(''),
+    )
+
+    struct_conn = (
+            struct_conn
+            .with_row_index('conn')
+            .filter(
+                pl.col('symmetry_1').fill_null('1_555') == '1_555',
+                pl.col('symmetry_2').fill_null('1_555') == '1_555',
+            )
+    )
+
+    def find_partners(i):
+        partners = struct_conn.select(
+                'conn',
+                'type',
+                *[
+                    pl.col(f'{k}_{i}').alias(k)
+                    for k in [*key_cols, 'alt_id']
+                ],
+        )
+        partners = partners.with_columns(
+                pl.col('seq_id').fill_null(-1),
+                pl.col('seq_label').fill_null(''),
+        )
+
+        # If the atoms don't have sequence labels, match without them.
+        if atoms['seq_label'].eq('').all():
+            partners = partners.with_columns(seq_label=pl.lit(''))
+
+        return (
+                atoms
+                .join(partners, on=key_cols, suffix='_conn')
+                .filter(_is_compatible_alt_id('alt_id', 'alt_id_conn'))
+                .select('conn', 'type', *group_cols, 'atom_i', 'alt_id')
+        )
+
+    return (
+            find_partners(1)
+            .join(find_partners(2), on=['conn', *group_cols], suffix='_j')
+            .filter(_is_compatible_alt_id('alt_id', 'alt_id_j'))
+            .sort('conn')
+            .select(
+                'atom_i',
+                atom_j='atom_i_j',
+                type='type',
+            )
+    )
+
+def _is_compatible_alt_id(col_i, col_j):
+    return (
+            pl.col(col_i).is_null() |
+            pl.col(col_j).is_null() |
+            (pl.col(col_i) == pl.col(col_j))
+    )
+
+def _optional_col(atoms, name):
+    if name in atoms.columns:
+        return pl.col(name)
+    else:
+        return pl.lit(None, dtype=pl.String).alias(name)
+
+@functools.lru_cache(maxsize=None)
+def _get_standard_bond_table():
+    rows = [
+            (comp_id, *bond.split('-'))
+            for comp_id, bonds in STANDARD_BONDS.items()
+            for bond in bonds.split()
+    ]
+    return pl.DataFrame(
+            rows,
+            schema=['comp_id', 'atom_id_1', 'atom_id_2'],
+            orient='row',
+    )
+
+_AMINO_ACID_BACKBONE = 'N-CA CA-C C-O C-OXT'
+_NUCLEOTIDE_BACKBONE = "OP3-P P-OP1 P-OP2 P-O5' O5'-C5' C5'-C4' C4'-O4' C4'-C3' C3'-O3' C3'-C2' C2'-C1' C1'-O4'"
+_RIBOSE = "C2'-O2'"
+_PURINE = "C1'-N9 N9-C8 C8-N7 N7-C5 C5-C6 C6-N1 N1-C2 C2-N3 N3-C4 C4-C5 C4-N9"
+_PYRIMIDINE = "C1'-N1 N1-C2 C2-O2 C2-N3 N3-C4 C4-C5 C5-C6 C6-N1"
+
+STANDARD_BONDS = {
+        'ALA': f'{_AMINO_ACID_BACKBONE} CA-CB',
+        'ARG': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD CD-NE NE-CZ CZ-NH1 CZ-NH2',
+        'ASN': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-OD1 CG-ND2',
+        'ASP': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-OD1 CG-OD2',
+        'CYS': f'{_AMINO_ACID_BACKBONE} CA-CB CB-SG',
+        'GLN': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD CD-OE1 CD-NE2',
+        'GLU': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD CD-OE1 CD-OE2',
+        'GLY': f'{_AMINO_ACID_BACKBONE}',
+        'HIS': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-ND1 CG-CD2 ND1-CE1 CD2-NE2 CE1-NE2',
+        'ILE': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG1 CB-CG2 CG1-CD1',
+        'LEU': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD1 CG-CD2',
+        'LYS': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD CD-CE CE-NZ',
+        'MET': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-SD SD-CE',
+        'MSE': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-SE SE-CE',
+        'PHE': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD1 CG-CD2 CD1-CE1 CD2-CE2 CE1-CZ CE2-CZ',
+        'PRO': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD CD-N',
+        'SER': f'{_AMINO_ACID_BACKBONE} CA-CB CB-OG',
+        'THR': f'{_AMINO_ACID_BACKBONE} CA-CB CB-OG1 CB-CG2',
+        'TRP': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD1 CG-CD2 CD1-NE1 NE1-CE2 CD2-CE2 CD2-CE3 CE2-CZ2 CE3-CZ3 CZ2-CH2 CZ3-CH2',
+        'TYR': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG CG-CD1 CG-CD2 CD1-CE1 CD2-CE2 CE1-CZ CE2-CZ CZ-OH',
+        'VAL': f'{_AMINO_ACID_BACKBONE} CA-CB CB-CG1 CB-CG2',
+        'A': f'{_NUCLEOTIDE_BACKBONE} {_RIBOSE} {_PURINE} C6-N6',
+        'C': f'{_NUCLEOTIDE_BACKBONE} {_RIBOSE} {_PYRIMIDINE} C4-N4',
+        'G': f'{_NUCLEOTIDE_BACKBONE} {_RIBOSE} {_PURINE} C6-O6 C2-N2',
+        'U': f'{_NUCLEOTIDE_BACKBONE} {_RIBOSE} {_PYRIMIDINE} C4-O4',
+        'DA': f'{_NUCLEOTIDE_BACKBONE} {_PURINE} C6-N6',
+        'DC': f'{_NUCLEOTIDE_BACKBONE} {_PYRIMIDINE} C4-N4',
+        'DG': f'{_NUCLEOTIDE_BACKBONE} {_PURINE} C6-O6 C2-N2',
+        'DT': f'{_NUCLEOTIDE_BACKBONE} {_PYRIMIDINE} C4-O4 C5-C7',
+}
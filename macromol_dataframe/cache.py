@@ -0,0 +1,469 @@
+import polars as pl
+import numpy as np
+import threading
+import hashlib
+import shutil
+import tempfile
+import weakref
+import json
+import os
+
+from .mmcif import Structure, read_mmcif, select_model, make_biological_assembly
+from .atoms import Atoms
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from typing import Any, Hashable, Union
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    num_entries: int = 0
+    size_bytes: int = 0
+
+class StructureCache:
+    """
+    Keep recently parsed structures and assemblies in memory.
+
+    Machine learning data pipelines often need to load the same structures 
+    many times.  Parsing an mmCIF file is expensive, so it's worth keeping the 
+    results around in case they're needed again.  This class provides cached 
+    versions of `read_mmcif()`, `read_asymmetric_unit()`, and 
+    `read_biological_assembly()`.  When the cache exceeds its memory budget, 
+    the least recently used entries are evicted.
+
+    Cache entries are keyed on the path, the modification time of the file, 
+    and any arguments that affect the result (e.g. model and assembly ids).  
+    Modifying a file therefore invalidates any entries derived from it.
+
+    Note that cached structures and dataframes are shared between callers, so 
+    they should not be modified in place.  This isn't a concern for polars 
+    dataframes, which are immutable, but it is for the attributes of 
+    `Structure` objects.
+
+    Each process has its own cache.  See `SharedStructureCache` for a cache 
+    that can be shared between the worker processes of a data loader.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Arguments:
+            max_bytes:
+                The memory budget for the cache.  The size of each entry is 
+                estimated using `polars.DataFrame.estimated_size()`, so the 
+                actual memory usage may differ somewhat from this budget.
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Statistics on how effective the cache has been.
+
+        These can be used to tune the memory budget.  A snapshot is returned, 
+        so the values won't change as the cache continues to be used.
+        """
+        with self._lock:
+            return CacheStats(**vars(self._stats))
+
+    def read_mmcif(
+            self,
+            cif_path: Union[Path, str],
+            *,
+            coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+    ) -> Structure:
+        """
+        Cached version of `read_mmcif()`.
+        """
+        return self._read_mmcif(cif_path, coord_dtype=coord_dtype)
+
+    def read_asymmetric_unit(
+            self,
+            cif_path: Union[Path, str],
+            *,
+            coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+    ) -> Atoms:
+        """
+        Cached version of `read_asymmetric_unit()`.
+        """
+        struct = self.read_mmcif(cif_path, coord_dtype=coord_dtype)
+        return struct.asym_atoms
+
+    def read_biological_assembly(
+            self,
+            cif_path: Union[Path, str],
+            *,
+            model_id: str,
+            assembly_id: str,
+            coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+    ) -> Atoms:
+        """
+        Cached version of `read_biological_assembly()`.
+
+        Both the assembly itself and the structure it was built from are 
+        cached, so requesting a different assembly from the same file won't 
+        require the file to be parsed again.
+        """
+        key = _make_key(
+                cif_path, 'assembly', coord_dtype, model_id, assembly_id,
+        )
+
+        # Only count the request for the assembly itself in the statistics, 
+        # not the request for the underlying structure.
+        def load():
+            struct = self._read_mmcif(
+                    cif_path,
+                    coord_dtype=coord_dtype,
+                    count=False,
+            )
+            return make_biological_assembly(
+                    select_model(struct.asym_atoms, model_id),
+                    struct.assembly_gen,
+                    struct.oper_map,
+                    assembly_id,
+            )
+
+        return self._get_or_load(key, load)
+
+    def clear(self) -> None:
+        """
+        Remove every entry from the cache.
+
+        The hit and miss counts are not reset.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._stats.num_entries = 0
+            self._stats.size_bytes = 0
+
+    def _read_mmcif(self, cif_path, *, coord_dtype, count=True):
+        key = _make_key(cif_path, 'mmcif', coord_dtype)
+        return self._get_or_load(
+                key,
+                lambda: read_mmcif(cif_path, coord_dtype=coord_dtype),
+                count=count,
+        )
+
+    def _get_or_load(self, key, load, *, count=True):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                if count:
+                    self._stats.hits += 1
+                return self._entries[key][0]
+
+            if count:
+                self._stats.misses += 1
+
+        # Don't hold the lock while loading, since that could take a while and 
+        # would prevent other threads from using the cache.  The downside is 
+        # that two threads might load the same entry at the same time, but 
+        # that's harmless.
+        value = load()
+        size = _estimate_size(value)
+
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+
+            if size > self.max_bytes:
+                return value
+
+            self._entries[key] = value, size
+            self._stats.num_entries += 1
+            self._stats.size_bytes += size
+
+            while self._stats.size_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._stats.evictions += 1
+                self._stats.num_entries -= 1
+                self._stats.size_bytes -= evicted_size
+
+        return value
+
+class SharedStructureCache:
+    """
+    Share parsed structures and assemblies between processes.
+
+    Data loaders typically use several worker processes, and if each worker 
+    keeps its own cache, the amount of memory needed grows with the number of 
+    workers.  This cache instead stores each parsed structure in a directory 
+    that all of the workers can access, by default in ``/dev/shm`` so that the 
+    data never actually touches the disk.  The dataframes are stored in the 
+    Arrow IPC format and the symmetry operators as ``*.npy`` files, and both 
+    are memory-mapped when loaded.  This means that every worker that loads a 
+    structure shares the same physical memory, and that loading a structure 
+    that another worker already parsed is nearly free.
+
+    The process that creates the cache owns its directory, and the directory 
+    is deleted when that process calls `close()` or exits.  Pass the cache 
+    object itself to the worker processes (e.g. as an attribute of a dataset 
+    object); unpickled copies refer to the same directory, but never delete 
+    it.  Neither do copies inherited by forked worker processes, since the 
+    directory is only ever deleted by the process that created it.  Entries 
+    are written to temporary paths that include the id of the writing 
+    process, and are then atomically renamed into place.  So a worker that 
+    dies while writing an entry can never leave behind a partial entry that 
+    other workers might try to load, and its leftover temporary files are 
+    removed by `remove_stale_files()`.
+
+    Note that entries are never evicted, so the cache will grow until the 
+    directory is deleted.  Also note that, because the data are memory-mapped, 
+    the dataframes returned by this cache remain valid even after the 
+    directory is deleted.
+    """
+
+    def __init__(self, root: Union[Path, str, None] = None):
+        """
+        Arguments:
+            root:
+                The directory to store cached data in.  If this directory 
+                doesn't already exist, it will be created, and it will be 
+                deleted when the cache is closed.  Otherwise, the existing 
+                directory will be used as-is and never deleted, which makes it 
+                possible for unrelated processes to share a cache.  By 
+                default, a new directory is created in ``/dev/shm`` (if 
+                available) or the system temporary directory.
+        """
+        if root is None:
+            shm = Path('/dev/shm')
+            parent = shm if shm.is_dir() else None
+            root = Path(tempfile.mkdtemp(prefix='mmdf_cache_', dir=parent))
+            owner = True
+        else:
+            root = Path(root)
+            owner = not root.exists()
+            root.mkdir(parents=True, exist_ok=True)
+
+        self.root = root
+        self._stats = CacheStats()
+        self._finalizer = None
+
+        # Forked processes inherit the finalizer, so record which process 
+        # actually owns the directory.
+        if owner:
+            self._finalizer = weakref.finalize(
+                    self, _remove_if_owner, str(root), os.getpid(),
+            )
+
+        self.remove_stale_files()
+
+    def __getstate__(self):
+        return {'root': self.root}
+
+    def __setstate__(self, state):
+        self.root = state['root']
+        self._stats = CacheStats()
+        self._finalizer = None
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Statistics on how effective the cache has been in this process.
+
+        Only the hit and miss counts are tracked.
+        """
+        return CacheStats(**vars(self._stats))
+
+    def read_mmcif(
+            self,
+            cif_path: Union[Path, str],
+            *,
+            coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+    ) -> Structure:
+        """
+        Cached version of `read_mmcif()`.
+        """
+        return self._read_mmcif(cif_path, coord_dtype=coord_dtype)
+
+    def read_asymmetric_unit(
+            self,
+            cif_path: Union[Path, str],
+            *,
+            coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+    ) -> Atoms:
+        """
+        Cached version of `read_asymmetric_unit()`.
+        """
+        struct = self.read_mmcif(cif_path, coord_dtype=coord_dtype)
+        return struct.asym_atoms
+
+    def read_biological_assembly(
+            self,
+            cif_path: Union[Path, str],
+            *,
+            model_id: str,
+            assembly_id: str,
+            coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+    ) -> Atoms:
+        """
+        Cached version of `read_biological_assembly()`.
+        """
+        entry = self._entry_path(
+                _make_key(
+                    cif_path, 'assembly', str(coord_dtype), model_id, assembly_id,
+                ),
+                suffix='.arrow',
+        )
+
+        if not entry.exists():
+            self._stats.misses += 1
+            struct = self._read_mmcif(
+                    cif_path,
+                    coord_dtype=coord_dtype,
+                    count=False,
+            )
+            atoms = make_biological_assembly(
+                    select_model(struct.asym_atoms, model_id),
+                    struct.assembly_gen,
+                    struct.oper_map,
+                    assembly_id,
+            )
+            self._publish(entry, lambda tmp: _write_ipc(tmp, atoms))
+        else:
+            self._stats.hits += 1
+
+        return pl.read_ipc(entry)
+
+    def remove_stale_files(self) -> None:
+        """
+        Delete any temporary files left behind by processes that died while 
+        writing to the cache.
+
+        This is called automatically when the cache is created, but it may be 
+        worth calling periodically if workers are likely to be killed.
+        """
+        for path in self.root.glob('*.tmp-*'):
+            try:
+                pid = int(path.name.rsplit('-', 1)[1])
+            except ValueError:
+                continue
+
+            if not _is_process_alive(pid):
+                _remove(path)
+
+    def close(self) -> None:
+        """
+        Delete the cache directory, if it's owned by this process.
+
+        This happens automatically when the process exits, so it's usually 
+        not necessary to call this method.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def _read_mmcif(self, cif_path, *, coord_dtype, count=True):
+        entry = self._entry_path(
+                _make_key(cif_path, 'mmcif', str(coord_dtype)),
+        )
+
+        if not entry.exists():
+            if count:
+                self._stats.misses += 1
+            struct = read_mmcif(cif_path, coord_dtype=coord_dtype)
+            self._publish(entry, lambda tmp: _write_structure(tmp, struct))
+        elif count:
+            self._stats.hits += 1
+
+        return _read_structure(entry)
+
+    def _entry_path(self, key, suffix=''):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return self.root / (digest + suffix)
+
+    def _publish(self, entry, write):
+        tmp = entry.with_name(f'{entry.name}.tmp-{os.getpid()}')
+        _remove(tmp)
+        write(tmp)
+
+        try:
+            os.rename(tmp, entry)
+
+        # Another process may have published the same entry in the meantime.  
+        # Its copy is just as good as ours, so discard ours.
+        except OSError:
+            if not entry.exists():
+                raise
+            _remove(tmp)
+
+def _write_structure(path, struct):
+    path.mkdir()
+    meta = {'id': struct.id, 'dataframes': [], 'oper_ids': None}
+
+    for attr, value in vars(struct).items():
+        if isinstance(value, pl.DataFrame):
+            _write_ipc(path / f'{attr}.arrow', value)
+            meta['dataframes'].append(attr)
+
+    if oper_map := getattr(struct, 'oper_map', None):
+        meta['oper_ids'] = list(oper_map)
+        np.save(path / 'oper_map.npy', np.stack(list(oper_map.values())))
+
+    (path / 'meta.json').write_text(json.dumps(meta))
+
+def _read_structure(path):
+    meta = json.loads((path / 'meta.json').read_text())
+
+    struct = Structure(meta['id'])
+
+    for attr in meta['dataframes']:
+        setattr(struct, attr, pl.read_ipc(path / f'{attr}.arrow'))
+
+    if meta['oper_ids'] is not None:
+        frames = np.load(path / 'oper_map.npy', mmap_mode='r')
+        struct.oper_map = dict(zip(meta['oper_ids'], frames))
+
+    return struct
+
+def _write_ipc(path, df):
+    # Compressed files can't be memory-mapped.
+    df.write_ipc(path, compression='uncompressed')
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    elif path.exists():
+        path.unlink()
+
+def _remove_if_owner(root, owner_pid):
+    if os.getpid() == owner_pid:
+        shutil.rmtree(root, ignore_errors=True)
+
+def _is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    else:
+        return True
+
+def _estimate_size(obj: Any) -> int:
+    """
+    Estimate the number of bytes used by the given structure or dataframe.
+    """
+    if isinstance(obj, pl.DataFrame):
+        return obj.estimated_size()
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+
+    if isinstance(obj, Structure):
+        return sum(_estimate_size(x) for x in vars(obj).values())
+
+    if isinstance(obj, dict):
+        return sum(_estimate_size(x) for x in obj.values())
+
+    return 0
+
+def _make_key(cif_path, *args: Hashable):
+    cif_path = Path(cif_path).resolve()
+    mtime_ns = cif_path.stat().st_mtime_ns
+    return (str(cif_path), mtime_ns, *args)
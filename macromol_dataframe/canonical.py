@@ -0,0 +1,254 @@
+import polars as pl
+
+from .atoms import Atoms
+
+from typing import Any, List, Tuple
+
+CANONICAL_KEY_COLS = [
+        'structure_id',
+        'model_id',
+        'symmetry_mate',
+        'subchain_id',
+        'seq_id',
+        'alt_id',
+        'atom_id',
+]
+"""
+The columns that determine the canonical order of the atoms, from most to 
+least significant.  The ``structure_id``, ``model_id``, ``symmetry_mate``, 
+and ``alt_id`` columns are optional; the others are required.
+"""
+
+def canonicalize_atoms(atoms: Atoms) -> Atoms:
+    """
+    Sort the atoms into the canonical order.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms, e.g. `Structure.asym_atoms`.
+
+    Returns:
+        A dataframe with the same rows as *atoms*, sorted by whichever of the 
+        `CANONICAL_KEY_COLS` are present.  Null values come before all other 
+        values, and atoms with identical keys (e.g. waters, which don't have 
+        sequence ids) keep their original relative order.  The first key 
+        column is marked as sorted, which polars preserves through filtering 
+        and slicing, but not through any operation that might reorder the 
+        rows.
+
+    In the canonical order, the atoms belonging to each chain, residue, and 
+    alternate conformation are contiguous.  Some functions take advantage of 
+    this when it's available, e.g. `assign_residue_ids()`, and `AtomIndex` 
+    uses it to look up atoms by binary search.
+    """
+    if is_canonical_atoms(atoms):
+        return atoms
+
+    key_cols = _get_key_cols(atoms)
+    return (
+            atoms
+            .sort(key_cols, nulls_last=False, maintain_order=True)
+            .set_sorted(key_cols[0])
+    )
+
+def is_canonical_atoms(atoms: Atoms) -> bool:
+    """
+    Return True if the atoms are in the order produced by 
+    `canonicalize_atoms()`.
+
+    This check is fast for most dataframes that aren't in canonical order, 
+    because it first looks to see if the most significant key column is 
+    marked as sorted.  Otherwise, it takes a single pass over the key columns.
+    """
+    key_cols = _get_key_cols(atoms)
+
+    if not set(key_cols) <= set(atoms.columns):
+        return False
+
+    if not atoms.get_column(key_cols[0]).flags['SORTED_ASC']:
+        return False
+
+    # Compare each row to the previous one, column by column, until reaching 
+    # a column where they differ.
+    out_of_order = pl.lit(False)
+    tied = pl.lit(True)
+
+    for col in key_cols:
+        curr = pl.col(col)
+        prev = pl.col(col).shift(1)
+
+        is_less = (
+                (curr < prev).fill_null(False) |
+                (curr.is_null() & prev.is_not_null())
+        )
+        out_of_order = out_of_order | (tied & is_less)
+        tied = tied & curr.eq_missing(prev)
+
+    return not atoms.select(out_of_order.any()).item()
+
+class AtomIndex:
+    """
+    Look up chains, residues, and atoms by binary search.
+
+    Selecting a single residue with `polars.DataFrame.filter` requires 
+    comparing every row of the dataframe to the residue in question.  That's 
+    fine for one-off queries, but not for repeatedly looking up residues in a 
+    large structure.  This index keeps the atoms in canonical order (see 
+    `canonicalize_atoms()`), so that the atoms matching any prefix of the key 
+    columns form a contiguous block.  Each lookup then takes O(log N) time, 
+    where N is the number of atoms, and returns a zero-copy slice of the 
+    dataframe.
+
+    The index doesn't store anything besides the canonical dataframe itself, 
+    so it's cheap to create once the atoms are in canonical order.
+    """
+
+    def __init__(self, atoms: Atoms):
+        """
+        Arguments:
+            atoms:
+                A dataframe of atoms.  The atoms will be put into canonical 
+                order, if they aren't already.
+        """
+        self.atoms = canonicalize_atoms(atoms)
+        self._key_cols = _get_key_cols(self.atoms)
+
+    def __len__(self):
+        return self.atoms.height
+
+    def get_chain(self, subchain_id: str, **ids: Any) -> Atoms:
+        """
+        Get all of the atoms in the given chain.
+
+        Arguments:
+            subchain_id:
+                The chain to look up.
+
+            ids:
+                Values for any of the optional key columns, e.g. ``model_id`` 
+                or ``symmetry_mate``.  If the dataframe has one of these 
+                columns and no value is given, the atoms matching every value 
+                will be returned.
+
+        Returns:
+            A dataframe with the same columns as `atoms`, and the rows for 
+            the requested chain.  If the chain doesn't exist, the dataframe 
+            will be empty.
+        """
+        return self.select(subchain_id=subchain_id, **ids)
+
+    def get_residue(
+            self,
+            subchain_id: str,
+            seq_id: int,
+            **ids: Any,
+    ) -> Atoms:
+        """
+        Get all of the atoms in the given residue.
+
+        The arguments and return value are the same as for `get_chain()`.  
+        Note that atoms without sequence ids (e.g. waters) can be requested 
+        by passing ``seq_id=None``.
+        """
+        return self.select(subchain_id=subchain_id, seq_id=seq_id, **ids)
+
+    def get_atom(
+            self,
+            subchain_id: str,
+            seq_id: int,
+            atom_id: str,
+            **ids: Any,
+    ) -> Atoms:
+        """
+        Get the given atom.
+
+        The arguments and return value are the same as for `get_chain()`.  
+        If ``alt_id`` isn't specified, every alternate location of the atom 
+        is returned.  Pass ``alt_id=None`` to only get the location without 
+        an alternate location id.
+        """
+        return self.select(
+                subchain_id=subchain_id,
+                seq_id=seq_id,
+                atom_id=atom_id,
+                **ids,
+        )
+
+    def select(self, **ids: Any) -> Atoms:
+        """
+        Get the atoms with the given values for any of the key columns.
+
+        Arguments:
+            ids:
+                The values to look up, keyed by column name.  Only the 
+                columns in `CANONICAL_KEY_COLS` can be used.  Columns that 
+                aren't given are unconstrained.
+
+        Returns:
+            A dataframe with the same columns as `atoms`, and the rows that 
+            match every given value.  If these rows are contiguous, which is 
+            the case whenever no column is left unconstrained before the 
+            last constrained column, the dataframe will be a zero-copy slice.
+        """
+        unknown_cols = set(ids) - set(self._key_cols)
+        if unknown_cols:
+            unknown_str = ', '.join(sorted(unknown_cols))
+            raise ValueError(f"can't look up atoms by: {unknown_str}")
+
+        # Ignore any unconstrained columns after the last constrained one, 
+        # since these don't affect which rows are selected.
+        key_cols = self._key_cols
+        while key_cols and key_cols[-1] not in ids:
+            key_cols = key_cols[:-1]
+
+        ranges = self._find_ranges(key_cols, ids, 0, self.atoms.height)
+
+        if not ranges:
+            return self.atoms.clear()
+
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            return self.atoms.slice(start, stop - start)
+
+        return pl.concat([
+            self.atoms.slice(start, stop - start)
+            for start, stop in ranges
+        ])
+
+    def _find_ranges(
+            self,
+            key_cols: List[str],
+            ids: dict,
+            start: int,
+            stop: int,
+    ) -> List[Tuple[int, int]]:
+        if not key_cols or start == stop:
+            return [(start, stop)]
+
+        col, *key_cols = key_cols
+        keys = self.atoms.get_column(col).slice(start, stop - start)
+
+        if col in ids:
+            value = ids[col]
+            i = start + keys.search_sorted(value, 'left')
+            j = start + keys.search_sorted(value, 'right')
+            return self._find_ranges(key_cols, ids, i, j) if i < j else []
+
+        # If this column is unconstrained, search each distinct value 
+        # separately.  There should only be a few, e.g. a handful of models 
+        # or alternate locations.
+        ranges = []
+
+        while start < stop:
+            j = start + keys.search_sorted(keys[0], 'right')
+            ranges += self._find_ranges(key_cols, ids, start, j)
+            keys = keys.slice(j - start)
+            start = j
+
+        return ranges
+
+def _get_key_cols(atoms):
+    return [
+            x for x in CANONICAL_KEY_COLS
+            if x in atoms.columns or x in ('subchain_id', 'seq_id', 'atom_id')
+    ]
@@ -0,0 +1,474 @@
+"""\
+Convert, index, or cache every mmCIF file in a directory tree.
+
+The files are divided into shards, which are processed in parallel.  Each 
+shard produces one output file, and the outcome for each input file is 
+recorded in a checkpoint, so an interrupted run can be resumed by simply 
+running the same command again.
+"""
+
+import polars as pl
+import argparse
+import json
+import sys
+import os
+import re
+
+from .dataset import _read_atoms
+from .index import read_mmcif_header
+from .cache import SharedStructureCache
+from .error import TidyError
+from .parallel import map_processes
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO
+
+COORD_DTYPES = {
+        'float64': pl.Float64,
+        'float32': pl.Float32,
+        'int32': pl.Int32,
+}
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+            prog='macromol-dataframe',
+            description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert = commands.add_parser(
+            'convert',
+            help="write the atoms from each file to parquet",
+            description="""\
+Write the atoms from each file to parquet.  Each shard is a single parquet 
+file with a `structure_id` column identifying which structure each atom came 
+from.  Use `polars.scan_parquet('OUT_DIR/*.parquet')` to query every shard 
+at once.
+""",
+    )
+    _add_common_args(convert, 'out_dir', "the directory to write the shards to")
+    _add_structure_args(convert)
+
+    index = commands.add_parser(
+            'index',
+            help="summarize the models and assemblies in each file",
+            description="""\
+Summarize the models and assemblies in each file, see `read_mmcif_header()`.  
+Each shard is a single parquet file with the columns in `INDEX_SCHEMA`.
+""",
+    )
+    _add_common_args(index, 'out_dir', "the directory to write the shards to")
+    index.add_argument(
+            '-H', '--hashes', action='store_true',
+            help="also hash the asymmetric unit of each model, to help find duplicates",
+    )
+
+    cache = commands.add_parser(
+            'cache',
+            help="parse each file into a shared structure cache",
+            description="""\
+Parse each file into a `SharedStructureCache`.  The cache directory will not 
+be deleted when this command exits, so it can be used by any number of 
+subsequent processes.
+""",
+    )
+    _add_common_args(cache, 'cache_dir', "the cache directory")
+    _add_structure_args(cache)
+
+    args = parser.parse_args(argv)
+    coord_dtype = COORD_DTYPES[getattr(args, 'coord_dtype', 'float64')]
+
+    if args.command == 'convert':
+        out_dir = Path(args.out_dir)
+        read = partial(
+                _read_atoms,
+                assembly_id=args.assembly,
+                model_id=args.model,
+                coord_dtype=coord_dtype,
+        )
+        write = _write_parquet
+
+    elif args.command == 'index':
+        out_dir = Path(args.out_dir)
+        read = partial(read_mmcif_header, hashes=args.hashes)
+        write = _write_parquet
+
+    elif args.command == 'cache':
+        out_dir = Path(args.cache_dir)
+
+        # Create the directory before the cache does, so that the cache 
+        # doesn't consider itself the owner and delete the directory on exit.
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        read = partial(
+                _cache_structure,
+                SharedStructureCache(out_dir),
+                assembly_id=args.assembly,
+                model_id=args.model,
+                coord_dtype=coord_dtype,
+        )
+        write = None
+
+    else:
+        raise AssertionError(args.command)
+
+    run_shards(
+            _find_inputs(Path(args.in_dir), args.suffix),
+            out_dir,
+            read=read,
+            write=write,
+            checkpoint_path=args.checkpoint,
+            shard_size=args.shard_size,
+            processes=args.processes,
+            retry_failed=args.retry_failed,
+    )
+
+def run_shards(
+        inputs: Dict[str, Path],
+        out_dir: Path,
+        *,
+        read: Callable[[Path], Optional[pl.DataFrame]],
+        write: Optional[Callable[[pl.DataFrame, Path], None]],
+        checkpoint_path: Optional[Path] = None,
+        shard_size: int = 100,
+        processes: Optional[int] = None,
+        retry_failed: bool = False,
+        log: Optional[TextIO] = None,
+) -> 'Progress':
+    """
+    Process the given files in parallel, with resumable checkpoints.
+
+    Arguments:
+        inputs:
+            A mapping from unique ids to the paths of the files to process.  
+            The ids are used in the checkpoint file, and must be valid JSON 
+            strings.
+
+        out_dir:
+            The directory where the shards and the checkpoint file will be 
+            written.  Any shard files in this directory that aren't recorded 
+            in the checkpoint are assumed to be left over from an 
+            interrupted run, and are deleted.  For this reason, two runs 
+            should never share the same output directory at the same time.
+
+        read:
+            A function that will be called on each path.  If it returns a 
+            dataframe, the dataframes for every path in a shard will be 
+            concatenated and passed to *write*.  Any exception raised by this 
+            function will be recorded in the checkpoint, and the path will be 
+            skipped.  This function must be picklable, and will be called in a 
+            worker process.
+
+        write:
+            A function that will be called to write each shard.  It will be 
+            given the concatenated dataframe and the path to write to.
+
+        checkpoint_path:
+            The path to the checkpoint file.  By default, this is 
+            ``checkpoint.jsonl`` in the output directory.  The file has one 
+            JSON object per line, each with ``id`` and ``status`` keys.  The 
+            status is either ``done``, in which case there is also a 
+            ``shard`` key with the name of the shard containing the output, 
+            or ``failed``, in which case there is also an ``error`` key 
+            describing the exception.  For `MmcifError` and other 
+            `TidyError` exceptions, the error includes the ``brief``, 
+            ``info``, and ``blame`` messages.
+
+        shard_size:
+            The number of files in each shard.  The memory used by each 
+            worker is proportional to this number.
+
+        processes:
+            The number of worker processes.  By default, this is the number of 
+            CPUs.  If 1, every shard is processed in the current process.  To 
+            limit memory usage, at most two shards per worker are in flight at 
+            any time.
+
+        retry_failed:
+            If True, files that failed in a previous run will be attempted 
+            again.  Otherwise, they will be skipped.
+
+        log:
+            A file where progress and throughput will be reported.  By 
+            default, this is stderr.
+
+    Returns:
+        A summary of the files that were processed by this call.
+    """
+    log = log or sys.stderr
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = Path(checkpoint_path or out_dir / 'checkpoint.jsonl')
+    checkpoint = _read_checkpoint(checkpoint_path)
+
+    skip_statuses = {'done'} if retry_failed else {'done', 'failed'}
+    todo = {
+            k: Path(v) for k, v in inputs.items()
+            if checkpoint.get(k, {}).get('status') not in skip_statuses
+    }
+    shard_names = {
+            x['shard'] for x in checkpoint.values()
+            if x.get('shard') is not None
+    }
+    _remove_orphan_shards(out_dir, shard_names)
+
+    first_shard = max(map(_parse_shard_index, shard_names), default=-1) + 1
+    ids = list(todo)
+    shards = [
+            _Shard(
+                name=_format_shard_name(first_shard + i),
+                ids=ids[j:j + shard_size],
+                paths=[todo[k] for k in ids[j:j + shard_size]],
+                out_dir=out_dir,
+                read=read,
+                write=write,
+            )
+            for i, j in enumerate(range(0, len(ids), shard_size))
+    ]
+
+    progress = Progress(
+            num_total=len(todo),
+            num_skipped=len(inputs) - len(todo),
+    )
+    print(progress.format_start(), file=log, flush=True)
+
+    with open(checkpoint_path, 'a') as f:
+        def record(result):
+            result.publish()
+            _append_checkpoint(f, result)
+            progress.update(result)
+            print(progress.format(), file=log, flush=True)
+
+        for result in map_processes(
+                _process_shard,
+                shards,
+                processes=processes,
+        ):
+            record(result)
+
+    print(progress.format_end(), file=log, flush=True)
+    return progress
+
+@dataclass
+class Progress:
+    """
+    Counts of the files processed by `run_shards()`, and the rate at which 
+    they were processed.
+    """
+    num_total: int
+    num_skipped: int = 0
+    num_done: int = 0
+    num_failed: int = 0
+    num_rows: int = 0
+    start_time: float = field(default_factory=perf_counter)
+
+    @property
+    def elapsed_s(self) -> float:
+        return perf_counter() - self.start_time
+
+    def update(self, result: '_ShardResult') -> None:
+        self.num_done += len(result.done_ids)
+        self.num_failed += len(result.failures)
+        self.num_rows += result.num_rows
+
+    def format_start(self) -> str:
+        return f"processing {self.num_total} files ({self.num_skipped} already done)"
+
+    def format(self) -> str:
+        n = self.num_done + self.num_failed
+        t = max(self.elapsed_s, 1e-9)
+        return (
+                f"[{n}/{self.num_total}] "
+                f"{self.num_failed} failed, "
+                f"{n / t:.1f} files/s, "
+                f"{self.num_rows / t:.0f} rows/s"
+        )
+
+    def format_end(self) -> str:
+        return (
+                f"finished {self.num_done + self.num_failed} files "
+                f"({self.num_failed} failed) in {self.elapsed_s:.1f}s"
+        )
+
+@dataclass
+class _Shard:
+    name: str
+    ids: List[str]
+    paths: List[Path]
+    out_dir: Path
+    read: Callable
+    write: Optional[Callable]
+
+@dataclass
+class _ShardResult:
+    name: str
+    done_ids: List[str]
+    failures: Dict[str, Dict[str, Any]]
+    num_rows: int
+    tmp_path: Optional[Path]
+    out_path: Optional[Path]
+
+    def publish(self):
+        if self.tmp_path is not None:
+            os.replace(self.tmp_path, self.out_path)
+
+def _process_shard(shard):
+    dfs = []
+    done_ids = []
+    failures = {}
+
+    for id, path in zip(shard.ids, shard.paths):
+        try:
+            df = shard.read(path)
+        except Exception as err:
+            failures[id] = _describe_error(err)
+        else:
+            done_ids.append(id)
+            if df is not None:
+                dfs.append(df)
+
+    num_rows = sum(x.height for x in dfs)
+    tmp_path = out_path = None
+
+    # Write to a temporary path, so that the shard only appears once it's 
+    # complete.  The main process renames it after the worker finishes.
+    if shard.write is not None and dfs:
+        out_path = shard.out_dir / f'{shard.name}.parquet'
+        tmp_path = shard.out_dir / f'{shard.name}.parquet.tmp-{os.getpid()}'
+        shard.write(pl.concat(dfs, how='diagonal_relaxed'), tmp_path)
+
+    return _ShardResult(
+            name=shard.name,
+            done_ids=done_ids,
+            failures=failures,
+            num_rows=num_rows,
+            tmp_path=tmp_path,
+            out_path=out_path,
+    )
+
+def _cache_structure(cache, cif_path, *, assembly_id, model_id, coord_dtype):
+    if assembly_id is None:
+        cache.read_mmcif(cif_path, coord_dtype=coord_dtype)
+    else:
+        cache.read_biological_assembly(
+                cif_path,
+                model_id=model_id,
+                assembly_id=assembly_id,
+                coord_dtype=coord_dtype,
+        )
+
+def _write_parquet(df, path):
+    df.write_parquet(path)
+
+def _describe_error(err):
+    error = {'type': type(err).__name__}
+
+    if isinstance(err, TidyError):
+        error['brief'] = err.brief
+        error['info'] = list(err.info)
+        error['blame'] = list(err.blame)
+    else:
+        error['message'] = str(err)
+
+    return error
+
+def _find_inputs(in_dir, suffix):
+    return {
+            str(path.relative_to(in_dir)): path
+            for path in sorted(in_dir.rglob(f'*{suffix}'))
+    }
+
+def _read_checkpoint(path):
+    checkpoint = {}
+
+    if path.exists():
+        for line in path.read_text().splitlines():
+            # The last line may be incomplete, if the previous run was killed 
+            # while writing it.
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            checkpoint[entry['id']] = entry
+
+    return checkpoint
+
+def _append_checkpoint(f, result):
+    # Make sure any incomplete line left by a killed process is terminated, 
+    # so that it doesn't corrupt the next entry.
+    if f.tell() > 0:
+        f.write('\n')
+
+    lines = [
+            *(
+                dict(id=id, status='done', shard=result.out_path and result.name)
+                for id in result.done_ids
+            ),
+            *(
+                dict(id=id, status='failed', error=error)
+                for id, error in result.failures.items()
+            ),
+    ]
+    f.write('\n'.join(json.dumps(x) for x in lines))
+    f.flush()
+    os.fsync(f.fileno())
+
+def _remove_orphan_shards(out_dir, shard_names):
+    for path in out_dir.glob('shard-*.parquet*'):
+        name = path.name.split('.')[0]
+        if '.tmp-' in path.name or name not in shard_names:
+            path.unlink()
+
+def _format_shard_name(i):
+    return f'shard-{i:06d}'
+
+def _parse_shard_index(name):
+    return int(re.fullmatch(r'shard-(\d+)', name).group(1))
+
+def _add_common_args(parser, out_name, out_help):
+    parser.add_argument(
+            'in_dir',
+            help="the directory to search for input files, recursively",
+    )
+    parser.add_argument(out_name, help=out_help)
+    parser.add_argument(
+            '-s', '--suffix', default='.cif.gz',
+            help="the file extension of the input files (default: %(default)s)",
+    )
+    parser.add_argument(
+            '-j', '--processes', type=int,
+            help="the number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+            '-n', '--shard-size', type=int, default=100,
+            help="the number of input files per shard (default: %(default)s)",
+    )
+    parser.add_argument(
+            '-c', '--checkpoint', type=Path,
+            help="the path to the checkpoint file (default: OUT_DIR/checkpoint.jsonl)",
+    )
+    parser.add_argument(
+            '-r', '--retry-failed', action='store_true',
+            help="attempt files that failed in previous runs again",
+    )
+
+def _add_structure_args(parser):
+    parser.add_argument(
+            '-a', '--assembly', metavar='ID',
+            help="generate the given biological assembly, instead of using the asymmetric unit",
+    )
+    parser.add_argument(
+            '-m', '--model', metavar='ID', default='1',
+            help="the model to use when generating an assembly (default: %(default)s)",
+    )
+    parser.add_argument(
+            '-d', '--coord-dtype', choices=list(COORD_DTYPES), default='float64',
+            help="the data type of the coordinate columns (default: %(default)s)",
+    )
+
+if __name__ == '__main__':
+    main()
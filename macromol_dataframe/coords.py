@@ -1,9 +1,11 @@
 import numpy as np
 
-from scipy.spatial.transform import Rotation
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from typing_extensions import TypeAlias, Annotated
 
+if TYPE_CHECKING:
+    from scipy.spatial.transform import Rotation
+
 try:
     from numpy.typing import NDArray
 except ImportError:
@@ -50,21 +52,52 @@ Coords3: TypeAlias = Annotated[NDArray[float], (-1, 3)]
 Coords4: TypeAlias = Annotated[NDArray[float], (-1, 4)]
 Matrix33: TypeAlias = Annotated[NDArray[float], (3, 3)]
 Frame: TypeAlias = Annotated[NDArray[float], (4, 4)]
+Frames: TypeAlias = Annotated[NDArray[float], (-1, 4, 4)]
+
+"""\
+Arrays of frames 
+================ 
+Each of the functions that create or manipulate coordinate frames also accepts 
+arrays of inputs, in which case it returns an array of frames.  The leading 
+dimensions of the inputs are broadcast against each other, following the 
+usual numpy rules.  For example, `make_coord_frame_from_rotation_matrix()` 
+accepts origins with shape (N, 3) and rotation matrices with shape (N, 3, 3), 
+and returns frames with shape (N, 4, 4).  All of the calculations are 
+vectorized, so building thousands of frames at once is not much slower than 
+building one.
+"""
+
+"""\
+Precision 
+========= 
+None of these functions will silently change the precision of their inputs.  
+Frames are created with the same precision as the given origins, unless a 
+*dtype* is explicitly specified, and coordinates are transformed with the same 
+precision that they already have.  This makes it possible to work entirely in 
+single precision, e.g. by parsing structures with ``coord_dtype=pl.Float32``, 
+which halves the memory needed to store coordinates.
+"""
 
 def make_coord_frame(
         origin: Coord,
-        rotation: Optional[Rotation] = None,
+        rotation: Optional['Rotation'] = None,
+        *,
+        dtype: Optional[np.dtype] = None,
 ) -> Frame:
+    origin = np.asarray(origin)
+
     if rotation is None:
         rot_mat = np.eye(3)
     else:
         rot_mat = rotation.as_matrix()
 
-    return make_coord_frame_from_rotation_matrix(origin, rot_mat)
+    return make_coord_frame_from_rotation_matrix(origin, rot_mat, dtype=dtype)
 
 def make_coord_frame_from_rotation_vector(
         origin: Coord,
         rot_vec_rad: Coord,
+        *,
+        dtype: Optional[np.dtype] = None,
 ) -> Frame:
     """\
     Provide a convenient way to construct coordinate frame matrices.
@@ -94,53 +127,233 @@ def make_coord_frame_from_rotation_vector(
             same frame, the second would appear to be a -90° rotation or the 
             first.  This happens because it's the *coordinate frame* that's 
             being rotated by 90°, not the coordinates themselves.
+
+        dtype:
+            The data type of the resulting matrix.  By default, this is the 
+            same as the data type of *origin*, if that is a floating point 
+            type, or double precision otherwise.
     """
-    return make_coord_frame(origin, Rotation.from_rotvec(rot_vec_rad))
+    # Scipy is slow to import, and most of the functions in this module don't 
+    # need it.
+    from scipy.spatial.transform import Rotation
+
+    rotation = Rotation.from_rotvec(rot_vec_rad)
+    return make_coord_frame(origin, rotation, dtype=dtype)
 
 def make_coord_frame_from_rotation_matrix(
         origin: Coord,
         rot_matrix: Matrix33,
+        *,
+        dtype: Optional[np.dtype] = None,
 ):
-    assert origin.size == 3
-    assert rot_matrix.shape == (3, 3)
+    origin = np.asarray(origin)
+    rot_matrix = np.asarray(rot_matrix)
+
+    # For backwards compatibility, accept single origins of any shape, e.g. 
+    # (3, 1).
+    if origin.size == 3:
+        origin = origin.reshape(3)
 
-    frame_yx = np.eye(4)
-    frame_yx[0:3, 0:3] = rot_matrix
-    frame_yx[0:3,   3] = origin.ravel()
+    assert origin.shape[-1] == 3
+    assert rot_matrix.shape[-2:] == (3, 3)
 
-    # We need to invert the matrix, because the arguments are both from the 
-    # perspective of frame X, but the actual components of the matrix have to 
-    # be from the perspective of frame Y.
+    # The arguments are both from the perspective of frame X, but the actual 
+    # components of the matrix have to be from the perspective of frame Y.  So 
+    # rather than building the matrix and then inverting it, we directly fill 
+    # in the components of the inverse.
 
-    return invert_coord_frame(frame_yx)
+    rot_inv = _transpose(rot_matrix)
+    shape = np.broadcast_shapes(origin.shape[:-1], rot_matrix.shape[:-2])
+
+    frame_xy = np.zeros((*shape, 4, 4), dtype=dtype or _float_dtype(origin))
+    frame_xy[..., 0:3, 0:3] = rot_inv
+    frame_xy[..., 0:3,   3] = -_matvec(rot_inv, origin)
+    frame_xy[..., 3, 3] = 1
+
+    return frame_xy
 
 def invert_coord_frame(frame: Frame) -> Frame:
-    assert frame.shape == (4, 4)
+    assert frame.shape[-2:] == (4, 4)
 
     # https://math.stackexchange.com/questions/1234948/inverse-of-a-rigid-transformation
 
-    r_inv = frame[0:3, 0:3].T
+    r_inv = _transpose(frame[..., 0:3, 0:3])
 
-    inv = np.eye(4)
-    inv[0:3, 0:3] = r_inv
-    inv[0:3,   3] = -r_inv @ frame[0:3, 3]
+    inv = np.zeros(frame.shape, dtype=frame.dtype)
+    inv[..., 0:3, 0:3] = r_inv
+    inv[..., 0:3,   3] = -_matvec(r_inv, frame[..., 0:3, 3])
+    inv[..., 3, 3] = 1
 
     return inv
 
 def get_origin(frame: Frame):
-    frame = invert_coord_frame(frame)
-    return frame[0:3, 3]
+    # The origin is the translation component of the inverted frame.  We 
+    # only need that one column, so calculate it directly instead of inverting 
+    # the whole matrix.
+    r_inv = _transpose(frame[..., 0:3, 0:3])
+    return -_matvec(r_inv, frame[..., 0:3, 3])
 
 def get_rotation_matrix(frame: Frame):
-    frame = invert_coord_frame(frame)
-    return frame[0:3, 0:3]
+    return _transpose(frame[..., 0:3, 0:3])
 
 
 def transform_coords(coords_x: Coords4, frame_xy: Frame) -> Coords4:
+    """
+    Apply the given transformation to the given coordinates.
+
+    Arguments:
+        coords_x:
+            An array of homogeneous coordinates in frame X, with shape (..., 
+            4).
+
+        frame_xy:
+            A matrix, or an array of matrices, that transform coordinates from 
+            frame X to frame Y.  The shape must be (..., 4, 4).
+
+    Returns:
+        The coordinates in frame Y.  If *frame_xy* is an array of N matrices 
+        and *coords_x* has shape (M, 4), the result will have shape (N, M, 4), 
+        i.e. every coordinate will be transformed by every frame.  If 
+        *coords_x* instead has shape (N, M, 4), each set of coordinates will 
+        be transformed by the corresponding frame.  The coordinates keep their 
+        precision, regardless of the precision of the frames.
+    """
     assert coords_x.shape[-1] == 4
-    return coords_x @ frame_xy.T
+    frame_xy = frame_xy.astype(_float_dtype(coords_x), copy=False)
+    return coords_x @ _transpose(frame_xy)
+
+def superimpose_coords(
+        coords_x: Coords3,
+        coords_y: Coords3,
+        weights: Optional[NDArray[float]] = None,
+) -> Frame:
+    """
+    Find the rigid-body transformation that best superimposes one set of 
+    coordinates onto another.
+
+    Arguments:
+        coords_x:
+            An array of coordinates with shape (..., M, 3).
+
+        coords_y:
+            An array of coordinates with the same shape as *coords_x*.  Each 
+            coordinate is paired with the coordinate at the same index in 
+            *coords_x*.
+
+        weights:
+            An optional array of weights with shape (..., M), e.g. atom 
+            occupancies.  By default, every pair of coordinates is weighted 
+            equally.
+
+    Returns:
+        A matrix that transforms coordinates from frame X to frame Y, chosen 
+        to minimize the (weighted) RMSD between the transformed *coords_x* and 
+        *coords_y*.  If the inputs have leading dimensions, an array of 
+        matrices with shape (..., 4, 4) is returned, one for each set of 
+        coordinates.  The matrices can be passed directly to 
+        `transform_coords()`.
+
+    The transformation is found using the Kabsch algorithm, which requires a 
+    single SVD of a 3x3 matrix for each set of coordinates.  All of the sets 
+    are processed at once.
+    """
+    coords_x = np.asarray(coords_x)
+    coords_y = np.asarray(coords_y)
+
+    assert coords_x.shape[-1] == 3
+    assert coords_x.shape == coords_y.shape
+
+    dtype = _float_dtype(coords_x)
+
+    if weights is None:
+        weights = np.ones(coords_x.shape[:-1], dtype=dtype)
+    else:
+        weights = np.asarray(weights, dtype=dtype)
+
+    weights = weights / weights.sum(axis=-1, keepdims=True)
+    weights = weights[..., np.newaxis]
+
+    center_x = np.sum(weights * coords_x, axis=-2)
+    center_y = np.sum(weights * coords_y, axis=-2)
+
+    dx = coords_x - center_x[..., np.newaxis, :]
+    dy = coords_y - center_y[..., np.newaxis, :]
+
+    # Find the rotation that best aligns the two centered point clouds.  The 
+    # sign correction prevents the result from being a reflection.
+    h = _transpose(weights * dx) @ dy
+    u, _, vt = np.linalg.svd(h)
+    v = _transpose(vt)
+
+    d = np.sign(np.linalg.det(v @ _transpose(u)))
+    v[..., :, 2] *= d[..., np.newaxis]
+    rot_matrix = v @ _transpose(u)
+
+    shape = rot_matrix.shape[:-2]
+    frame_xy = np.zeros((*shape, 4, 4), dtype=dtype)
+    frame_xy[..., 0:3, 0:3] = rot_matrix
+    frame_xy[..., 0:3,   3] = center_y - _matvec(rot_matrix, center_x)
+    frame_xy[..., 3, 3] = 1
+
+    return frame_xy
+
+def calc_rmsd(
+        coords_x: Coords3,
+        coords_y: Coords3,
+        weights: Optional[NDArray[float]] = None,
+):
+    """
+    Calculate the root-mean-square deviation between two sets of coordinates.
+
+    Arguments:
+        coords_x:
+            An array of coordinates with shape (..., M, 3).
+
+        coords_y:
+            An array of coordinates with the same shape as *coords_x*.
+
+        weights:
+            An optional array of weights with shape (..., M).  By default, 
+            every pair of coordinates is weighted equally.
+
+    Returns:
+        The RMSD, or an array of RMSDs with shape (...) if the inputs have 
+        leading dimensions.
+
+    The coordinates are compared as they are.  To get the RMSD after optimal 
+    superposition, first transform *coords_x* by the frame returned by 
+    `superimpose_coords()`.
+    """
+    coords_x = np.asarray(coords_x)
+    coords_y = np.asarray(coords_y)
+
+    assert coords_x.shape[-1] == 3
+    assert coords_x.shape == coords_y.shape
+
+    dist2 = np.sum((coords_x - coords_y)**2, axis=-1)
+
+    if weights is None:
+        msd = np.mean(dist2, axis=-1)
+    else:
+        weights = np.asarray(weights)
+        msd = np.sum(weights * dist2, axis=-1) / np.sum(weights, axis=-1)
+
+    return np.sqrt(msd)
 
 def homogenize_coords(coords: Coords3) -> Coords4:
     assert coords.shape[-1] == 3
     shape = *coords.shape[:-1], 1
-    return np.hstack((coords, np.ones(shape)))
+    ones = np.ones(shape, dtype=_float_dtype(coords))
+    return np.concatenate((coords, ones), axis=-1)
+
+def _float_dtype(array):
+    if np.issubdtype(array.dtype, np.floating):
+        return array.dtype
+    else:
+        return np.dtype(float)
+
+def _transpose(matrices):
+    return np.swapaxes(matrices, -1, -2)
+
+def _matvec(matrices, vectors):
+    return np.einsum('...ij,...j->...i', matrices, vectors)
@@ -0,0 +1,191 @@
+import polars as pl
+import numpy as np
+import gemmi
+
+from .atoms import Atoms, get_atom_coords
+from .coords import Frames, transform_coords, homogenize_coords
+from .mmcif import AssemblyTemplate
+from itertools import product
+from scipy.spatial import cKDTree
+
+def make_crystal_packing(
+        asym_atoms: Atoms,
+        unit_cell: pl.DataFrame,
+        *,
+        cutoff_A: float,
+) -> Atoms:
+    """
+    Surround the asymmetric unit with its neighbors in the crystal lattice.
+
+    Arguments:
+        asym_atoms:
+            The atoms in the asymmetric unit, e.g. `Structure.asym_atoms`.  If 
+            this dataframe contains multiple models, use `select_model()` to 
+            pick one first.
+
+        unit_cell:
+            The dimensions of the unit cell and the space group of the 
+            crystal, e.g. `Structure.unit_cell` (which is only parsed if 
+            `read_mmcif()` is called with ``unit_cell=True``).
+
+        cutoff_A:
+            Only symmetry mates with at least one atom within this distance 
+            of the asymmetric unit will be included.
+
+    Returns:
+        A dataframe with the same columns as *asym_atoms*, plus a 
+        ``symmetry_mate`` column.  The asymmetric unit itself is symmetry mate 
+        0, and the remaining mates are numbered in the same order as the 
+        frames returned by `find_crystal_symmetry_mates()`.
+
+    Crystal contacts are not biologically relevant, but they do affect the 
+    conformation of the asymmetric unit.  This function makes it possible to 
+    see the environment that each atom actually experienced in the crystal.
+
+    The packing is built with `AssemblyTemplate.from_frames()`.  To build the 
+    same packing repeatedly with different coordinates, e.g. for each model 
+    of an ensemble, create the template once and call 
+    `AssemblyTemplate.replace_coords()` instead of calling this function 
+    repeatedly.
+    """
+    frames_xy = find_crystal_symmetry_mates(
+            asym_atoms,
+            unit_cell,
+            cutoff_A=cutoff_A,
+    )
+
+    return AssemblyTemplate.from_frames(asym_atoms, frames_xy).atoms
+
+def find_crystal_symmetry_mates(
+        asym_atoms: Atoms,
+        unit_cell: pl.DataFrame,
+        *,
+        cutoff_A: float,
+) -> Frames:
+    """
+    Find the transformations that generate each symmetry mate within the given 
+    distance of the asymmetric unit.
+
+    Arguments:
+        asym_atoms:
+            The atoms in the asymmetric unit.
+
+        unit_cell:
+            The dimensions of the unit cell and the space group of the 
+            crystal, e.g. `Structure.unit_cell`.
+
+        cutoff_A:
+            Only symmetry mates with at least one atom within this distance 
+            of the asymmetric unit will be included.
+
+    Returns:
+        An array of matrices with shape (N, 4, 4).  Each transforms the 
+        asymmetric unit into one of its symmetry mates, e.g. via 
+        `transform_atom_coords()`.  The first matrix is always the identity.
+
+    Every combination of a space group operator and a unit cell translation 
+    gives a potential symmetry mate.  Most of these are far from the 
+    asymmetric unit, so they are discarded in three increasingly expensive 
+    steps:
+
+    - Translations that can't possibly bring the fractional bounding box of 
+      the asymmetric unit within the cutoff are never generated.
+    - Mates whose Cartesian bounding boxes are farther apart than the cutoff 
+      are discarded without transforming any atoms.
+    - The remaining mates are transformed, and kept only if at least one atom 
+      is within the cutoff of the asymmetric unit.
+    """
+    cell, space_group = _parse_unit_cell(unit_cell)
+
+    frac_xf = _make_frame(cell.frac)
+    orth_fx = _make_frame(cell.orth)
+
+    coords_x = get_atom_coords(asym_atoms).astype(float)
+    if len(coords_x) == 0:
+        return np.eye(4)[np.newaxis]
+
+    # Find candidate translations in fractional coordinates.  A distance of 
+    # `cutoff_A` can't change any fractional coordinate by more than the norm 
+    # of the corresponding row of the fractionalization matrix.
+    coords_f = coords_x @ frac_xf[0:3, 0:3].T + frac_xf[0:3, 3]
+    lo_f, hi_f = coords_f.min(axis=0), coords_f.max(axis=0)
+    center_f = (lo_f + hi_f) / 2
+    half_f = (hi_f - lo_f) / 2
+    cutoff_f = cutoff_A * np.linalg.norm(frac_xf[0:3, 0:3], axis=1)
+
+    frames_f = []
+
+    for op in space_group.operations():
+        rot_f = np.array(op.rot, dtype=float) / op.DEN
+        tran_f = np.array(op.tran, dtype=float) / op.DEN
+
+        mate_center_f = rot_f @ center_f + tran_f
+        mate_half_f = np.abs(rot_f) @ half_f
+        slack_f = half_f + mate_half_f + cutoff_f
+
+        shift_lo = np.ceil(center_f - mate_center_f - slack_f).astype(int)
+        shift_hi = np.floor(center_f - mate_center_f + slack_f).astype(int)
+
+        for shift in product(*map(range, shift_lo, shift_hi + 1)):
+            frame_f = np.eye(4)
+            frame_f[0:3, 0:3] = rot_f
+            frame_f[0:3, 3] = tran_f + shift
+            frames_f.append(frame_f)
+
+    frames_xy = orth_fx @ np.array(frames_f) @ frac_xf
+
+    is_identity = np.all(np.isclose(frames_xy, np.eye(4)), axis=(1, 2))
+    frames_xy = frames_xy[~is_identity]
+
+    # Discard mates whose bounding boxes are too far away.
+    lo_x, hi_x = coords_x.min(axis=0), coords_x.max(axis=0)
+    corners_x = np.array(list(product(*zip(lo_x, hi_x))))
+    corners_y = transform_coords(homogenize_coords(corners_x), frames_xy)
+    lo_y = corners_y[..., 0:3].min(axis=1)
+    hi_y = corners_y[..., 0:3].max(axis=1)
+
+    gap = np.maximum(0, np.maximum(lo_y - hi_x, lo_x - hi_y))
+    frames_xy = frames_xy[np.sum(gap**2, axis=1) <= cutoff_A**2]
+
+    # Discard mates without any atoms close enough.
+    tree = cKDTree(coords_x)
+    coords_x = homogenize_coords(coords_x)
+    keep = [
+            np.isfinite(
+                tree.query(
+                    transform_coords(coords_x, frame_xy)[:, 0:3],
+                    distance_upper_bound=cutoff_A,
+                )[0]
+            ).any()
+            for frame_xy in frames_xy
+    ]
+    frames_xy = frames_xy[np.array(keep, dtype=bool)]
+
+    return np.concatenate([np.eye(4)[np.newaxis], frames_xy.reshape(-1, 4, 4)])
+
+def _parse_unit_cell(unit_cell):
+    if unit_cell.is_empty():
+        raise ValueError("no unit cell")
+
+    row = unit_cell.row(0, named=True)
+
+    cell = gemmi.UnitCell(
+            row['a_A'],
+            row['b_A'],
+            row['c_A'],
+            row['alpha_deg'],
+            row['beta_deg'],
+            row['gamma_deg'],
+    )
+    space_group = gemmi.find_spacegroup_by_name(row['space_group'] or '')
+
+    if space_group is None:
+        raise ValueError(f"unknown space group: {row['space_group']!r}")
+
+    return cell, space_group
+
+def _make_frame(transform):
+    frame = np.eye(4)
+    frame[0:3, 0:3] = transform.mat.tolist()
+    frame[0:3, 3] = transform.vec.tolist()
+    return frame
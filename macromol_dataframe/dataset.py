@@ -0,0 +1,242 @@
+import polars as pl
+import sys
+import os
+import re
+
+from .mmcif import read_mmcif, select_model, make_biological_assembly
+from .atoms import Atoms
+from .parallel import map_processes
+from itertools import groupby
+from functools import partial
+from pathlib import Path
+
+from typing import Iterable, List, Optional, TextIO, Union
+
+def write_atoms_dataset(
+        cif_paths: Iterable[Union[Path, str]],
+        out_dir: Union[Path, str],
+        *,
+        model_id: str = '1',
+        assembly_id: Optional[str] = None,
+        coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+        rows_per_file: int = 10_000_000,
+        row_group_size: int = 100_000,
+        compression: str = 'zstd',
+        append: bool = False,
+        processes: Optional[int] = 1,
+        log: Optional[TextIO] = None,
+) -> List[Path]:
+    """
+    Write the atoms from many mmCIF files to a single parquet dataset.
+
+    Arguments:
+        cif_paths:
+            The mmCIF files to include in the dataset.  The name of each file 
+            must begin with its PDB id, as is the case for files in a local 
+            mirror of the PDB (see `get_pdb_path()`).
+
+        out_dir:
+            The directory to write the dataset to.  The dataset is 
+            hive-partitioned by the second and third characters of each PDB id, 
+            i.e. the same two characters used to organize the PDB itself.  For 
+            example, the atoms from ``1abc`` will be written to a file in 
+            ``out_dir/prefix=ab/``.
+
+        model_id:
+            The model to use when building biological assemblies.  Ignored if 
+            *assembly_id* isn't given.
+
+        assembly_id:
+            If given, write the specified biological assembly of each 
+            structure (see `read_biological_assembly()`).  Otherwise, write 
+            the asymmetric unit (see `read_asymmetric_unit()`).
+
+        coord_dtype:
+            The data type to use for the coordinate columns.  See 
+            `read_mmcif()`.
+
+        rows_per_file:
+            The maximum number of atoms to write to each file.  Atoms are 
+            buffered in memory until this many have been read for a single 
+            partition, so this also limits the amount of memory used.  When 
+            using multiple processes, at most two structures per process are 
+            parsed ahead of the buffer.  Atoms from the same structure are 
+            never split between files.
+
+        row_group_size:
+            The number of rows in each parquet row group.  Min/max 
+            statistics are recorded for every column in every row group, 
+            including ``element``, ``comp_id``, and the coordinates, so 
+            smaller row groups let queries skip more data at the expense of 
+            larger files.
+
+        compression:
+            The compression algorithm to use, see 
+            `polars.DataFrame.write_parquet`.
+
+        append:
+            If True, add new files to an existing dataset.  If False, raise 
+            an error if the output directory already contains a dataset.  
+            Note that structures are not deduplicated when appending.
+
+        processes:
+            The number of processes to use for parsing the mmCIF files.  If 
+            1, every file is parsed in the current process.  If None, this is 
+            the number of CPUs.
+
+        log:
+            A file where any mmCIF files that couldn't be read will be 
+            reported.  By default, this is stderr.  These files are skipped, 
+            and the rest of the dataset is still written.
+
+    Returns:
+        The paths to the files that were written.
+
+    The structures in each partition are ordered by PDB id, and each row has a 
+    ``structure_id`` column.  Use `scan_atoms_dataset()` to query the 
+    dataset; filters on the PDB id prefix will only read the relevant 
+    partitions, and filters on other columns can skip row groups based on 
+    their statistics.
+    """
+    out_dir = Path(out_dir)
+
+    if not append and any(out_dir.glob('prefix=*/*.parquet')):
+        raise FileExistsError(f"dataset already exists: {out_dir}")
+
+    cif_paths = sorted(
+            map(Path, cif_paths),
+            key=lambda x: (_get_pdb_prefix(x), _get_pdb_id(x)),
+    )
+    log = log or sys.stderr
+    read = partial(
+            _try_read_atoms,
+            model_id=model_id,
+            assembly_id=assembly_id,
+            coord_dtype=coord_dtype,
+    )
+
+    paths = []
+
+    def write(prefix, atoms):
+        partition_dir = out_dir / f'prefix={prefix}'
+        partition_dir.mkdir(parents=True, exist_ok=True)
+
+        # Number the new file after the highest existing part, rather than 
+        # counting the parts, so that gaps left by deleted files can't cause 
+        # an existing file to be overwritten.
+        i = max(
+                (
+                    int(m.group(1))
+                    for x in partition_dir.glob('part-*.parquet')
+                    if (m := re.fullmatch(r'part-(\d+)\.parquet', x.name))
+                ),
+                default=-1,
+        ) + 1
+        path = partition_dir / f'part-{i:05d}.parquet'
+
+        # Write to a temporary file first, so that scans of the dataset 
+        # never see a partially-written file.
+        tmp_path = path.with_name(f'{path.name}.tmp-{os.getpid()}')
+        pl.concat(atoms, how='diagonal_relaxed').write_parquet(
+                tmp_path,
+                compression=compression,
+                row_group_size=row_group_size,
+                statistics=True,
+        )
+        os.replace(tmp_path, path)
+        paths.append(path)
+
+    def write_partitions(results):
+        for prefix, group in groupby(
+                zip(cif_paths, results),
+                key=lambda x: _get_pdb_prefix(x[0]),
+        ):
+            buffer, num_rows = [], 0
+
+            for cif_path, (atoms, error) in group:
+                if error is not None:
+                    print(f"skipping {cif_path}: {error}", file=log, flush=True)
+                    continue
+
+                if buffer and num_rows + atoms.height > rows_per_file:
+                    write(prefix, buffer)
+                    buffer, num_rows = [], 0
+
+                buffer.append(atoms)
+                num_rows += atoms.height
+
+            if buffer:
+                write(prefix, buffer)
+
+    write_partitions(map_processes(read, cif_paths, processes=processes))
+
+    return paths
+
+def scan_atoms_dataset(
+        out_dir: Union[Path, str],
+        pdb_ids: Optional[Iterable[str]] = None,
+) -> pl.LazyFrame:
+    """
+    Lazily read a dataset created by `write_atoms_dataset()`.
+
+    Arguments:
+        out_dir:
+            The directory containing the dataset.
+
+        pdb_ids:
+            If given, only include atoms from these structures.  Only the 
+            partitions that could contain these structures will be read.
+
+    Returns:
+        A lazy dataframe with the same columns as the dataset, plus a 
+        ``prefix`` column identifying the partition.
+    """
+    atoms = pl.scan_parquet(
+            Path(out_dir) / '**' / '*.parquet',
+            hive_partitioning=True,
+            hive_schema={'prefix': pl.String},
+    )
+
+    if pdb_ids is not None:
+        pdb_ids = [x.lower() for x in pdb_ids]
+        prefixes = sorted({x[1:3] for x in pdb_ids})
+        atoms = atoms.filter(
+                pl.col('prefix').is_in(prefixes),
+                pl.col('structure_id').str.to_lowercase().is_in(pdb_ids),
+        )
+
+    return atoms
+
+def _read_atoms(cif_path, *, model_id, assembly_id, coord_dtype) -> Atoms:
+    struct = read_mmcif(cif_path, coord_dtype=coord_dtype)
+    atoms = struct.asym_atoms
+
+    if assembly_id is not None:
+        atoms = make_biological_assembly(
+                select_model(atoms, model_id),
+                struct.assembly_gen,
+                struct.oper_map,
+                assembly_id,
+        )
+
+    # Structures without any atoms would otherwise be silently left out of 
+    # the dataset.
+    if atoms.is_empty():
+        raise ValueError("no atoms found")
+
+    return atoms.select(
+            structure_id=pl.lit(struct.id, dtype=pl.String),
+            *atoms.columns,
+    )
+
+def _try_read_atoms(cif_path, **kwargs):
+    try:
+        return _read_atoms(cif_path, **kwargs), None
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
+
+def _get_pdb_id(cif_path):
+    return Path(cif_path).name.split('.')[0].lower()
+
+def _get_pdb_prefix(cif_path):
+    return _get_pdb_id(cif_path)[1:3]
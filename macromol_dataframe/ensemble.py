@@ -0,0 +1,324 @@
+import polars as pl
+import numpy as np
+
+from .atoms import Atoms, get_atom_coords, replace_atom_coords
+from .coords import (
+        Frame, Frames, transform_coords, homogenize_coords, superimpose_coords,
+        calc_rmsd,
+)
+from .mmcif import AssemblyTemplate
+from dataclasses import dataclass
+from numpy.typing import NDArray
+
+from typing import Dict, List, Optional, Union
+
+ENSEMBLE_KEY_COLS = [
+        'chain_id',
+        'subchain_id',
+        'seq_id',
+        'seq_label',
+        'alt_id',
+        'comp_id',
+        'atom_id',
+        'element',
+]
+"""
+The columns that `make_ensemble()` uses by default to match atoms between 
+models.  Only those that are present are used.
+"""
+
+@dataclass
+class Ensemble:
+    """
+    Multiple models of the same structure, stored as a single table of atoms 
+    and a dense array of coordinates.
+
+    Structures determined by NMR typically contain many models, each with the 
+    same atoms in different positions.  `read_mmcif()` represents these 
+    models as a single dataframe, where every atom is repeated once for each 
+    model.  This representation stores the non-coordinate columns only once, 
+    and stores the coordinates in an array that can be indexed by model.  
+    This makes it possible to work on every model at once with array 
+    operations, e.g. `superimpose()` and `calc_rmsd()`, instead of selecting 
+    the models one at a time.
+
+    Use `make_ensemble()` to create an ensemble from a dataframe of atoms.
+    """
+
+    atoms: Atoms
+    """
+    A dataframe with one row for each atom that appears in any model, and the 
+    same columns as the dataframe the ensemble was made from, except for 
+    ``model_id``.  The ``x``, ``y``, and ``z`` columns contain the coordinates 
+    from the first model that includes each atom.
+    """
+
+    model_ids: List[Optional[str]]
+    """
+    The id of each model.  If the structure doesn't specify any model ids, 
+    this will be ``[None]``.
+    """
+
+    coords: NDArray[float]
+    """
+    An array with shape (M, N, 3), where M is the number of models and N is 
+    the number of atoms.  The coordinates of atoms that are missing from a 
+    model are NaN.
+    """
+
+    mask: NDArray[bool]
+    """
+    A boolean array with shape (M, N), indicating which atoms are present in 
+    which models.
+    """
+
+    @property
+    def num_models(self) -> int:
+        return len(self.model_ids)
+
+    @property
+    def num_atoms(self) -> int:
+        return self.atoms.height
+
+    def select_model(self, model_id: str) -> Atoms:
+        """
+        Get the atoms belonging to a single model.
+
+        The returned dataframe is the same as would be returned by calling 
+        `select_model()` on the dataframe used to make this ensemble, except 
+        that the atoms are always in the same order as `atoms`.
+        """
+        i = self._find_model(model_id)
+        mask = self.mask[i]
+        return replace_atom_coords(self.atoms.filter(mask), self.coords[i, mask])
+
+    def to_atoms(self) -> Atoms:
+        """
+        Convert this ensemble back into a single dataframe, with a 
+        ``model_id`` column and one row for each atom in each model.
+        """
+        model_indices, atom_indices = np.nonzero(self.mask)
+        model_ids = pl.Series('model_id', self.model_ids, dtype=pl.String)
+
+        atoms = (
+                self.atoms[atom_indices]
+                .with_columns(model_ids[model_indices])
+                .select('model_id', pl.exclude('model_id'))
+        )
+        return replace_atom_coords(
+                atoms,
+                self.coords[model_indices, atom_indices],
+        )
+
+    def transform(self, frames_xy: Union[Frame, Frames]) -> 'Ensemble':
+        """
+        Apply the given transformation(s) to every model.
+
+        Arguments:
+            frames_xy:
+                Either a single matrix with shape (4, 4), which will be 
+                applied to every model, or an array of matrices with shape 
+                (M, 4, 4), where M is the number of models, which will be 
+                applied to the corresponding models.
+
+        Returns:
+            A new ensemble with the same atoms and transformed coordinates.
+        """
+        coords = transform_coords(homogenize_coords(self.coords), frames_xy)
+        return self._replace_coords(coords[..., 0:3])
+
+    def superimpose(
+            self,
+            model_id: Optional[str] = None,
+            *,
+            weights: Union[str, NDArray[float], None] = None,
+    ) -> 'Ensemble':
+        """
+        Superimpose every model onto the given reference model.
+
+        Arguments:
+            model_id:
+                The id of the reference model.  By default, this is the first 
+                model.
+
+            weights:
+                Either the name of a column in `atoms` (e.g. ``occupancy``) or 
+                an array of weights with shape (N,), where N is the number of 
+                atoms.  By default, every atom is weighted equally.  Atoms 
+                that are missing from either model are always ignored.
+
+        Returns:
+            A new ensemble with the same atoms and transformed coordinates.  
+            All of the models are superimposed at once, see 
+            `superimpose_coords()`.
+        """
+        i = self._find_model(model_id)
+        coords, weights = self._pair_with_model(i, weights)
+
+        frames_xy = superimpose_coords(
+                coords,
+                np.broadcast_to(coords[i], coords.shape),
+                weights,
+        )
+        return self.transform(frames_xy)
+
+    def calc_rmsd(
+            self,
+            model_id: Optional[str] = None,
+            *,
+            weights: Union[str, NDArray[float], None] = None,
+    ) -> NDArray[float]:
+        """
+        Calculate the RMSD between every model and the given reference model.
+
+        The arguments are the same as for `superimpose()`.  The models are 
+        compared as they are, so call `superimpose()` first to get the RMSD 
+        after optimal superposition.  An array with shape (M,) is returned, 
+        where M is the number of models.
+        """
+        i = self._find_model(model_id)
+        coords, weights = self._pair_with_model(i, weights)
+
+        return calc_rmsd(
+                coords,
+                np.broadcast_to(coords[i], coords.shape),
+                weights,
+        )
+
+    def make_biological_assembly(
+            self,
+            struct_assembly_gen: pl.DataFrame,
+            struct_oper_map: Dict[str, Frame],
+            assembly_id: str,
+    ) -> 'Ensemble':
+        """
+        Generate the same biological assembly for every model.
+
+        The arguments are the same as for `make_biological_assembly()`.  The 
+        non-coordinate columns of the assembly are only generated once, see 
+        `AssemblyTemplate`, and the coordinates of every model are 
+        transformed at once.
+        """
+        template = AssemblyTemplate(
+                self.atoms,
+                struct_assembly_gen,
+                struct_oper_map,
+                assembly_id,
+        )
+        return Ensemble(
+                atoms=template.atoms,
+                model_ids=self.model_ids,
+                coords=template.make_coords(self.coords),
+                mask=self.mask[:, template.asym_indices],
+        )
+
+    def _find_model(self, model_id):
+        if model_id is None or self.model_ids == [None]:
+            return 0
+
+        try:
+            return self.model_ids.index(model_id)
+        except ValueError:
+            raise ValueError(f"unknown model: {model_id!r}") from None
+
+    def _pair_with_model(self, i, weights):
+        # Atoms that are missing from either model get zero weight.  Their 
+        # coordinates also have to be replaced with real numbers, because NaN 
+        # times zero is still NaN.
+        mask = self.mask & self.mask[i]
+        coords = np.where(mask[..., np.newaxis], self.coords, 0)
+
+        if weights is None:
+            weights = mask
+        elif isinstance(weights, str):
+            weights = mask * self.atoms[weights].to_numpy()
+        else:
+            weights = mask * np.asarray(weights)
+
+        return coords, weights
+
+    def _replace_coords(self, coords):
+        return Ensemble(
+                atoms=replace_atom_coords(
+                    self.atoms,
+                    _first_coords(coords, self.mask),
+                ),
+                model_ids=self.model_ids,
+                coords=coords,
+                mask=self.mask,
+        )
+
+def make_ensemble(
+        atoms: Atoms,
+        *,
+        key_cols: Optional[List[str]] = None,
+) -> Ensemble:
+    """
+    Combine every model in the given dataframe into an ensemble.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms with a ``model_id`` column, e.g. 
+            `Structure.asym_atoms`.  Each atom can appear at most once in 
+            each model.
+
+        key_cols:
+            The columns used to match atoms between models.  By default, 
+            these are the columns in `ENSEMBLE_KEY_COLS` that are present in 
+            *atoms*.  Columns that aren't used for matching, e.g. B-factors 
+            and occupancies, can differ between models.
+
+    Returns:
+        An ensemble with one model for each unique model id, in the order 
+        they appear.  The atoms are also ordered by their first appearance in 
+        *atoms*.  Columns that aren't used for matching are taken from that 
+        first appearance.  Atoms that only appear in some models are masked 
+        out of the others.
+    """
+    if key_cols is None:
+        key_cols = [x for x in ENSEMBLE_KEY_COLS if x in atoms.columns]
+
+    # Number the models and atoms in the order they first appear, using the 
+    # same approach as `assign_residue_ids()`.
+    indices = (
+            atoms
+            .with_row_index('i')
+            .select(
+                model=pl.col('i').min().over('model_id').rank('dense') - 1,
+                atom=pl.col('i').min().over(key_cols).rank('dense') - 1,
+            )
+    )
+    model_indices = indices['model'].to_numpy().astype(np.int64)
+    atom_indices = indices['atom'].to_numpy().astype(np.int64)
+
+    num_models = model_indices.max(initial=-1) + 1
+    num_atoms = atom_indices.max(initial=-1) + 1
+
+    flat_indices = model_indices * num_atoms + atom_indices
+    if len(np.unique(flat_indices)) != len(flat_indices):
+        raise ValueError("atoms must be unique within each model")
+
+    model_ids = (
+            atoms['model_id']
+            .gather(np.unique(model_indices, return_index=True)[1])
+            .to_list()
+    )
+    first_rows = np.unique(atom_indices, return_index=True)[1]
+
+    coords_x = get_atom_coords(atoms)
+    coords = np.full((num_models, num_atoms, 3), np.nan, dtype=coords_x.dtype)
+    coords[model_indices, atom_indices] = coords_x
+
+    mask = np.zeros((num_models, num_atoms), dtype=bool)
+    mask[model_indices, atom_indices] = True
+
+    return Ensemble(
+            atoms=atoms[first_rows].drop('model_id'),
+            model_ids=model_ids,
+            coords=coords,
+            mask=mask,
+    )
+
+def _first_coords(coords, mask):
+    first_model = np.argmax(mask, axis=0)
+    return coords[first_model, np.arange(coords.shape[1])]
@@ -0,0 +1,188 @@
+import polars as pl
+import numpy as np
+
+from .atoms import Atoms, get_atom_coords, quantize_atom_coords
+from .canonical import CANONICAL_KEY_COLS
+from hashlib import blake2b
+from scipy.spatial import cKDTree
+
+HASH_COLS = [
+        *CANONICAL_KEY_COLS[1:],
+        'comp_id',
+        'element',
+]
+"""
+The columns that contribute to `hash_atoms()`, in addition to the 
+coordinates.  Only ``subchain_id``, ``seq_id``, and ``atom_id`` are required; 
+the others are used if present.
+"""
+
+def hash_atoms(atoms: Atoms) -> str:
+    """
+    Calculate a hash that identifies the exact contents of the given atoms.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms.  Only the columns in `HASH_COLS` and the 
+            coordinates are considered.  Note that ``structure_id`` is not 
+            included, so the same atoms from two different structures will 
+            have the same hash.
+
+    Returns:
+        A 32-character hexadecimal digest.
+
+    Two dataframes have the same hash if they have the same atoms, with the 
+    same metadata and the same coordinates to within 0.001Å, regardless of 
+    the order of the rows.  The coordinates are compared after rounding them 
+    to the nearest 0.001Å (see `quantize_atom_coords()`), so the hash doesn't 
+    depend on the data type used to store them.  Any other change, e.g. a 
+    renamed chain or a slightly moved atom, gives a completely different 
+    hash.  Use `fingerprint_atoms()` to find structures that have the same 
+    shape, but aren't exactly identical.
+
+    The hash is calculated with BLAKE2, and doesn't depend on the version of 
+    polars or on any random state, so it can be stored and compared across 
+    runs.
+    """
+    cols = [x for x in HASH_COLS if x in atoms.columns]
+    atoms = (
+            quantize_atom_coords(atoms.select(*cols, 'x', 'y', 'z'))
+            .sort([*cols, 'x', 'y', 'z'], nulls_last=False)
+    )
+
+    h = blake2b(digest_size=16)
+
+    for col in atoms.get_columns():
+        h.update(col.name.encode() + b'\0')
+        h.update(_encode_column(col))
+
+    return h.hexdigest()
+
+def fingerprint_atoms(
+        atoms: Atoms,
+        *,
+        bin_width_A: float = 1.0,
+        max_distance_A: float = 8.0,
+) -> str:
+    """
+    Calculate a hash that identifies the shape and sequence of the given 
+    atoms, independent of their position and orientation.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms.  The ``subchain_id``, ``seq_id``, 
+            ``comp_id``, and coordinate columns are required.  If present, the 
+            ``model_id`` and ``symmetry_mate`` columns are used to tell 
+            different copies of the same subchain apart.
+
+        bin_width_A:
+            The width of each bin in the distance histograms, see below.
+
+        max_distance_A:
+            The largest distance to include in the distance histograms.
+
+    Returns:
+        A 32-character hexadecimal digest.
+
+    The fingerprint is made by describing each chain by its sequence of 
+    residue names and a histogram of the distances between each pair of 
+    atoms in that chain.  These descriptions are then sorted, so that the 
+    fingerprint doesn't depend on the chain names or the order of the atoms.  
+    Because distances don't change when a structure is rotated or 
+    translated, neither does the fingerprint.
+
+    This means that the fingerprint can identify duplicates that `hash_atoms()` 
+    can't, e.g. the same structure deposited in a different frame of 
+    reference, or with different chain names.  The histograms are coarse 
+    enough that small differences in the coordinates usually don't matter, 
+    but any difference that moves a distance into a different bin does.  So 
+    matching fingerprints indicate structures that are almost certainly 
+    redundant, while different fingerprints don't prove that two structures 
+    are distinct.
+
+    Only distances less than *max_distance_A* are counted, which allows the 
+    pairs of atoms to be found efficiently using a k-D tree.
+    """
+    chain_cols = [
+            x for x in ['model_id', 'symmetry_mate', 'subchain_id']
+            if x in atoms.columns
+    ]
+    chain_i = (
+            atoms
+            .select(
+                pl.int_range(pl.len())
+                .min()
+                .over(chain_cols)
+                .rank('dense')
+                .sub(1)
+            )
+            .to_series()
+            .to_numpy()
+            .astype(np.int64)
+    )
+    num_chains = int(chain_i.max(initial=-1)) + 1
+
+    sequences = (
+            atoms
+            .select('seq_id', 'comp_id', chain_i=pl.Series(chain_i))
+            .unique()
+            .sort('chain_i', 'seq_id', 'comp_id', nulls_last=False)
+            .group_by('chain_i', maintain_order=True)
+            .agg(pl.col('comp_id').str.join(' '))
+            .get_column('comp_id')
+            .to_list()
+    )
+
+    # Find every pair of atoms within the cutoff distance at once, then 
+    # histogram the distances for every chain in a single pass.
+    coords = get_atom_coords(atoms).astype(np.float64)
+    num_bins = int(np.ceil(max_distance_A / bin_width_A))
+
+    pairs = cKDTree(coords).query_pairs(max_distance_A, output_type='ndarray')
+    pairs = pairs[chain_i[pairs[:, 0]] == chain_i[pairs[:, 1]]]
+
+    dists = np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1)
+    bins = np.minimum(dists // bin_width_A, num_bins - 1).astype(np.int64)
+
+    hists = np.bincount(
+            chain_i[pairs[:, 0]] * num_bins + bins,
+            minlength=num_chains * num_bins,
+    )
+    hists = hists.reshape(num_chains, num_bins).astype('<i8')
+
+    chain_digests = sorted(
+            blake2b(
+                seq.encode() + b'\0' + hist.tobytes(),
+                digest_size=16,
+            ).digest()
+            for seq, hist in zip(sequences, hists)
+    )
+
+    h = blake2b(digest_size=16)
+    h.update(f'{bin_width_A}:{max_distance_A}\0'.encode())
+    for digest in chain_digests:
+        h.update(digest)
+
+    return h.hexdigest()
+
+def _encode_column(col):
+    # Nulls are encoded as values that can't otherwise appear, so that e.g. 
+    # a null and an empty string don't collide.
+    if not col.dtype.is_numeric():
+        return (
+                col
+                .cast(pl.String)
+                .fill_null('\x00')
+                .str.join('\x1f')
+                .item()
+                .encode()
+        )
+
+    return (
+            col
+            .cast(pl.Int64)
+            .fill_null(np.iinfo(np.int64).min)
+            .to_numpy()
+            .astype('<i8')
+            .tobytes()
+    )
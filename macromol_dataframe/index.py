@@ -0,0 +1,319 @@
+import polars as pl
+import gemmi.cif
+import sys
+
+from .mmcif import (
+        MmcifError, _add_path_to_mmcif_error, _extract_atom_site,
+        _extract_struct_assembly, _extract_struct_assembly_gen,
+        _extract_entities, _extract_polymers,
+)
+from .hashing import hash_atoms, fingerprint_atoms
+from .parallel import map_processes
+from functools import partial
+from pathlib import Path
+
+from typing import Iterable, Optional, TextIO, Union
+
+INDEX_SCHEMA = dict(
+        path=pl.String,
+        mtime_ns=pl.Int64,
+        pdb_id=pl.String,
+        model_id=pl.String,
+        assembly_id=pl.String,
+        assembly_details=pl.String,
+        polymer_count=pl.Int64,
+        num_entities=pl.UInt32,
+        polymer_types=pl.List(pl.String),
+        num_asym_atoms=pl.UInt32,
+        num_assembly_atoms=pl.Int64,
+        asym_hash=pl.String,
+        asym_fingerprint=pl.String,
+)
+
+def read_mmcif_header(
+        cif_path: Union[Path, str],
+        *,
+        hashes: bool = False,
+) -> pl.DataFrame:
+    """
+    Summarize the models and biological assemblies in the given mmCIF file, 
+    without parsing any coordinates.
+
+    Arguments:
+        cif_path:
+            The path to the mmCIF file to read.
+
+        hashes:
+            If True, parse the coordinates after all, and use them to fill in 
+            the ``asym_hash`` and ``asym_fingerprint`` columns.  This is 
+            slower, but still much faster than building any biological 
+            assemblies.
+
+    Returns:
+        A dataframe with one row for each combination of model and assembly 
+        in the file, and the columns described by `INDEX_SCHEMA`:
+
+        - ``path``, ``mtime_ns``: The path to the file, and the time it was 
+          last modified.  These are used by `index_pdb()` to avoid scanning 
+          files that haven't changed.
+
+        - ``pdb_id``: The name of the data block in the file, i.e. 
+          `Structure.id`.
+
+        - ``model_id``, ``assembly_id``: The arguments that would be passed 
+          to `read_biological_assembly()` to load this assembly.  The model 
+          id is null if the file doesn't specify any models.
+
+        - ``assembly_details``, ``polymer_count``: Information about the 
+          assembly, as given in the ``_pdbx_struct_assembly`` category.
+
+        - ``num_entities``, ``polymer_types``: The number of entities in the 
+          structure, and the (unique) types of its polymers, e.g. 
+          ``polypeptide(L)``.
+
+        - ``num_asym_atoms``: The number of atoms in the asymmetric unit, for 
+          this model.
+
+        - ``num_assembly_atoms``: The number of atoms in the biological 
+          assembly, for this model.  This is calculated from the number of 
+          atoms in each subchain and the number of times each subchain is 
+          copied, so the assembly doesn't actually need to be built.
+
+        - ``asym_hash``, ``asym_fingerprint``: The `hash_atoms()` and 
+          `fingerprint_atoms()` of the asymmetric unit, for this model, not 
+          including the ``model_id`` column.  These are null unless *hashes* 
+          is True.  Biological assemblies are built deterministically from 
+          the asymmetric unit, so any two rows with the same asymmetric unit 
+          hash and the same assembly operations will yield identical 
+          assemblies.  This makes it possible to drop duplicates before 
+          building any assemblies.
+
+    The coordinates make up the bulk of any mmCIF file, so skipping them makes 
+    this function much faster than `read_mmcif()`.  It's meant for scanning 
+    large numbers of files to decide which structures to actually load.
+    """
+    cif_path = Path(cif_path)
+    mtime_ns = cif_path.stat().st_mtime_ns
+    cif = gemmi.cif.read(str(cif_path)).sole_block()
+
+    with _add_path_to_mmcif_error(cif_path):
+        if hashes:
+            asym_atoms = _extract_atom_site(cif, coord_dtype=pl.Int32)
+        else:
+            asym_atoms = _extract_atom_site(cif, {'model_id', 'subchain_id'})
+
+        # Without any atoms, the assembly sizes can't be calculated, and 
+        # the joins below would fail on columns of unknown type.
+        if asym_atoms.is_empty():
+            err = MmcifError("missing required category")
+            err.blame = ["no atoms found in: _atom_site.*"]
+            raise err
+
+        assemblies = _extract_struct_assembly(cif)
+        assembly_gen, _ = _extract_struct_assembly_gen(cif, asym_atoms)
+        entities = _extract_entities(cif)
+        polymers = _extract_polymers(cif)
+
+    subchain_sizes = (
+            asym_atoms
+            .group_by('model_id', 'subchain_id')
+            .agg(num_atoms=pl.len())
+            .with_columns(
+                num_asym_atoms=pl.col('num_atoms').sum().over('model_id'),
+            )
+    )
+    assembly_subchains = (
+            assembly_gen
+            .select(
+                'assembly_id',
+                'subchain_ids',
+                num_copies=pl.col('oper_ids').list.len(),
+            )
+            .explode('subchain_ids')
+    )
+
+    header = (
+            subchain_sizes
+            .join(
+                assembly_subchains,
+                left_on='subchain_id',
+                right_on='subchain_ids',
+            )
+            .group_by('model_id', 'assembly_id')
+            .agg(
+                pl.col('num_asym_atoms').first(),
+                num_assembly_atoms=(
+                    pl.col('num_atoms') * pl.col('num_copies')
+                ).sum(),
+            )
+            .join(
+                assemblies.select(
+                    assembly_id='id',
+                    assembly_details='details',
+                    polymer_count='polymer_count',
+                ),
+                on='assembly_id',
+                how='left',
+            )
+            .with_columns(
+                path=pl.lit(str(cif_path)),
+                mtime_ns=pl.lit(mtime_ns, dtype=pl.Int64),
+                pdb_id=pl.lit(cif.name),
+                num_entities=pl.lit(entities.height, dtype=pl.UInt32),
+                polymer_types=pl.lit(
+                    polymers['type'].drop_nulls().unique().sort().to_list(),
+                    dtype=pl.List(pl.String),
+                ),
+                asym_hash=pl.lit(None, dtype=pl.String),
+                asym_fingerprint=pl.lit(None, dtype=pl.String),
+            )
+            .select(
+                pl.col(k).cast(v)
+                for k, v in INDEX_SCHEMA.items()
+            )
+            .sort(
+                pl.col('model_id').cast(pl.Int64, strict=False),
+                'model_id',
+                'assembly_id',
+            )
+    )
+
+    if hashes:
+        # There are usually only a handful of models, and the atoms have to 
+        # be hashed separately for each one anyways.
+        model_hashes = {
+                model_id: (
+                    hash_atoms(model_atoms.drop('model_id')),
+                    fingerprint_atoms(model_atoms.drop('model_id')),
+                )
+                for (model_id,), model_atoms in asym_atoms.group_by('model_id')
+        }
+        rows = [model_hashes[x] for x in header['model_id']]
+        header = header.with_columns(
+                asym_hash=pl.Series([x[0] for x in rows], dtype=pl.String),
+                asym_fingerprint=pl.Series([x[1] for x in rows], dtype=pl.String),
+        )
+
+    return header
+
+def index_pdb(
+        pdb_dir: Union[Path, str],
+        *,
+        suffix: str = '.cif.gz',
+        previous: Optional[pl.DataFrame] = None,
+        processes: Optional[int] = None,
+        hashes: bool = False,
+        log: Optional[TextIO] = None,
+) -> pl.DataFrame:
+    """
+    Summarize every mmCIF file in a local mirror of the PDB.
+
+    Arguments:
+        pdb_dir:
+            A directory laid out in the same way as the PDB itself, i.e. as 
+            expected by `get_pdb_path()`.
+
+        suffix:
+            The file extension of the mmCIF files to index.
+
+        previous:
+            An index created by a previous call to this function.  Any file 
+            whose path and modification time match an entry in this index 
+            won't be scanned again, and entries for files that no longer 
+            exist will be dropped.  Indices created before the hash columns 
+            were added to `INDEX_SCHEMA` can still be used.
+
+        processes:
+            The number of processes to use.  By default, this is the number of 
+            CPUs.  If 1, every file is scanned in the current process.
+
+        hashes:
+            If True, calculate the hash and fingerprint of each asymmetric 
+            unit, see `read_mmcif_header()`.  Entries in *previous* without 
+            hashes will be scanned again.
+
+        log:
+            A file where any mmCIF files that couldn't be read will be 
+            reported.  By default, this is stderr.  These files are left out 
+            of the index, and the rest of the files are still indexed.
+
+    Returns:
+        A dataframe with one row for each model/assembly combination in each 
+        file.  See `read_mmcif_header()` for a description of the columns.
+    """
+    cif_paths = sorted(Path(pdb_dir).glob(f'*/*{suffix}'))
+    return index_mmcif_paths(
+            cif_paths,
+            previous=previous,
+            processes=processes,
+            hashes=hashes,
+            log=log,
+    )
+
+def index_mmcif_paths(
+        cif_paths: Iterable[Union[Path, str]],
+        *,
+        previous: Optional[pl.DataFrame] = None,
+        processes: Optional[int] = None,
+        hashes: bool = False,
+        log: Optional[TextIO] = None,
+) -> pl.DataFrame:
+    """
+    Summarize each of the given mmCIF files.
+
+    This is the same as `index_pdb()`, except that the files to index are 
+    given explicitly, instead of being found in a directory.
+    """
+    log = log or sys.stderr
+    cif_paths = pl.DataFrame(
+            {'path': [str(x) for x in cif_paths]},
+            schema={'path': pl.String},
+    )
+    cif_paths = cif_paths.with_columns(
+            mtime_ns=pl.Series(
+                [Path(x).stat().st_mtime_ns for x in cif_paths['path']],
+                dtype=pl.Int64,
+            ),
+    )
+
+    if previous is None:
+        previous = pl.DataFrame([], INDEX_SCHEMA)
+
+    previous = previous.select(
+            pl.col(k) if k in previous.columns else pl.lit(None, dtype=v).alias(k)
+            for k, v in INDEX_SCHEMA.items()
+    )
+    if hashes:
+        previous = previous.filter(pl.col('asym_hash').is_not_null())
+
+    reused = previous.join(cif_paths, on=['path', 'mtime_ns'], how='semi')
+    stale_paths = (
+            cif_paths
+            .join(previous, on=['path', 'mtime_ns'], how='anti')
+            .get_column('path')
+            .to_list()
+    )
+
+    read = partial(_try_read_mmcif_header, hashes=hashes)
+    results = map_processes(read, stale_paths, processes=processes)
+
+    # Files that couldn't be read are left out of the index, so they'll be 
+    # scanned again the next time the index is updated.
+    headers = []
+
+    for path, (header, error) in zip(stale_paths, results):
+        if error is not None:
+            print(f"skipping {path}: {error}", file=log, flush=True)
+        else:
+            headers.append(header)
+
+    return (
+            pl.concat([reused, *headers])
+            .sort('path', maintain_order=True)
+    )
+
+def _try_read_mmcif_header(cif_path, **kwargs):
+    try:
+        return read_mmcif_header(cif_path, **kwargs), None
+    except Exception as err:
+        return None, f'{type(err).__name__}: {err}'
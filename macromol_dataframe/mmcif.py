@@ -5,18 +5,24 @@ import gemmi.cif
 import functools
 import operator as op
 
-from .atoms import Atoms, transform_atom_coords
-from .coords import Frame
+from .atoms import (
+        Atoms, get_atom_coords, replace_atom_coords, quantize_atom_coords,
+        dequantize_atom_coords,
+)
+from .coords import (
+        Coords3, Frame, Frames, transform_coords, homogenize_coords,
+)
 from .error import TidyError
 from parsy import ParseError
 from functools import reduce
 from itertools import product
 from more_itertools import flatten
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
-from typing import Dict, Union
+from typing import Dict, Iterable, Optional, Union
 
 class Structure:
     asym_atoms: Atoms
@@ -24,6 +30,11 @@ class Structure:
     oper_map: Dict[str, Frame]
     entities: pl.DataFrame
 
+    # Only parsed on request; see `read_mmcif()`.
+    unit_cell: Optional[pl.DataFrame] = None
+    struct_conn: Optional[pl.DataFrame] = None
+    chem_comp_bonds: Optional[pl.DataFrame] = None
+
     def __init__(self, id):
         self.id = id
         # Attributes set in `read_mmcif()`.
@@ -31,7 +42,13 @@ class Structure:
     def __repr__(self):
         return f'<Structure {self.id}>'
 
-def read_mmcif(cif_path: Path) -> Structure:
+def read_mmcif(
+        cif_path: Path,
+        *,
+        coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+        bonds: bool = False,
+        unit_cell: bool = False,
+) -> Structure:
     """
     Parse the information in an mmCIF file into a number of data frames.
 
@@ -39,6 +56,27 @@ def read_mmcif(cif_path: Path) -> Structure:
         cif_path:
             The path to the mmCIF file to read.
 
+        coord_dtype:
+            The data type to use for the ``x``, ``y``, and ``z`` columns.  
+            Coordinates in the PDB only have three decimal places, so 
+            ``pl.Float32`` is precise enough for most purposes, and requires 
+            half as much memory.  ``pl.Int32`` stores each coordinate as an 
+            integer multiple of 0.001Å, which is lossless and also requires 
+            half as much memory; see `quantize_atom_coords()`.  The other 
+            functions in this library preserve the precision of the 
+            coordinates they are given.
+
+        bonds:
+            If True, parse the ``_struct_conn`` and ``_chem_comp_bond`` 
+            categories into the `Structure.struct_conn` and 
+            `Structure.chem_comp_bonds` attributes, for use with 
+            `find_bonds()`.  Otherwise, these attributes are None.
+
+        unit_cell:
+            If True, parse the ``_cell`` and ``_symmetry`` categories into the 
+            `Structure.unit_cell` attribute, for use with 
+            `make_crystal_packing()`.  Otherwise, this attribute is None.
+
     This function should be used when neither `read_biological_assembly()` nor 
     `read_asymmetric_unit()` provide all of the information you want.  This 
     function returns more information, but in a less convenient format.
@@ -53,21 +91,19 @@ def read_mmcif(cif_path: Path) -> Structure:
     cif = gemmi.cif.read(str(cif_path)).sole_block()
 
     with _add_path_to_mmcif_error(cif_path):
-        struct = Structure(cif.name)
-        struct.asym_atoms = _extract_atom_site(cif)
-        struct.assemblies = _extract_struct_assembly(cif)
-        struct.assembly_gen, struct.oper_map = \
-                _extract_struct_assembly_gen(cif, struct.asym_atoms)
-        struct.entities = _extract_entities(cif)
-        struct.polymers = _extract_polymers(cif)
-    
-    return struct
+        return _extract_structure(
+                cif,
+                coord_dtype=coord_dtype,
+                bonds=bonds,
+                unit_cell=unit_cell,
+        )
 
 def read_biological_assembly(
         cif_path: Path,
         *,
         model_id: str,
         assembly_id: str,
+        coord_dtype: pl._typing.PolarsDataType = pl.Float64,
 ) -> Atoms:
     """
     Parse a single biological assembly from the given mmCIF file.
@@ -86,6 +122,10 @@ def read_biological_assembly(
             The id string of the assembly to generate.  Valid ids are given by 
             the `_pdbx_struct_assembly` loop in the mmCIF file.
 
+        coord_dtype:
+            The data type to use for the ``x``, ``y``, and ``z`` columns.  See 
+            `read_mmcif()`.
+
     Returns:
         A dataframe containing a row for each atom in the biological assembly.  
         See `make_biological_assembly()` for a more detailed description of 
@@ -108,7 +148,7 @@ def read_biological_assembly(
     learning, it is much better to transform only those coordinates that are 
     actually needed.
     """
-    struct = read_mmcif(cif_path)
+    struct = read_mmcif(cif_path, coord_dtype=coord_dtype)
 
     with _add_path_to_mmcif_error(cif_path):
         return make_biological_assembly(
@@ -118,7 +158,11 @@ def read_biological_assembly(
                 assembly_id,
         )
 
-def read_asymmetric_unit(cif_path: Path) -> Atoms:
+def read_asymmetric_unit(
+        cif_path: Path,
+        *,
+        coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+) -> Atoms:
     """
     Parse coordinates for every atom in the asymmetric unit.
 
@@ -126,13 +170,136 @@ def read_asymmetric_unit(cif_path: Path) -> Atoms:
         cif_path:
             The path containing the mmCIF file to read.
 
+        coord_dtype:
+            The data type to use for the ``x``, ``y``, and ``z`` columns.  See 
+            `read_mmcif()`.
+
     This is basically a simplified version of `read_mmcif()` that only returns 
     atomic coordinates and not any of the other relationships encoded in the 
     mmCIF file.
     """
-    struct = read_mmcif(cif_path)
+    struct = read_mmcif(cif_path, coord_dtype=coord_dtype)
     return struct.asym_atoms
 
+def scan_mmcif(
+        cif_paths: Union[Path, str, Iterable[Union[Path, str]]],
+        *,
+        coord_dtype: pl._typing.PolarsDataType = pl.Float64,
+        max_workers: Optional[int] = None,
+) -> pl.LazyFrame:
+    """
+    Lazily read the asymmetric unit coordinates from one or more mmCIF files.
+
+    Arguments:
+        cif_paths:
+            Either a single path, or an iterable of paths, to the mmCIF files 
+            to read.
+
+        coord_dtype:
+            The data type to use for the ``x``, ``y``, and ``z`` columns.  See 
+            `read_mmcif()`.
+
+        max_workers:
+            The number of threads to use when reading multiple files.  By 
+            default, this is chosen by `concurrent.futures.ThreadPoolExecutor`.
+
+    Returns:
+        A lazy frame with the same columns as the dataframe returned by 
+        `read_asymmetric_unit()`.  If multiple paths were given, there will 
+        also be a ``structure_id`` column containing the id of the structure 
+        that each atom came from.  This id is taken from the name of the data 
+        block in the mmCIF file, the same as `Structure.id`.
+
+    The returned lazy frame is registered with polars as an IO source, so the 
+    query optimizer will push any filters and column selections into the 
+    reader itself.  This means that only the requested columns will be parsed, 
+    and that each file will be filtered before it is combined with any others.  
+    For example, the following query will avoid parsing the B-factors and 
+    occupancies, and will discard any water molecules, hydrogen atoms, or 
+    models other than the first as soon as each file is read:
+
+        >>> atoms = (
+        ...     scan_mmcif(paths)
+        ...     .filter(
+        ...         pl.col('model_id') == '1',
+        ...         ~pl.col('comp_id').is_in(['HOH', 'DOD']),
+        ...         ~pl.col('element').is_in(['H', 'D']),
+        ...     )
+        ...     .select('structure_id', 'element', 'x', 'y', 'z')
+        ...     .collect()
+        ... )  # doctest: +SKIP
+
+    Note that the files themselves are read only when the query is collected, 
+    so any errors (e.g. `MmcifError`) will also be raised at that point.
+    """
+    from polars.io.plugins import register_io_source
+
+    if isinstance(cif_paths, (str, Path)):
+        cif_paths = [cif_paths]
+        include_structure_id = False
+    else:
+        cif_paths = list(cif_paths)
+        include_structure_id = True
+
+    schema = dict(_ATOM_SITE_SCHEMA)
+    schema.update(x=coord_dtype, y=coord_dtype, z=coord_dtype)
+
+    if include_structure_id:
+        schema = {'structure_id': pl.String, **schema}
+
+    def scan(with_columns, predicate, n_rows, batch_size):
+        cols = list(schema) if with_columns is None else list(with_columns)
+
+        # Parse any columns needed to evaluate the predicate, even if they 
+        # won't be part of the output.
+        parse_cols = set(cols)
+        if predicate is not None:
+            parse_cols |= set(predicate.meta.root_names())
+
+        # The number of rows comes from the parsed columns, so always parse 
+        # at least one.  Otherwise, queries like `select(pl.len())` would see 
+        # an empty dataframe.
+        parse_cols -= {'structure_id'}
+        if not parse_cols:
+            parse_cols = {'element'}
+
+        def read(cif_path):
+            cif = gemmi.cif.read(str(cif_path)).sole_block()
+
+            with _add_path_to_mmcif_error(cif_path):
+                atoms = _extract_atom_site(
+                        cif,
+                        parse_cols,
+                        coord_dtype=coord_dtype,
+                )
+
+            if include_structure_id:
+                atoms = atoms.with_columns(
+                        structure_id=pl.lit(cif.name, dtype=pl.String),
+                )
+            if predicate is not None:
+                atoms = atoms.filter(predicate)
+
+            return atoms.select(cols)
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            for atoms in executor.map(read, cif_paths):
+                if n_rows is not None:
+                    if n_rows <= 0:
+                        break
+                    atoms = atoms.head(n_rows)
+                    n_rows -= atoms.height
+
+                if batch_size is None:
+                    yield atoms
+                else:
+                    yield from atoms.iter_slices(batch_size)
+
+    return register_io_source(
+            scan,
+            schema=schema,
+    )
+
 def write_mmcif(cif_path: Union[str, Path], atoms: Atoms, name: str = None) -> None:
     """
     Write the given atoms to a new mmCIF file.
@@ -208,7 +375,7 @@ def write_mmcif(cif_path: Union[str, Path], atoms: Atoms, name: str = None) -> N
         )
 
     atoms_str = (
-            atoms
+            dequantize_atom_coords(atoms)
             .with_columns(
                 cs.float().round(3),
             )
@@ -251,44 +418,294 @@ def make_biological_assembly(
         struct_oper_map: Dict[str, Frame],
         assembly_id: str,
 ) -> Atoms:
-    bio_opers = (
-            struct_assembly_gen
-            .filter(pl.col('assembly_id') == assembly_id)
+    template = AssemblyTemplate(
+            asym_atoms,
+            struct_assembly_gen,
+            struct_oper_map,
+            assembly_id,
     )
+    return template.atoms
 
-    if bio_opers.is_empty():
-        known_assemblies = \
-                struct_assembly_gen['assembly_id'].unique().to_list()
+class AssemblyTemplate:
+    """
+    Precompute everything about a biological assembly except the coordinates.
+
+    Generating a biological assembly involves two steps: copying the rows of 
+    the asymmetric unit that belong to each symmetry mate, and transforming 
+    the coordinates of each copy.  The first step is by far the more 
+    expensive, because every column (including all of the string columns) has 
+    to be copied.  However, it only depends on the structure and the assembly 
+    id.  This class performs the first step once, so that assemblies with new 
+    coordinates can be generated by only performing the second step.
+
+    This is useful when the same assembly needs to be generated repeatedly 
+    with different coordinates, e.g. for each model in an NMR ensemble, for 
+    each of several data augmentation transformations, or for different sets 
+    of symmetry operators.
+    """
 
-        err = MmcifError("can't find biological assembly")
-        err.info = [f"known assemblies: {known_assemblies}"]
-        err.blame = [f"unknown assembly: {assembly_id!r}"]
-        raise err
+    def __init__(
+            self,
+            asym_atoms: Atoms,
+            struct_assembly_gen: pl.DataFrame,
+            struct_oper_map: Dict[str, Frame],
+            assembly_id: str,
+    ):
+        """
+        Arguments:
+            asym_atoms:
+                The atoms in the asymmetric unit, e.g. `Structure.asym_atoms`.  
+                If this dataframe contains multiple models, use 
+                `select_model()` to pick one before creating the template.
+
+            struct_assembly_gen:
+                The rules for building each biological assembly, e.g. 
+                `Structure.assembly_gen`.
+
+            struct_oper_map:
+                The symmetry operators referenced by the above rules, e.g. 
+                `Structure.oper_map`.
+
+            assembly_id:
+                The id of the assembly to generate.
+        """
+        bio_opers = (
+                struct_assembly_gen
+                .filter(pl.col('assembly_id') == assembly_id)
+        )
+
+        if bio_opers.is_empty():
+            known_assemblies = \
+                    struct_assembly_gen['assembly_id'].unique().to_list()
+
+            err = MmcifError("can't find biological assembly")
+            err.info = [f"known assemblies: {known_assemblies}"]
+            err.blame = [f"unknown assembly: {assembly_id!r}"]
+            raise err
 
-    bio_atoms = []
-    symmetry_mate = 0
-
-    for row in bio_opers.iter_rows(named=True):
-        subchain_ids = row['subchain_ids']
-
-        for oper_ids in row['oper_ids']:
-            frame = reduce(op.matmul, (struct_oper_map[x] for x in oper_ids))
-            sym_atoms = (
-                    transform_atom_coords(
-                        asym_atoms.filter(
-                            pl.col('subchain_id').is_in(subchain_ids)
-                        ),
-                        frame,
-                    )
-                    .with_columns(
-                        symmetry_mate=pl.lit(symmetry_mate),
-                    )
+        asym_indices = []
+        oper_ids = []
+
+        for row in bio_opers.iter_rows(named=True):
+            i = np.flatnonzero(
+                    asym_atoms['subchain_id']
+                    .is_in(row['subchain_ids'])
+                    .fill_null(False)
+                    .to_numpy()
             )
-            symmetry_mate += 1
+            for ids in row['oper_ids']:
+                asym_indices.append(i)
+                oper_ids.append(ids)
+
+        self._init(asym_atoms, asym_indices, oper_ids, struct_oper_map)
+
+    @classmethod
+    def from_frames(
+            cls,
+            asym_atoms: Atoms,
+            frames_xy: Frames,
+    ) -> 'AssemblyTemplate':
+        """
+        Create a template where each symmetry mate is a copy of the entire 
+        asymmetric unit.
+
+        Arguments:
+            asym_atoms:
+                The atoms in the asymmetric unit.  Unlike the constructor, 
+                this doesn't require a ``subchain_id`` column.
+
+            frames_xy:
+                An array with shape (M, 4, 4) giving the transformation for 
+                each symmetry mate, e.g. from `find_crystal_symmetry_mates()`.
+
+        Returns:
+            A template with M symmetry mates.  The operator ids are the 
+            indices of the frames, as strings, so new frames can be given to 
+            `make_coords()` as ``oper_map={'0': ..., '1': ..., ...}``.
+        """
+        self = cls.__new__(cls)
+        self._init(
+                asym_atoms,
+                [np.arange(asym_atoms.height)] * len(frames_xy),
+                [[str(i)] for i in range(len(frames_xy))],
+                {str(i): frame for i, frame in enumerate(frames_xy)},
+        )
+        return self
 
-            bio_atoms.append(sym_atoms)
+    def _init(self, asym_atoms, asym_indices, oper_ids, oper_map):
+        sizes = [len(x) for x in asym_indices]
 
-    return pl.concat(bio_atoms).rechunk()
+        self.asym_atoms = asym_atoms
+        self.asym_indices = np.concatenate(asym_indices)
+        self.mate_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.mate_offsets[1:])
+
+        self.oper_ids = oper_ids
+        self.oper_map = oper_map
+        self.atoms = (
+                asym_atoms[self.asym_indices]
+                .with_columns(
+                    symmetry_mate=np.repeat(
+                        np.arange(len(sizes), dtype=np.int32),
+                        sizes,
+                    ),
+                )
+        )
+        self.atoms = self.replace_coords()
+
+    @property
+    def num_symmetry_mates(self) -> int:
+        return len(self.oper_ids)
+
+    def make_frames(
+            self,
+            oper_map: Optional[Dict[str, Frame]] = None,
+    ) -> Frames:
+        """
+        Calculate the transformation for each symmetry mate.
+
+        Arguments:
+            oper_map:
+                The symmetry operators to use.  By default, the operators 
+                given to the constructor are used.
+
+        Returns:
+            An array with shape (M, 4, 4), where M is the number of symmetry 
+            mates.
+        """
+        if oper_map is None:
+            oper_map = self.oper_map
+
+        return np.stack([
+            reduce(op.matmul, (oper_map[x] for x in oper_ids))
+            for oper_ids in self.oper_ids
+        ])
+
+    def make_coords(
+            self,
+            asym_coords: Union[Atoms, Coords3, None] = None,
+            *,
+            oper_map: Optional[Dict[str, Frame]] = None,
+            frame_xy: Optional[Frame] = None,
+    ) -> Coords3:
+        """
+        Calculate the coordinates of every atom in the assembly.
+
+        Arguments:
+            asym_coords:
+                Coordinates for the atoms in the asymmetric unit, either as a 
+                dataframe or as an array with shape (..., N, 3).  These 
+                coordinates must be in the same order as the asymmetric unit 
+                used to create the template, e.g. they could be from a 
+                different model of the same NMR structure.  Any leading 
+                dimensions are treated as independent sets of coordinates, 
+                e.g. one for each model in an `Ensemble`.  By default, the 
+                coordinates of the original asymmetric unit are used.
+
+            oper_map:
+                The symmetry operators to use.  By default, the operators 
+                given to the constructor are used.
+
+            frame_xy:
+                An additional transformation to apply to the whole assembly, 
+                after the symmetry operators.  This is combined with the 
+                symmetry operators before any coordinates are transformed, so 
+                it's essentially free.
+
+        Returns:
+            An array with shape (..., M, 3), where M is the number of atoms in 
+            the assembly.  The rows are in the same order as `atoms`.
+        """
+        if asym_coords is None:
+            asym_coords = self.asym_atoms
+        if isinstance(asym_coords, pl.DataFrame):
+            asym_coords = get_atom_coords(asym_coords)
+
+        assert asym_coords.shape[-2:] == (self.asym_atoms.height, 3)
+
+        frames = self.make_frames(oper_map)
+        if frame_xy is not None:
+            frames = frame_xy @ frames
+
+        coords = homogenize_coords(asym_coords[..., self.asym_indices, :])
+        bounds = zip(self.mate_offsets[:-1], self.mate_offsets[1:])
+
+        for frame, (i, j) in zip(frames, bounds):
+            coords[..., i:j, :] = transform_coords(coords[..., i:j, :], frame)
+
+        return coords[..., :3]
+
+    def replace_coords(
+            self,
+            asym_coords: Union[Atoms, Coords3, None] = None,
+            *,
+            oper_map: Optional[Dict[str, Frame]] = None,
+            frame_xy: Optional[Frame] = None,
+    ) -> Atoms:
+        """
+        Generate the assembly with new coordinates.
+
+        The arguments are the same as for `make_coords()`.  The returned 
+        dataframe shares all of its non-coordinate columns with `atoms`, so 
+        the only cost of this method is transforming the coordinates.
+        """
+        coords = self.make_coords(
+                asym_coords,
+                oper_map=oper_map,
+                frame_xy=frame_xy,
+        )
+        return replace_atom_coords(self.atoms, coords)
+
+    def make_bonds(self, asym_bonds: pl.DataFrame) -> pl.DataFrame:
+        """
+        Copy the bonds in the asymmetric unit into each symmetry mate.
+
+        Arguments:
+            asym_bonds:
+                The bonds between the atoms in the asymmetric unit used to 
+                create the template, e.g. from `find_bonds()`.
+
+        Returns:
+            A dataframe with the same columns as *asym_bonds*, but with row 
+            indices that refer to `atoms`.  Each bond is copied once for each 
+            symmetry mate that includes both of its atoms, and the indices of 
+            the bonds in symmetry mate *m* are offset by ``mate_offsets[m]``.  
+            Bonds between atoms in different symmetry mates are not included.
+        """
+        asym_i = asym_bonds['atom_i'].to_numpy()
+        asym_j = asym_bonds['atom_j'].to_numpy()
+
+        # Map each atom in the asymmetric unit to its index in the assembly, 
+        # one symmetry mate at a time.
+        assembly_indices = np.full(self.asym_atoms.height, -1, dtype=np.int64)
+        bond_indices = []
+        atom_i = []
+        atom_j = []
+
+        bounds = zip(self.mate_offsets[:-1], self.mate_offsets[1:])
+
+        for i, j in bounds:
+            mate_indices = self.asym_indices[i:j]
+            assembly_indices[mate_indices] = np.arange(i, j)
+
+            mate_i = assembly_indices[asym_i]
+            mate_j = assembly_indices[asym_j]
+            keep = (mate_i >= 0) & (mate_j >= 0)
+
+            bond_indices.append(np.flatnonzero(keep))
+            atom_i.append(mate_i[keep])
+            atom_j.append(mate_j[keep])
+
+            assembly_indices[mate_indices] = -1
+
+        return (
+                asym_bonds[np.concatenate(bond_indices)]
+                .with_columns(
+                    atom_i=np.concatenate(atom_i),
+                    atom_j=np.concatenate(atom_j),
+                )
+                .cast({'atom_i': pl.UInt32, 'atom_j': pl.UInt32})
+        )
 
 def get_pdb_path(pdb_dir: Union[Path, str], pdb_id: str, suffix: str = '.cif.gz'):
     """
@@ -306,6 +723,31 @@ def _add_path_to_mmcif_error(path: Path):
         err.info = [f'path: {path}', *err.info]
         raise
 
+def _extract_structure(
+        cif,
+        *,
+        coord_dtype=pl.Float64,
+        bonds=False,
+        unit_cell=False,
+):
+    struct = Structure(cif.name)
+    struct.asym_atoms = _extract_atom_site(cif, coord_dtype=coord_dtype)
+    struct.assemblies = _extract_struct_assembly(cif)
+    struct.assembly_gen, struct.oper_map = \
+            _extract_struct_assembly_gen(cif, struct.asym_atoms)
+    struct.entities = _extract_entities(cif)
+    struct.polymers = _extract_polymers(cif)
+
+    # These categories aren't needed by most callers, and parsing them 
+    # noticeably slows down reading small structures.
+    if unit_cell:
+        struct.unit_cell = _extract_unit_cell(cif)
+    if bonds:
+        struct.struct_conn = _extract_struct_conn(cif)
+        struct.chem_comp_bonds = _extract_chem_comp_bonds(cif)
+
+    return struct
+
 def _extract_dataframe(cif, key_prefix, schema):
     # Gemmi automatically interprets `?` and `.`, but this leads to a few 
     # problems.  First is that it makes column dtypes dependent on the data; if 
@@ -319,12 +761,19 @@ def _extract_dataframe(cif, key_prefix, schema):
     # explicitly specify a schema where each column is a string.  Doing this 
     # happens to convert any booleans present in the data to null, thereby 
     # solving both of the above problems at once.
-
-    loop = {
-            k: [v if isinstance(v, str) else None for v in vs]
-            for k, vs in cif.get_mmcif_category(f'_{key_prefix}.').items()
-    }
-    df = pl.DataFrame(loop, {k: str for k in loop})
+    #
+    # BinaryCIF blocks (see `read_bcif()`) don't have these problems.  Their 
+    # columns are already typed, and null values are explicitly masked, so 
+    # they're decoded directly into a data frame.
+
+    if isinstance(cif, gemmi.cif.Block):
+        loop = {
+                k: [v if isinstance(v, str) else None for v in vs]
+                for k, vs in cif.get_mmcif_category(f'_{key_prefix}.').items()
+        }
+        df = pl.DataFrame(loop, {k: str for k in loop})
+    else:
+        df = cif.get_dataframe(key_prefix, [v.name for v in schema.values()])
 
     if df.is_empty():
         schema = {k: v.dtype for k, v in schema.items()}
@@ -362,59 +811,114 @@ def _extract_dataframe(cif, key_prefix, schema):
             .filter(~pl.all_horizontal(pl.all().is_null()))
     )
 
-def _extract_atom_site(cif):
-    return (
-            _extract_dataframe(
-                cif, 'atom_site',
-                schema=dict(
-                    model_id=Column('pdbx_PDB_model_num'), 
-                    chain_id=Column('auth_asym_id'),
-                    subchain_id=Column('label_asym_id'),
-                    entity_id=Column('label_entity_id'),
-                    alt_id=Column('label_alt_id'),
-                    seq_id=Column('label_seq_id', dtype=int),
-                    seq_label_1=Column('auth_seq_id'),
-                    seq_label_2=Column('pdbx_PDB_ins_code'),
-                    comp_id=Column('label_comp_id'),
-                    atom_id=Column('label_atom_id'),
-                    element=Column('type_symbol', required=True),
-                    x=Column('Cartn_x', dtype=float, required=True),
-                    y=Column('Cartn_y', dtype=float, required=True),
-                    z=Column('Cartn_z', dtype=float, required=True),
-                    occupancy=Column('occupancy', dtype=float),
-                    b_factor=Column('B_iso_or_equiv', dtype=float),
-                ),
+def _extract_atom_site(cif, columns=None, *, coord_dtype=pl.Float64):
+    """
+    Arguments:
+        columns:
+            The names of the output columns to parse.  By default, every 
+            column is parsed.  Columns not in this list are skipped entirely, 
+            which is faster than parsing and then dropping them.
+
+        coord_dtype:
+            The data type of the coordinate columns.  Floating point 
+            coordinates are parsed directly into this type, so there's no 
+            intermediate double precision copy.  Integer coordinates are 
+            quantized, see `quantize_atom_coords()`.
+    """
+    if columns is None:
+        columns = _ATOM_SITE_SCHEMA
+
+    quantize = coord_dtype.is_integer()
+    parse_dtype = pl.Float64 if quantize else coord_dtype
+
+    schema = dict(
+            model_id=Column('pdbx_PDB_model_num'), 
+            chain_id=Column('auth_asym_id'),
+            subchain_id=Column('label_asym_id'),
+            entity_id=Column('label_entity_id'),
+            alt_id=Column('label_alt_id'),
+            seq_id=Column('label_seq_id', dtype=int),
+            seq_label_1=Column('auth_seq_id'),
+            seq_label_2=Column('pdbx_PDB_ins_code'),
+            comp_id=Column('label_comp_id'),
+            atom_id=Column('label_atom_id'),
+            element=Column('type_symbol', required=True),
+            x=Column('Cartn_x', dtype=parse_dtype, required=True),
+            y=Column('Cartn_y', dtype=parse_dtype, required=True),
+            z=Column('Cartn_z', dtype=parse_dtype, required=True),
+            occupancy=Column('occupancy', dtype=float),
+            b_factor=Column('B_iso_or_equiv', dtype=float),
+    )
+    schema = {
+            k: v
+            for k, v in schema.items()
+            if k in columns or (
+                k.startswith('seq_label_') and 'seq_label' in columns
             )
-            .with_columns(
-                pl.concat_str(
+    }
+
+    atoms = _extract_dataframe(cif, 'atom_site', schema)
+
+    if 'seq_label' in columns:
+        atoms = (
+                atoms
+                .with_columns(
+                    pl.concat_str(
+                        'seq_label_1',
+                        'seq_label_2',
+                        ignore_nulls=True,
+                    ).alias('seq_label').replace({'': None}),
+                )
+                .drop(
                     'seq_label_1',
                     'seq_label_2',
-                    ignore_nulls=True,
-                ).alias('seq_label').replace({'': None}),
+                )
+        )
 
-                # All of the elements in the PDB are uppercase anyways, but it 
-                # doesn't hurt to make sure.
+    if 'element' in columns:
+        # All of the elements in the PDB are uppercase anyways, but it doesn't 
+        # hurt to make sure.
+        atoms = atoms.with_columns(
                 pl.col('element').str.to_uppercase(),
+        )
 
-                # Some structures (e.g. 1mno) have atoms with negative 
-                # occupancies.  I'm not aware of any structures with 
-                # occupancies greater than 1, but if they exist, such values 
-                # also wouldn't make any sense.  
-                #
-                # While there's some argument for leaving these nonsensical 
-                # values so the user can deal with them how they want, I think 
-                # that most users will simply not realize that this could be a 
-                # problem at all.  Clipping these values may not be exactly 
-                # what the user wants, but it will never be a crazy thing to 
-                # do, and it has the potential to avoid subtle bugs.  Overall, 
-                # I think it's worth doing.
+    if quantize and 'x' in columns:
+        atoms = quantize_atom_coords(atoms, dtype=coord_dtype)
+
+    if 'occupancy' in columns:
+        # Some structures (e.g. 1mno) have atoms with negative occupancies.  
+        # I'm not aware of any structures with occupancies greater than 1, but 
+        # if they exist, such values also wouldn't make any sense.  
+        #
+        # While there's some argument for leaving these nonsensical values so 
+        # the user can deal with them how they want, I think that most users 
+        # will simply not realize that this could be a problem at all.  
+        # Clipping these values may not be exactly what the user wants, but it 
+        # will never be a crazy thing to do, and it has the potential to avoid 
+        # subtle bugs.  Overall, I think it's worth doing.
+        atoms = atoms.with_columns(
                 pl.col('occupancy').clip(0, 1),
-            )
-            .drop(
-                'seq_label_1',
-                'seq_label_2',
-            )
-    )
+        )
+
+    return atoms
+
+_ATOM_SITE_SCHEMA = dict(
+        model_id=pl.String,
+        chain_id=pl.String,
+        subchain_id=pl.String,
+        entity_id=pl.String,
+        alt_id=pl.String,
+        seq_id=pl.Int64,
+        comp_id=pl.String,
+        atom_id=pl.String,
+        element=pl.String,
+        x=pl.Float64,
+        y=pl.Float64,
+        z=pl.Float64,
+        occupancy=pl.Float64,
+        b_factor=pl.Float64,
+        seq_label=pl.String,
+)
 
 def _extract_struct_assembly(cif):
         return _extract_dataframe(
@@ -545,6 +1049,82 @@ def _extract_polymers(cif):
             )
     )
 
+def _extract_unit_cell(cif):
+    """
+    Extract the dimensions of the unit cell and the space group of the 
+    crystal.  The resulting dataframe has one row, or none if the mmCIF file 
+    doesn't describe a unit cell.
+    """
+    cell = _extract_dataframe(
+            cif, 'cell',
+            schema=dict(
+                a_A=Column('length_a', dtype=float, required=True),
+                b_A=Column('length_b', dtype=float, required=True),
+                c_A=Column('length_c', dtype=float, required=True),
+                alpha_deg=Column('angle_alpha', dtype=float, required=True),
+                beta_deg=Column('angle_beta', dtype=float, required=True),
+                gamma_deg=Column('angle_gamma', dtype=float, required=True),
+            ),
+    )
+    symmetry = _extract_dataframe(
+            cif, 'symmetry',
+            schema=dict(
+                space_group=Column('space_group_name_H-M', dtype=str),
+            ),
+    )
+
+    if cell.is_empty():
+        return cell.with_columns(space_group=pl.lit(None, dtype=str))
+
+    if symmetry.is_empty():
+        symmetry = pl.DataFrame({'space_group': [None]}, {'space_group': str})
+
+    return pl.concat([cell.head(1), symmetry.head(1)], how='horizontal')
+
+def _extract_struct_conn(cif):
+    """
+    Extract the connections between atoms that aren't implied by the 
+    standard polymer linkages, e.g. disulfide bonds, bonds to ligands, and 
+    metal coordination.  Each partner is identified by the same columns that 
+    `_extract_atom_site()` uses to identify atoms.
+    """
+    schema = dict(type=Column('conn_type_id', required=True))
+
+    for i in '12':
+        schema.update({
+                f'subchain_id_{i}': Column(f'ptnr{i}_label_asym_id', required=True),
+                f'seq_id_{i}': Column(f'ptnr{i}_label_seq_id', dtype=int),
+                f'seq_label_{i}': Column(f'ptnr{i}_auth_seq_id'),
+                f'ins_code_{i}': Column(f'pdbx_ptnr{i}_PDB_ins_code'),
+                f'comp_id_{i}': Column(f'ptnr{i}_label_comp_id', required=True),
+                f'atom_id_{i}': Column(f'ptnr{i}_label_atom_id', required=True),
+                f'alt_id_{i}': Column(f'pdbx_ptnr{i}_label_alt_id'),
+                f'symmetry_{i}': Column(f'ptnr{i}_symmetry'),
+        })
+
+    return (
+            _extract_dataframe(cif, 'struct_conn', schema)
+            .with_columns(
+                pl.concat_str(
+                    f'seq_label_{i}',
+                    f'ins_code_{i}',
+                    ignore_nulls=True,
+                ).replace({'': None})
+                for i in '12'
+            )
+            .drop('ins_code_1', 'ins_code_2')
+    )
+
+def _extract_chem_comp_bonds(cif):
+    return _extract_dataframe(
+            cif, 'chem_comp_bond',
+            schema=dict(
+                comp_id=Column('comp_id', required=True),
+                atom_id_1=Column('atom_id_1', required=True),
+                atom_id_2=Column('atom_id_2', required=True),
+            ),
+    )
+
 def _parse_oper_expression(expr: str):
     parser = _make_oper_expression_parser()
 
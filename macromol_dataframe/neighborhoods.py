@@ -0,0 +1,180 @@
+import numpy as np
+
+from .atoms import Atoms, get_atom_coords, replace_atom_coords
+from .coords import (
+        Coords3, Frames, make_coord_frame, get_origin, homogenize_coords,
+)
+from scipy.spatial import cKDTree
+from scipy.spatial.transform import Rotation
+
+from typing import Optional, Tuple
+
+class NeighborhoodSampler:
+    """
+    Efficiently extract many spherical neighborhoods from the same structure.
+
+    Building a training example typically involves picking a point within a 
+    structure, then cropping and re-centering all the atoms within some radius 
+    of that point.  Doing this by filtering the whole dataframe for each 
+    neighborhood is wasteful, because every atom has to be considered each 
+    time.  Instead, this class builds a spatial index of the atoms once, then 
+    uses that index to find the atoms in each neighborhood.  The cost of 
+    making a neighborhood is then proportional to the number of atoms in the 
+    neighborhood, not the number of atoms in the structure.
+
+    Neighborhoods are described by coordinate frames.  The origin of each 
+    frame is the center of the neighborhood, and the atoms in each 
+    neighborhood are transformed into that frame.  See `sample_frames()` for a 
+    way to generate random frames.
+    """
+
+    def __init__(self, atoms: Atoms, *, radius_A: float):
+        """
+        Arguments:
+            atoms:
+                The atoms to sample neighborhoods from, e.g. as created by 
+                `read_biological_assembly()`.  Any filtering (e.g. removing 
+                water or hydrogen atoms) should be done before creating the 
+                sampler.
+
+            radius_A:
+                The radius of each neighborhood, in angstroms.
+        """
+        self.atoms = atoms
+        self.radius_A = radius_A
+        self._coords = get_atom_coords(atoms)
+        self._tree = cKDTree(self._coords)
+
+    def sample_frames(
+            self,
+            n: int,
+            rng: Optional[np.random.Generator] = None,
+            *,
+            random_rotation: bool = True,
+    ) -> Frames:
+        """
+        Pick random neighborhoods.
+
+        Arguments:
+            n:
+                The number of neighborhoods to pick.
+
+            rng:
+                The random number generator to use.  Specify a seeded 
+                generator to get reproducible neighborhoods.
+
+            random_rotation:
+                If False, the neighborhoods will have the same orientation as 
+                the structure itself.
+
+        Returns:
+            An array of coordinate frames with shape (n, 4, 4).  The origin of 
+            each frame is the position of an atom chosen uniformly at random, 
+            and the orientation is chosen uniformly at random from all 
+            possible rotations.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        i = rng.integers(len(self._coords), size=n)
+        origins = self._coords[i]
+        rotation = Rotation.random(n, random_state=rng) \
+                if random_rotation else None
+
+        return make_coord_frame(origins, rotation)
+
+    def find_neighborhood_indices(
+            self,
+            frames_xy: Frames,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the atoms that belong to each of the given neighborhoods.
+
+        Arguments:
+            frames_xy:
+                An array of coordinate frames with shape (N, 4, 4).  Only the 
+                origins of these frames are relevant.
+
+        Returns:
+            A tuple of two arrays: the row indices of the atoms in every 
+            neighborhood, concatenated together, and the offsets of each 
+            neighborhood within that array.  The indices for neighborhood *i* 
+            are ``indices[offsets[i]:offsets[i+1]]``, and are sorted.
+        """
+        centers = get_origin(frames_xy).reshape(-1, 3)
+        return self.find_indices(centers)
+
+    def find_indices(self, centers_A: Coords3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the atoms within the sampler's radius of each of the given points.
+
+        See `find_neighborhood_indices()` for a description of the return 
+        value.
+        """
+        hits = self._tree.query_ball_point(
+                centers_A,
+                self.radius_A,
+                return_sorted=True,
+                workers=-1,
+        )
+        sizes = np.fromiter(map(len, hits), dtype=np.int64, count=len(hits))
+        offsets = np.zeros(len(hits) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+
+        if offsets[-1]:
+            indices = np.concatenate([x for x in hits if x]).astype(np.int64)
+        else:
+            indices = np.zeros(0, dtype=np.int64)
+
+        return indices, offsets
+
+    def make_neighborhoods(self, frames_xy: Frames) -> Atoms:
+        """
+        Crop and transform the atoms in each of the given neighborhoods.
+
+        Arguments:
+            frames_xy:
+                An array of coordinate frames with shape (N, 4, 4).  Each 
+                frame defines the center and orientation of one neighborhood.
+
+        Returns:
+            A single dataframe containing all of the neighborhoods.  This 
+            dataframe has the same columns as the atoms given to the 
+            constructor, plus a ``neighborhood_id`` column that identifies 
+            which frame each row belongs to.  The coordinates of each atom are 
+            expressed in the frame of its neighborhood.  Note that atoms will 
+            be duplicated if they belong to multiple overlapping 
+            neighborhoods.
+        """
+        frames_xy = frames_xy.reshape(-1, 4, 4)
+        indices, offsets = self.find_neighborhood_indices(frames_xy)
+
+        neighborhood_ids = np.repeat(
+                np.arange(len(frames_xy), dtype=np.uint32),
+                np.diff(offsets),
+        )
+        coords_x = homogenize_coords(self._coords[indices])
+        coords_y = np.einsum(
+                'nij,nj->ni',
+                frames_xy[neighborhood_ids].astype(coords_x.dtype, copy=False),
+                coords_x,
+        )
+
+        atoms = self.atoms[indices].with_columns(
+                neighborhood_id=neighborhood_ids,
+        )
+        return replace_atom_coords(atoms, coords_y)
+
+    def sample_neighborhoods(
+            self,
+            n: int,
+            rng: Optional[np.random.Generator] = None,
+    ) -> Atoms:
+        """
+        Pick random neighborhoods, then crop and transform the atoms in each.
+
+        This is a shortcut for calling `sample_frames()` followed by 
+        `make_neighborhoods()`.
+        """
+        frames_xy = self.sample_frames(n, rng)
+        return self.make_neighborhoods(frames_xy)
@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+U = TypeVar('U')
+
+def map_processes(
+        f: Callable[[T], U],
+        xs: Iterable[T],
+        *,
+        processes: Optional[int],
+) -> Iterator[U]:
+    """
+    Apply the given function to each item in a pool of worker processes.
+
+    Arguments:
+        f:
+            The function to apply.  This function must be picklable.
+
+        xs:
+            The items to apply the function to.
+
+        processes:
+            The number of worker processes.  If None, this is the number of 
+            CPUs.  If 1, every item is processed in the current process.
+
+    Returns:
+        An iterator over the results, in the same order as *xs*.  Like 
+        `concurrent.futures.Executor.map()`, except that new items are only 
+        submitted as the results are consumed, so that at most two items per 
+        worker are in flight at any time.  This keeps finished results from 
+        piling up in memory when they're consumed more slowly than they're 
+        produced.
+    """
+    if processes == 1:
+        yield from map(f, xs)
+        return
+
+    # Polars isn't fork-safe, so the worker processes have to be spawned.
+    spawn = multiprocessing.get_context('spawn')
+    processes = processes or os.cpu_count()
+
+    with ProcessPoolExecutor(processes, mp_context=spawn) as executor:
+        pending = deque()
+
+        for x in xs:
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+            pending.append(executor.submit(f, x))
+
+        while pending:
+            yield pending.popleft().result()
@@ -1,4 +1,8 @@
 import polars as pl
+import numpy as np
+
+from .atoms import dequantize_atom_coords, _is_quantized
+from .canonical import is_canonical_atoms
 
 def assign_residue_ids(atoms, *, drop_null_ids=True, maintain_order=False):
     """
@@ -10,6 +14,7 @@ def assign_residue_ids(atoms, *, drop_null_ids=True, maintain_order=False):
             loaded by :func:`read_mmcif()` or similar, but only the following 
             columns are used:
 
+            - ``structure_id`` (optional)
             - ``model_id`` (optional)
             - ``symmetry_mate`` (optional)
             - ``subchain_id``
@@ -24,17 +29,37 @@ def assign_residue_ids(atoms, *, drop_null_ids=True, maintain_order=False):
             any residue.  If False, these atoms may be grouped into a single 
             "residue".
 
+        maintain_order:
+            This argument has no effect, and is only accepted for the sake of 
+            backwards compatibility.  Residue ids are now always numbered in 
+            the order that the residues first appear in the dataframe, which 
+            previously required passing True.
+
     Returns:
         A dataframe with the same columns as `atoms`, plus a new column called 
-        `residue_id`.
+        `residue_id`.  The rows are grouped by residue, in order of residue 
+        id, so the ``residue_id`` column is sorted.  Within each residue, the 
+        atoms keep their original relative order.
 
     Note that the residues identified by this function are not necessarily 
     *protein* residues, and are not necessarily complete, so they are not 
     guaranteed to have Cα atoms or anything like that.
+
+    The ``structure_id`` column makes it possible to assign residue ids to 
+    many structures at once, e.g. after concatenating the atoms from a large 
+    number of structures into a single dataframe.  This is much faster than 
+    calling this function separately for each structure.
+
+    If the atoms are in canonical order (see `canonicalize_atoms()`), the 
+    atoms belonging to each residue are known to be contiguous, and the ids 
+    are assigned by simply comparing each atom to the previous one, without 
+    any sorting.
     """
-    
+
     id_cols = []
 
+    if 'structure_id' in atoms.columns:
+        id_cols += ['structure_id']
     if 'model_id' in atoms.columns:
         id_cols += ['model_id']
     if 'symmetry_mate' in atoms.columns:
@@ -42,18 +67,39 @@ def assign_residue_ids(atoms, *, drop_null_ids=True, maintain_order=False):
 
     id_cols += ['subchain_id', 'seq_id']
 
+    if is_canonical_atoms(atoms):
+        if drop_null_ids:
+            atoms = atoms.drop_nulls('seq_id')
+
+        return (
+                atoms
+                .select(
+                    pl.struct(id_cols).rle_id().alias('residue_id'),
+                    pl.all(),
+                )
+                .set_sorted('residue_id')
+        )
+
     atoms = atoms.lazy()
 
     if drop_null_ids:
         atoms = atoms.drop_nulls('seq_id')
 
+    # Identify each residue by the index of its first atom, then compact these 
+    # indices into consecutive ids.  A stable sort then groups the atoms from 
+    # each residue together, which is much cheaper than grouping and 
+    # exploding every column.
     return (
             atoms
-            .group_by(id_cols, maintain_order=maintain_order)
-            .agg(atom_cols=pl.struct(pl.col('*')))
             .with_row_index('residue_id')
-            .explode('atom_cols')
-            .select('residue_id', pl.col('atom_cols').struct.field('*'))
+            .with_columns(
+                pl.col('residue_id')
+                .min()
+                .over(id_cols)
+                .rank('dense')
+                .sub(1)
+            )
+            .sort('residue_id', maintain_order=True)
             .collect()
     )
 
@@ -70,6 +116,10 @@ def explode_residue_conformations(atoms, id_name='alt_id'):
             - ``residue_id``, e.g. created by :func:`assign_residue_ids()`.
             - ``alt_id``
 
+            If the dataframe also has a ``structure_id`` column, residues will 
+            be identified by both their structure and residue ids.  This makes 
+            it possible to process many structures at once.
+
         id_name:
             The name to use for the column containing the exploded alternate 
             location ids.  By default, the exploded ids will overwrite the 
@@ -85,6 +135,11 @@ def explode_residue_conformations(atoms, id_name='alt_id'):
     residue conformation.  This requires making one copy of each "no id" atom 
     for each different conformation the residue can adopt, then giving the 
     appropriate alternate id to each copy.
+
+    If the ``residue_id`` column is sorted, which is the case for any 
+    dataframe that hasn't been reordered since `assign_residue_ids()` was 
+    called, the atoms belonging to each residue are contiguous.  This allows 
+    the copies to be made without grouping or joining.
     """
 
     # This logic fails for empty inputs, due to pola-rs/polars#22006.  
@@ -92,6 +147,15 @@ def explode_residue_conformations(atoms, id_name='alt_id'):
     if atoms.is_empty():
         return atoms.with_columns(pl.col('alt_id').alias(id_name))
 
+    id_cols = ['residue_id']
+    if 'structure_id' in atoms.columns:
+        id_cols = ['structure_id', *id_cols]
+
+    if atoms.get_column('residue_id').is_sorted():
+        return _explode_contiguous_residue_conformations(
+                atoms, id_cols, id_name,
+        )
+
     return (
             atoms
             .lazy()
@@ -100,7 +164,7 @@ def explode_residue_conformations(atoms, id_name='alt_id'):
             # residue:
             .with_columns(
                     alt_ids=pl.col('alt_id')
-                        .over('residue_id', mapping_strategy='join')
+                        .over(id_cols, mapping_strategy='join')
                         .list.drop_nulls()
                         .list.unique()
             )
@@ -126,3 +190,352 @@ def explode_residue_conformations(atoms, id_name='alt_id'):
             .collect()
     )
 
+def select_residue_conformations(
+        atoms,
+        *,
+        strategy='occupancy',
+        group='residue',
+        rng=None,
+):
+    """
+    Pick a single alternate conformation for each residue.
+
+    Arguments:
+        atoms:
+            A dataframe of atom coordinates.  This dataframe must have the 
+            following columns:
+
+            - ``residue_id``, e.g. created by :func:`assign_residue_ids()`.
+            - ``alt_id``
+            - ``occupancy``, if *strategy* is ``'occupancy'``.
+
+            If the dataframe also has a ``structure_id`` column, residues will 
+            be identified by both their structure and residue ids.  This makes 
+            it possible to process many structures at once.
+
+        strategy:
+            How to pick the conformation:
+
+            - ``'occupancy'``: The conformation with the highest mean 
+              occupancy.
+            - ``'first'``: The conformation with the alternate location id 
+              that comes first alphabetically, which is usually ``'A'``.
+            - ``'random'``: A random conformation.  Each conformation is 
+              equally likely to be picked, regardless of its occupancy.
+
+            Ties are broken in favor of the alphabetically first id.
+
+        group:
+            Which residues to pick conformations for together:
+
+            - ``'residue'``: Pick a conformation for each residue 
+              independently.
+            - ``'connected'``: Pick the same conformation for runs of 
+              consecutive residues (i.e. residues with consecutive 
+              ``residue_id`` values) that have alternate location ids in 
+              common.  This is usually what the authors of the structure 
+              intended, since the conformations of neighboring residues are 
+              often correlated.  For strategies that score each conformation, 
+              the score is calculated over every atom in the group.  If 
+              some residue in a group doesn't have the picked conformation, 
+              it gets the best conformation that it does have.
+
+        rng:
+            The random number generator to use, if *strategy* is 
+            ``'random'``.  Specify a seeded generator to get reproducible 
+            results.
+
+    Returns:
+        A dataframe with the same columns as *atoms*, and only the atoms that 
+        either have no alternate location id or belong to the picked 
+        conformation of their residue.  The order of the rows is unchanged.
+
+    Unlike `explode_residue_conformations()`, this function never copies any 
+    atoms.  The conformations are scored using a table with one row per 
+    conformation per residue, which is typically very small, and then the 
+    atoms are filtered in a single pass.
+    """
+    key_cols = ['residue_id']
+    if 'structure_id' in atoms.columns:
+        key_cols = ['structure_id', *key_cols]
+
+    alts = (
+            atoms
+            .lazy()
+            .filter(pl.col('alt_id').is_not_null())
+            .group_by(*key_cols, 'alt_id', maintain_order=True)
+            .agg(
+                occupancy_sum=(
+                    pl.col('occupancy').sum()
+                    if strategy == 'occupancy' else
+                    pl.lit(0.0)
+                ),
+                num_atoms=pl.len(),
+            )
+            .collect()
+    )
+    residues = alts.select(key_cols).unique(maintain_order=True)
+
+    if group == 'residue':
+        residues = residues.with_row_index('group_id')
+
+    elif group == 'connected':
+        # Find the residues that share an alternate location id with the 
+        # preceding residue.  Each residue that doesn't starts a new group.
+        prev_alts = alts.select(
+                *key_cols[:-1],
+                pl.col('residue_id') + 1,
+                'alt_id',
+        )
+        linked = (
+                alts
+                .join(prev_alts, on=[*key_cols, 'alt_id'], how='semi')
+                .select(key_cols)
+                .unique()
+                .with_columns(is_linked=pl.lit(True))
+        )
+        residues = (
+                residues
+                .join(linked, on=key_cols, how='left')
+                .sort(key_cols)
+                .select(
+                    *key_cols,
+                    group_id=pl.col('is_linked').is_null().cum_sum(),
+                )
+        )
+
+    else:
+        raise ValueError(f"unknown residue group: {group!r}")
+
+    group_alts = (
+            alts
+            .join(residues, on=key_cols)
+            .group_by('group_id', 'alt_id', maintain_order=True)
+            .agg(
+                pl.col('occupancy_sum').sum() / pl.col('num_atoms').sum()
+            )
+    )
+
+    if strategy == 'occupancy':
+        group_alts = group_alts.rename({'occupancy_sum': 'score'})
+    elif strategy == 'first':
+        group_alts = group_alts.with_columns(score=pl.lit(0.0))
+    elif strategy == 'random':
+        if rng is None:
+            rng = np.random.default_rng()
+        group_alts = group_alts.with_columns(
+                score=pl.Series(rng.random(group_alts.height)),
+        )
+    else:
+        raise ValueError(f"unknown conformation strategy: {strategy!r}")
+
+    picked_alts = (
+            alts
+            .join(residues, on=key_cols)
+            .join(group_alts, on=['group_id', 'alt_id'])
+            .sort(['score', 'alt_id'], descending=[True, False])
+            .unique(key_cols, keep='first')
+            .select(pl.struct(*key_cols, 'alt_id'))
+            .to_series()
+    )
+
+    return atoms.filter(
+            pl.col('alt_id').is_null() |
+            pl.struct(*key_cols, 'alt_id').is_in(picked_alts.implode())
+    )
+
+def _explode_contiguous_residue_conformations(atoms, id_cols, id_name):
+    residue_i = (
+            atoms
+            .select(pl.struct(id_cols).rle_id())
+            .to_series()
+            .to_numpy()
+    )
+    alt_ids = atoms.get_column('alt_id')
+    has_alt_id = alt_ids.is_not_null().to_numpy()
+
+    # Make a table of the distinct alternate ids in each residue, in the order 
+    # they first appear.  Only atoms with alternate ids are involved, and 
+    # these are usually a small fraction of the total.
+    residue_alt_ids = (
+            pl.DataFrame({
+                'residue_i': residue_i[has_alt_id],
+                'alt_id': alt_ids.filter(has_alt_id),
+            })
+            .unique(maintain_order=True)
+    )
+    num_residues = residue_i[-1] + 1
+    num_alt_ids = np.bincount(
+            residue_alt_ids['residue_i'].to_numpy(),
+            minlength=num_residues,
+    )
+    alt_id_offsets = np.cumsum(num_alt_ids) - num_alt_ids
+
+    # Each atom without an alternate id is copied once for each alternate id 
+    # in its residue (or just once, if there aren't any).  Every other atom 
+    # is kept as is.
+    num_copies = np.where(
+            has_alt_id,
+            1,
+            np.maximum(num_alt_ids[residue_i], 1),
+    )
+    rows = np.repeat(np.arange(len(residue_i)), num_copies)
+    copy_i = np.arange(len(rows)) - np.repeat(
+            np.cumsum(num_copies) - num_copies,
+            num_copies,
+    )
+
+    is_copy = ~has_alt_id[rows] & (num_alt_ids[residue_i[rows]] > 0)
+    exploded_alt_ids = alt_ids.gather(rows).scatter(
+            np.flatnonzero(is_copy),
+            residue_alt_ids.get_column('alt_id').gather(
+                alt_id_offsets[residue_i[rows[is_copy]]] + copy_i[is_copy]
+            ),
+    )
+
+    return atoms[rows].with_columns(exploded_alt_ids.alias(id_name))
+
+def make_residue_table(atoms, *, offsets=False):
+    """
+    Calculate a number of common per-residue properties, all at once.
+
+    Arguments:
+        atoms:
+            A dataframe of atom coordinates.  This dataframe must have a 
+            ``residue_id`` column, e.g. created by :func:`assign_residue_ids()`, 
+            and the atoms belonging to each residue must be contiguous.  This 
+            is always the case for dataframes that haven't been reordered 
+            since their residue ids were assigned.  The ``comp_id``, 
+            ``atom_id``, ``x``, ``y``, and ``z`` columns are also required.
+
+        offsets:
+            If True, also return an array mapping each residue to the rows of 
+            *atoms* that belong to it.
+
+    Returns:
+        A dataframe with one row per residue, in order of residue id, and the 
+        following columns:
+
+        - ``residue_id``
+        - Any of the following identifiers that are present in *atoms*: 
+          ``structure_id``, ``model_id``, ``symmetry_mate``, ``chain_id``, 
+          ``subchain_id``, ``seq_id``, ``seq_label``, ``comp_id``.
+        - ``one_letter_code``: The one-letter code corresponding to 
+          ``comp_id``, or ``X`` if there isn't one.
+        - ``num_atoms``
+        - ``ca_x``, ``ca_y``, ``ca_z``: The coordinates of the Cα atom, or 
+          null if the residue doesn't have one.  If there are multiple Cα 
+          atoms, e.g. due to alternate conformations, the first is used.
+        - ``centroid_x``, ``centroid_y``, ``centroid_z``: The mean 
+          coordinates of all the atoms in the residue.
+        - ``b_factor``, ``occupancy``: The mean B-factor and occupancy of the 
+          atoms in the residue.  These columns are only present if the 
+          corresponding columns are present in *atoms*.
+
+        If *offsets* is True, a tuple is returned instead.  The first element 
+        is the above dataframe, and the second is an integer array of length 
+        N + 1, where N is the number of residues.  The atoms belonging to 
+        residue *i* are ``atoms[offsets[i]:offsets[i+1]]``.
+    """
+    residue_ids = atoms.get_column('residue_id')
+    if not residue_ids.is_sorted():
+        raise ValueError("atoms must be sorted by `residue_id`")
+
+    if _is_quantized(atoms):
+        atoms = dequantize_atom_coords(atoms)
+
+    id_cols = [
+            x for x in [
+                'structure_id',
+                'model_id',
+                'symmetry_mate',
+                'chain_id',
+                'subchain_id',
+                'seq_id',
+                'seq_label',
+                'comp_id',
+            ]
+            if x in atoms.columns
+    ]
+    mean_cols = [
+            x for x in ['b_factor', 'occupancy']
+            if x in atoms.columns
+    ]
+    is_ca = pl.col('atom_id') == 'CA'
+
+    residues = (
+            atoms
+            .lazy()
+            .with_columns(pl.col('residue_id').set_sorted())
+            .group_by('residue_id', maintain_order=True)
+            .agg(
+                pl.col(id_cols).first(),
+                num_atoms=pl.len(),
+                ca_x=pl.col('x').filter(is_ca).first(),
+                ca_y=pl.col('y').filter(is_ca).first(),
+                ca_z=pl.col('z').filter(is_ca).first(),
+                centroid_x=pl.col('x').mean(),
+                centroid_y=pl.col('y').mean(),
+                centroid_z=pl.col('z').mean(),
+                *[pl.col(x).mean() for x in mean_cols],
+            )
+            .with_columns(
+                one_letter_code=pl.col('comp_id').replace_strict(
+                    ONE_LETTER_CODES,
+                    default='X',
+                    return_dtype=pl.String,
+                ),
+            )
+            .select(
+                'residue_id',
+                *id_cols,
+                'one_letter_code',
+                'num_atoms',
+                '^ca_.$',
+                '^centroid_.$',
+                *mean_cols,
+            )
+            .collect()
+    )
+
+    if not offsets:
+        return residues
+
+    residue_offsets = np.zeros(residues.height + 1, dtype=np.int64)
+    np.cumsum(residues['num_atoms'].to_numpy(), out=residue_offsets[1:])
+
+    return residues, residue_offsets
+
+ONE_LETTER_CODES = {
+        'ALA': 'A',
+        'ARG': 'R',
+        'ASN': 'N',
+        'ASP': 'D',
+        'CYS': 'C',
+        'GLN': 'Q',
+        'GLU': 'E',
+        'GLY': 'G',
+        'HIS': 'H',
+        'ILE': 'I',
+        'LEU': 'L',
+        'LYS': 'K',
+        'MET': 'M',
+        'PHE': 'F',
+        'PRO': 'P',
+        'SER': 'S',
+        'THR': 'T',
+        'TRP': 'W',
+        'TYR': 'Y',
+        'VAL': 'V',
+        'SEC': 'U',
+        'PYL': 'O',
+        'MSE': 'M',
+        'A': 'A',
+        'C': 'C',
+        'G': 'G',
+        'U': 'U',
+        'DA': 'A',
+        'DC': 'C',
+        'DG': 'G',
+        'DT': 'T',
+}
@@ -0,0 +1,246 @@
+import polars as pl
+import numpy as np
+
+from .atoms import Atoms, get_atom_coords
+from .residues import assign_residue_ids
+from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+from numpy.typing import NDArray
+
+from typing import Mapping, Optional
+
+VDW_RADII_A = {
+        'H': 1.10,
+        'C': 1.70,
+        'N': 1.55,
+        'O': 1.52,
+        'F': 1.47,
+        'P': 1.80,
+        'S': 1.80,
+        'CL': 1.75,
+        'SE': 1.90,
+        'BR': 1.85,
+        'I': 1.98,
+}
+"""
+The van der Waals radius of each element, in angstroms, as tabulated by 
+Bondi (1964).  Elements not in this table, e.g. metal ions, are given the 
+default radius passed to `calc_atom_sasa()`.
+"""
+
+def calc_atom_sasa(
+        atoms: Atoms,
+        *,
+        probe_radius_A: float = 1.4,
+        num_points: int = 100,
+        radii_A: Optional[Mapping[str, float]] = None,
+        default_radius_A: float = 1.8,
+) -> Atoms:
+    """
+    Calculate the solvent-accessible surface area (SASA) of each atom.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms.  Besides the coordinates, only the 
+            ``element`` column is used.  Every atom in the dataframe can 
+            occlude every other, so it usually makes sense to remove 
+            alternate conformations (see `select_residue_conformations()`) 
+            and perhaps waters (see `prune_water()`) beforehand.
+
+        probe_radius_A:
+            The radius of the solvent molecule, in angstroms.  The default is 
+            the usual value for water.
+
+        num_points:
+            The number of points to test on the surface of each atom.  The 
+            error in the calculated areas decreases as more points are used, 
+            and so does the speed of the calculation.
+
+        radii_A:
+            The van der Waals radius of each element, in angstroms.  By 
+            default, `VDW_RADII_A` is used.
+
+        default_radius_A:
+            The radius to use for any element not in *radii_A*.
+
+    Returns:
+        A dataframe with the same rows and columns as *atoms*, plus a 
+        ``sasa_A2`` column giving the accessible surface area of each atom, 
+        in square angstroms.
+
+    The areas are calculated using the Shrake–Rupley algorithm.  Each atom is 
+    inflated by the probe radius, and points are spread evenly over the 
+    resulting sphere.  The accessible area of the atom is then proportional 
+    to the fraction of these points that aren't inside any other inflated 
+    atom.
+
+    The calculation is vectorized over every atom at once.  First, a k-D tree 
+    is used to find every pair of atoms whose inflated spheres overlap.  
+    Then, every point on every atom is tested against every overlapping 
+    neighbor in bulk.  This is done in chunks of atoms, so the memory 
+    required stays bounded even for very large assemblies.
+    """
+    if radii_A is None:
+        radii_A = VDW_RADII_A
+
+    coords = get_atom_coords(atoms).astype(np.float64)
+    radii = atoms.select(
+            pl.col('element').replace_strict(
+                radii_A,
+                default=default_radius_A,
+                return_dtype=pl.Float64,
+            )
+    ).to_series().to_numpy() + probe_radius_A
+
+    exposed = _calc_exposed_fraction(
+            coords,
+            radii,
+            _make_sphere_points(num_points),
+    )
+    sasa = 4 * np.pi * radii**2 * exposed
+
+    return atoms.with_columns(sasa_A2=sasa)
+
+def calc_residue_sasa(atoms: Atoms, **kwargs) -> pl.DataFrame:
+    """
+    Calculate the solvent-accessible surface area (SASA) of each residue.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms.  The atoms are grouped into residues by 
+            `assign_residue_ids()`, so the columns required by that function 
+            must be present.  Atoms without sequence ids (e.g. waters and 
+            ligands) still occlude the residues, but aren't included in the 
+            output.
+
+        kwargs:
+            Any of the keyword arguments accepted by `calc_atom_sasa()`.
+
+    Returns:
+        A dataframe with one row per residue, in order of residue id, and the 
+        following columns:
+
+        - ``residue_id``
+        - Any of the following identifiers that are present in *atoms*:
+          ``structure_id``, ``model_id``, ``symmetry_mate``, ``chain_id``, 
+          ``subchain_id``, ``seq_id``, ``comp_id``.
+        - ``sasa_A2``: The sum of the accessible surface areas of the atoms 
+          in the residue, in square angstroms.
+    """
+    id_cols = [
+            x for x in [
+                'structure_id',
+                'model_id',
+                'symmetry_mate',
+                'chain_id',
+                'subchain_id',
+                'seq_id',
+                'comp_id',
+            ]
+            if x in atoms.columns
+    ]
+    atoms = assign_residue_ids(calc_atom_sasa(atoms, **kwargs))
+
+    return (
+            atoms
+            .group_by('residue_id', maintain_order=True)
+            .agg(
+                pl.col(id_cols).first(),
+                pl.col('sasa_A2').sum(),
+            )
+    )
+
+_MAX_CHUNK_SIZE = 2**22
+"""
+The maximum number of (neighbor, point) pairs to test at once.
+"""
+
+def _calc_exposed_fraction(
+        coords: NDArray[float],
+        radii: NDArray[float],
+        points: NDArray[float],
+) -> NDArray[float]:
+    n = len(coords)
+    m = len(points)
+
+    # Find every pair of atoms whose spheres overlap, listed in both 
+    # directions and grouped by the first atom.
+    tree = cKDTree(coords)
+    pairs = tree.query_pairs(2 * radii.max(initial=0), output_type='ndarray')
+    i, j = pairs[:, 0], pairs[:, 1]
+
+    d2 = np.sum((coords[i] - coords[j])**2, axis=1)
+    overlap = d2 < (radii[i] + radii[j])**2
+    i, j = i[overlap], j[overlap]
+
+    neighbors = coo_matrix(
+            (np.ones(2 * len(i), dtype=bool), (np.r_[i, j], np.r_[j, i])),
+            shape=(n, n),
+    ).tocsr()
+    offsets = neighbors.indptr.astype(np.int64)
+    i = np.repeat(np.arange(n), np.diff(offsets))
+    j = neighbors.indices
+
+    # Single precision is plenty for the distances involved, and makes the 
+    # matrix multiplication below several times faster.
+    points = points.astype(np.float32)
+
+    exposed = np.ones(n)
+    max_pairs = max(_MAX_CHUNK_SIZE // m, 1)
+    start = 0
+
+    while start < n:
+        # Include as many atoms as possible in each chunk, but always at 
+        # least one.
+        stop = np.searchsorted(offsets, offsets[start] + max_pairs, 'right') - 1
+        stop = min(max(stop, start + 1), n)
+
+        p0, p1 = offsets[start], offsets[stop]
+        pair_i = i[p0:p1]
+        pair_j = j[p0:p1]
+
+        # A point at ``c_i + r_i * u`` is inside sphere j if:
+        #
+        #   |c_i + r_i * u - c_j|² < r_j²
+        #   2 r_i u · (c_i - c_j) < r_j² - r_i² - |c_i - c_j|²
+        #
+        # Written this way, the left-hand side for every point and every 
+        # pair can be calculated with a single matrix multiplication.
+        v = coords[pair_i] - coords[pair_j]
+        r_i = radii[pair_i]
+        r_j = radii[pair_j]
+
+        lhs = (2 * r_i[:, np.newaxis] * v).astype(np.float32) @ points.T
+        rhs = r_j**2 - r_i**2 - np.sum(v**2, axis=1)
+        buried = lhs < rhs[:, np.newaxis].astype(np.float32)
+
+        # Combine the results for each neighbor of each atom.  Packing the 
+        # points into bits first makes this step much faster.  Atoms without 
+        # any neighbors are completely exposed, and have to be skipped 
+        # because `reduceat()` doesn't handle empty segments.
+        num_neighbors = np.diff(offsets[start:stop + 1])
+        has_neighbors = num_neighbors > 0
+
+        if np.any(has_neighbors):
+            segment_starts = offsets[start:stop][has_neighbors] - p0
+            buried_any = np.bitwise_or.reduceat(
+                    np.packbits(buried, axis=1),
+                    segment_starts,
+                    axis=0,
+            )
+            num_buried = np.unpackbits(buried_any, axis=1, count=m).sum(axis=1)
+            exposed[start:stop][has_neighbors] = 1 - num_buried / m
+
+        start = stop
+
+    return exposed
+
+def _make_sphere_points(n: int) -> NDArray[float]:
+    # Golden spiral: successive points are rotated by the golden angle, and 
+    # evenly spaced in z, which gives each point approximately equal area.
+    k = np.arange(n) + 0.5
+    z = 1 - 2 * k / n
+    r = np.sqrt(1 - z**2)
+    theta = np.pi * (3 - np.sqrt(5)) * k
+
+    return np.stack([r * np.cos(theta), r * np.sin(theta), z], axis=-1)
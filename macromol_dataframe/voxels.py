@@ -0,0 +1,204 @@
+import polars as pl
+import numpy as np
+
+from .atoms import Atoms, get_atom_coords
+from numpy.typing import ArrayLike
+
+from typing import Literal, Optional, Sequence, Union
+from typing_extensions import TypeAlias
+
+Channels: TypeAlias = Sequence[Union[str, Sequence[str]]]
+
+def voxelize_atoms(
+        atoms: Atoms,
+        *,
+        length_voxels: int,
+        resolution_A: float,
+        center_A: Optional[ArrayLike] = None,
+        channels: Channels = ('*',),
+        kernel: Literal['sphere', 'gaussian'] = 'sphere',
+        radius_A: float = 0.5,
+        batch_key: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        dtype: np.dtype = np.float32,
+) -> np.ndarray:
+    """
+    Render the given atoms into a 3D grid of voxels.
+
+    Arguments:
+        atoms:
+            A dataframe of atoms.  The axes of the grid are aligned with the 
+            axes of the coordinate frame of these atoms.  Use 
+            `transform_atom_coords()` or `NeighborhoodSampler` to put the atoms 
+            in a different frame first, if necessary.  Besides the 
+            coordinates, only the ``element`` column is used.  Atoms outside 
+            the grid are ignored.
+
+        length_voxels:
+            The number of voxels along each side of the grid.
+
+        resolution_A:
+            The size of each voxel, in angstroms.
+
+        center_A:
+            The coordinates of the center of the grid, in angstroms.  If 
+            *batch_key* is specified, this can also be an array of shape 
+            (N, 3) giving a different center for each grid, where N is the 
+            batch size.  By default, the grid is centered on the origin.
+
+        channels:
+            The elements to include in each channel of the output.  Each 
+            channel can be specified either as a single element or as a list 
+            of elements.  The special element ``'*'`` matches any atom, so 
+            ``['C', 'N', 'O', '*']`` would make a grid with one channel for 
+            each of the three most common elements, and a fourth channel for 
+            every atom.  An atom can contribute to more than one channel.
+
+        kernel:
+            How to spread each atom over the grid:
+
+            - ``'sphere'``: Each voxel whose center is within *radius_A* of an 
+              atom is set to 1, as is the voxel that contains the atom 
+              itself.  In other words, the grid records occupancy.  The 
+              latter rule ensures that no atom inside the grid is lost, even 
+              if *radius_A* is small compared to *resolution_A*.
+
+            - ``'gaussian'``: Each voxel is assigned the sum, over every atom, 
+              of a Gaussian with standard deviation *radius_A* evaluated at 
+              the center of the voxel.  The Gaussians are truncated at three 
+              standard deviations.  In other words, the grid records density.
+
+        radius_A:
+            The size of each atom, in angstroms.  See *kernel*.
+
+        batch_key:
+            The name of a column that assigns each atom to one of several 
+            grids, e.g. the ``neighborhood_id`` column created by 
+            `NeighborhoodSampler.make_neighborhoods()`.  The values in this 
+            column must be non-negative integers.  All of the grids are 
+            rendered at once, which is much faster than rendering them one at 
+            a time.
+
+        batch_size:
+            The number of grids to create, if *batch_key* is specified.  By 
+            default, this is one more than the largest value in the 
+            *batch_key* column.  It's an error to specify a smaller value.
+
+        dtype:
+            The data type of the output array.
+
+    Returns:
+        An array with shape (C, L, L, L), where C is the number of channels 
+        and L is *length_voxels*.  If *batch_key* is specified, the shape is 
+        instead (N, C, L, L, L), where N is the batch size.  The last three 
+        dimensions correspond to the x, y, and z axes, respectively.
+    """
+    L = length_voxels
+    C = len(channels)
+
+    if batch_key is None:
+        batch_i = np.zeros(atoms.height, dtype=np.int64)
+        n = 1
+    else:
+        batch_i = atoms.get_column(batch_key).to_numpy().astype(np.int64)
+        n_min = int(batch_i.max(initial=-1)) + 1
+        n = n_min if batch_size is None else batch_size
+
+        if np.any(batch_i < 0):
+            raise ValueError(f"{batch_key!r} column must not contain negative values")
+        if n < n_min:
+            raise ValueError(f"batch_size={batch_size} is too small; {batch_key!r} column includes the value {n_min - 1}")
+
+    if kernel == 'sphere':
+        cutoff_A = radius_A
+    elif kernel == 'gaussian':
+        cutoff_A = 3 * radius_A
+    else:
+        raise ValueError(f"unknown kernel: {kernel!r}")
+
+    coords_A = get_atom_coords(atoms).astype(float)
+
+    if center_A is not None:
+        center_A = np.asarray(center_A, dtype=float)
+        coords_A -= center_A if center_A.ndim == 1 else center_A[batch_i]
+
+    # Discard atoms that are too far from the grid to affect it before doing 
+    # anything else, since there may be many more atoms outside the grid than 
+    # inside it, and the steps below use memory proportional to the number of 
+    # atoms times the size of the stencil.
+    half_width_A = L * resolution_A / 2 + cutoff_A
+    near = np.all(np.abs(coords_A) <= half_width_A, axis=1)
+
+    atoms = atoms.filter(pl.Series(near))
+    coords_A = coords_A[near]
+    batch_i = batch_i[near]
+
+    # Find which channels each atom belongs to.
+    channel_mask = atoms.select(
+            _make_channel_expr(channel).alias(str(i))
+            for i, channel in enumerate(channels)
+    ).to_numpy()
+
+    # Work out which voxels each atom overlaps.  We do this by adding a fixed 
+    # stencil of offsets to the voxel containing each atom, then calculating 
+    # the kernel for each voxel in the stencil.  Voxels outside the kernel 
+    # radius get a weight of zero.
+    coords_v = coords_A / resolution_A + (L - 1) / 2
+    r = int(np.ceil(cutoff_A / resolution_A))
+    stencil = np.stack(
+            np.meshgrid(*[np.arange(-r, r + 1)] * 3, indexing='ij'),
+            axis=-1,
+    ).reshape(-1, 3)
+
+    voxels = np.rint(coords_v).astype(np.int64)[:, np.newaxis, :] + stencil
+    centers_A = (voxels - (L - 1) / 2) * resolution_A
+    dist2_A2 = np.sum((centers_A - coords_A[:, np.newaxis, :])**2, axis=-1)
+
+    if kernel == 'sphere':
+        weights = (dist2_A2 <= radius_A**2).astype(float)
+
+        # The stencil is centered on the voxel containing each atom.
+        weights[:, len(stencil) // 2] = 1
+    else:
+        weights = np.exp(-dist2_A2 / (2 * radius_A**2))
+        weights[dist2_A2 > cutoff_A**2] = 0
+
+    in_bounds = np.all((voxels >= 0) & (voxels < L), axis=-1)
+    atom_i, stencil_i = np.nonzero(in_bounds & (weights > 0))
+
+    voxels = voxels[atom_i, stencil_i]
+    weights = weights[atom_i, stencil_i]
+    voxel_i = (voxels[:, 0] * L + voxels[:, 1]) * L + voxels[:, 2]
+
+    # The weights are the same for every channel, so only the indices need to 
+    # be repeated for each channel.  Then scatter all of the weights into the 
+    # output array at once.
+    flat_i = []
+    flat_weights = []
+
+    for c in range(C):
+        in_channel = channel_mask[atom_i, c]
+        b = batch_i[atom_i[in_channel]]
+        flat_i.append((b * C + c) * L**3 + voxel_i[in_channel])
+        flat_weights.append(weights[in_channel])
+
+    grids = np.bincount(
+            np.concatenate(flat_i),
+            weights=np.concatenate(flat_weights),
+            minlength=n * C * L**3,
+    )
+
+    if kernel == 'sphere':
+        np.minimum(grids, 1, out=grids)
+
+    grids = grids.astype(dtype, copy=False).reshape(n, C, L, L, L)
+
+    return grids if batch_key is not None else grids[0]
+
+def _make_channel_expr(channel):
+    if isinstance(channel, str):
+        channel = [channel]
+    if '*' in channel:
+        return pl.repeat(True, pl.len())
+
+    return pl.col('element').is_in(channel)
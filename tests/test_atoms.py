@@ -3,6 +3,7 @@ import macromol_dataframe as mmdf
 import polars as pl
 import polars.testing
 import numpy as np
+import pytest
 
 from macromol_dataframe.testing import atoms_fwf
 from test_coords import frame, coords
@@ -62,3 +63,122 @@ def test_prune_water(atoms, expected):
     actual = mmdf.prune_water(atoms)
     pl.testing.assert_frame_equal(actual, expected)
 
+def test_transform_atom_coords_structure_id():
+    atoms_x = pl.DataFrame([
+        dict(structure_id='a', x=1.0, y=1.0, z=1.0),
+        dict(structure_id='b', x=1.0, y=1.0, z=1.0),
+        dict(structure_id='a', x=2.0, y=2.0, z=2.0),
+    ])
+    frames_xy = {
+            'a': frame(dict(origin='1 1 1', rot_vec_rad='0 0 0')),
+            'b': frame(dict(origin='0 0 0', rot_vec_rad='0 0 pi/2')),
+    }
+    expected_y = pl.DataFrame([
+        dict(structure_id='a', x=0.0, y=0.0, z=0.0),
+        dict(structure_id='b', x=1.0, y=-1.0, z=1.0),
+        dict(structure_id='a', x=1.0, y=1.0, z=1.0),
+    ])
+
+    atoms_y = mmdf.transform_atom_coords(atoms_x, frames_xy)
+    pl.testing.assert_frame_equal(atoms_y, expected_y)
+
+
+def test_match_atoms():
+    atoms_a = pl.DataFrame([
+        dict(subchain_id='A', seq_id=1, alt_id=None, atom_id='N', x=1.0),
+        dict(subchain_id='A', seq_id=1, alt_id=None, atom_id='CA', x=2.0),
+        dict(subchain_id='A', seq_id=2, alt_id='A', atom_id='CA', x=3.0),
+        dict(subchain_id='A', seq_id=2, alt_id='B', atom_id='CA', x=4.0),
+        dict(subchain_id='A', seq_id=None, alt_id=None, atom_id='O', x=5.0),
+    ])
+    atoms_b = pl.DataFrame([
+        dict(subchain_id='A', seq_id=2, alt_id='B', atom_id='CA', x=6.0),
+        dict(subchain_id='A', seq_id=1, alt_id=None, atom_id='CA', x=7.0),
+        dict(subchain_id='A', seq_id=1, alt_id=None, atom_id='CB', x=8.0),
+        dict(subchain_id='A', seq_id=None, alt_id=None, atom_id='O', x=9.0),
+    ])
+
+    matched_a, matched_b = mmdf.match_atoms(atoms_a, atoms_b)
+
+    assert matched_a['x'].to_list() == [2.0, 4.0]
+    assert matched_b['x'].to_list() == [7.0, 6.0]
+
+    # The key columns have to uniquely identify each atom.
+    with pytest.raises(pl.exceptions.ComputeError):
+        mmdf.match_atoms(atoms_a, atoms_b, on=['subchain_id', 'atom_id'])
+
+def test_superimpose_atoms():
+    atoms_x = pl.DataFrame([
+        dict(seq_id=1, atom_id='N', x=0.0, y=0.0, z=0.0, occupancy=1.0),
+        dict(seq_id=1, atom_id='CA', x=1.0, y=0.0, z=0.0, occupancy=1.0),
+        dict(seq_id=1, atom_id='C', x=0.0, y=2.0, z=0.0, occupancy=1.0),
+        dict(seq_id=1, atom_id='O', x=0.0, y=0.0, z=3.0, occupancy=1.0),
+        dict(seq_id=1, atom_id='CB', x=5.0, y=5.0, z=5.0, occupancy=0.0),
+    ])
+    frame_xy = frame(dict(origin='1 2 3', rot_vec_rad='0 0 pi/2'))
+    atoms_y = (
+            mmdf.transform_atom_coords(atoms_x, frame_xy)
+            .with_columns(
+                x=pl.when(atoms_x['atom_id'] == 'CB')
+                    .then(0.0)
+                    .otherwise(pl.col('x'))
+            )
+            .reverse()
+    )
+
+    frame_fit_xy = mmdf.superimpose_atoms(
+            atoms_x, atoms_y,
+            weights='occupancy',
+    )
+    np.testing.assert_allclose(frame_fit_xy, frame_xy, atol=1e-8)
+
+def test_quantize_atom_coords():
+    atoms = pl.DataFrame([
+        dict(atom_id='N', x=1.0, y=-2.5, z=0.001),
+        dict(atom_id='CA', x=123.456, y=-0.0004, z=-7.8915),
+    ])
+    quantized = mmdf.quantize_atom_coords(atoms)
+    expected = pl.DataFrame(
+            [
+                dict(atom_id='N', x=1000, y=-2500, z=1),
+                dict(atom_id='CA', x=123456, y=0, z=-7892),
+            ],
+            schema_overrides=dict(x=pl.Int32, y=pl.Int32, z=pl.Int32),
+    )
+    pl.testing.assert_frame_equal(quantized, expected)
+
+    # Coordinates with three decimal places survive the round trip exactly.
+    pl.testing.assert_frame_equal(
+            mmdf.dequantize_atom_coords(quantized[0]),
+            atoms[0],
+    )
+
+    coords = mmdf.get_atom_coords(quantized)
+    assert coords.dtype == np.float32
+    np.testing.assert_array_equal(
+            coords,
+            np.array([
+                [1.0, -2.5, 0.001],
+                [123.456, 0, -7.892],
+            ], dtype=np.float32),
+    )
+
+    # Transforming the coordinates should keep them quantized.
+    frame_xy = frame(dict(origin='1 1 1', rot_vec_rad='0 0 0'))
+    transformed = mmdf.transform_atom_coords(quantized, frame_xy)
+    expected = pl.DataFrame(
+            [
+                dict(atom_id='N', x=0, y=-3500, z=-999),
+                dict(atom_id='CA', x=122456, y=-1000, z=-8892),
+            ],
+            schema_overrides=dict(x=pl.Int32, y=pl.Int32, z=pl.Int32),
+    )
+    pl.testing.assert_frame_equal(transformed, expected)
+
+def test_dequantize_atom_coords_float():
+    atoms = pl.DataFrame([
+        dict(x=1.0, y=2.0, z=3.0),
+    ])
+    dequantized = mmdf.dequantize_atom_coords(atoms, dtype=pl.Float32)
+    assert dequantized.schema['x'] == pl.Float32
+    assert dequantized.row(0) == (1.0, 2.0, 3.0)
@@ -0,0 +1,228 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import numpy as np
+import msgpack
+import pytest
+
+from macromol_dataframe.bcif import (
+        _decode, _encode_integers, _encode_floats, _encode_strings,
+)
+from hypothesis import given
+from hypothesis.extra.numpy import arrays
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '2gtl', '4ous', '4rek'])
+@pytest.mark.parametrize('coord_dtype', [pl.Float64, pl.Float32, pl.Int32])
+def test_read_bcif(tmp_path, pdb_id, coord_dtype):
+    cif_path = PDB_DIR / f'{pdb_id}.cif.gz'
+    bcif_path = tmp_path / f'{pdb_id}.bcif'
+
+    mmdf.convert_mmcif_to_bcif(cif_path, bcif_path)
+
+    kwargs = dict(coord_dtype=coord_dtype, unit_cell=True)
+    expected = mmdf.read_mmcif(cif_path, **kwargs)
+    actual = mmdf.read_bcif(bcif_path, **kwargs)
+
+    assert actual.id == expected.id
+
+    for attr in [
+            'asym_atoms',
+            'assemblies',
+            'assembly_gen',
+            'entities',
+            'polymers',
+            'unit_cell',
+    ]:
+        pl.testing.assert_frame_equal(
+                getattr(actual, attr),
+                getattr(expected, attr),
+                check_exact=True,
+        )
+
+    assert actual.oper_map.keys() == expected.oper_map.keys()
+    for k in expected.oper_map:
+        np.testing.assert_array_equal(actual.oper_map[k], expected.oper_map[k])
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '2gtl', '4ous', '4rek'])
+@pytest.mark.parametrize('suffix', ['.bcif', '.bcif.gz'])
+def test_write_bcif(tmp_path, pdb_id, suffix):
+    cif_path = PDB_DIR / f'{pdb_id}.cif.gz'
+    bcif_path = tmp_path / f'{pdb_id}{suffix}'
+
+    atoms = mmdf.read_asymmetric_unit(cif_path)
+    mmdf.write_bcif(bcif_path, atoms)
+
+    struct = mmdf.read_bcif(bcif_path)
+    assert struct.id == pdb_id
+
+    pl.testing.assert_frame_equal(struct.asym_atoms, atoms, check_exact=True)
+
+def test_write_bcif_quantized(tmp_path):
+    cif_path = PDB_DIR / '4ous.cif.gz'
+    bcif_path = tmp_path / '4ous.bcif'
+
+    atoms = mmdf.read_asymmetric_unit(cif_path, coord_dtype=pl.Int32)
+    mmdf.write_bcif(bcif_path, atoms, name='xyz')
+
+    struct = mmdf.read_bcif(bcif_path, coord_dtype=pl.Int32)
+    assert struct.id == 'xyz'
+
+    pl.testing.assert_frame_equal(struct.asym_atoms, atoms, check_exact=True)
+
+def test_write_bcif_columns(tmp_path):
+    bcif_path = tmp_path / 'atoms.bcif'
+
+    atoms = pl.DataFrame([
+        dict(seq_label='1', element='C', x=1.0, y=2.0, z=3.0),
+        dict(seq_label='-2A', element='N', x=1.5, y=2.25, z=None),
+        dict(seq_label='B', element='O', x=1e-7, y=1e10, z=-3.125),
+        dict(seq_label=None, element=None, x=0.0, y=0.0, z=0.0),
+    ])
+    mmdf.write_bcif(bcif_path, atoms)
+
+    # Columns that weren't written are null.
+    struct = mmdf.read_bcif(bcif_path)
+    assert struct.asym_atoms['atom_id'].is_null().all()
+
+    pl.testing.assert_frame_equal(
+            struct.asym_atoms.select(atoms.columns),
+            atoms,
+            check_exact=True,
+    )
+
+def test_read_bcif_err_not_bcif(tmp_path):
+    bcif_path = tmp_path / 'not_bcif.bcif'
+    bcif_path.write_text('data_1abc\n')
+
+    with pytest.raises(mmdf.MmcifError) as err:
+        mmdf.read_bcif(bcif_path)
+
+    assert err.match("not a BinaryCIF file")
+    assert err.match(str(bcif_path))
+
+def test_read_bcif_err_unknown_encoding(tmp_path):
+    bcif_path = tmp_path / 'unknown_encoding.bcif'
+    bcif_path.write_bytes(msgpack.packb({
+        'version': '0.3.0',
+        'encoder': 'test',
+        'dataBlocks': [{
+            'header': '1abc',
+            'categories': [{
+                'name': '_atom_site',
+                'rowCount': 1,
+                'columns': [{
+                    'name': 'Cartn_x',
+                    'data': {
+                        'encoding': [{'kind': 'Unknown'}],
+                        'data': b'',
+                    },
+                    'mask': None,
+                }],
+            }],
+        }],
+    }))
+
+    with pytest.raises(mmdf.MmcifError) as err:
+        mmdf.read_bcif(bcif_path)
+
+    assert err.match("unknown BinaryCIF encoding")
+    assert err.match("'Unknown'")
+
+@pytest.mark.parametrize(
+        'encoded_data, expected', [
+            (
+                # IntegerPacking: values outside the range of the packed type
+                # are split into multiple elements.
+                dict(
+                    encoding=[
+                        dict(kind='IntegerPacking', byteCount=1, isUnsigned=False, srcSize=4),
+                        dict(kind='ByteArray', type=1),
+                    ],
+                    data=np.array([1, 127, 3, -128, -128, 0, -5], np.int8).tobytes(),
+                ),
+                [1, 130, -256, -5],
+            ), (
+                dict(
+                    encoding=[
+                        dict(kind='IntegerPacking', byteCount=2, isUnsigned=True, srcSize=2),
+                        dict(kind='ByteArray', type=5),
+                    ],
+                    data=np.array([65535, 65535, 2, 7], np.uint16).tobytes(),
+                ),
+                [131072, 7],
+            ), (
+                dict(
+                    encoding=[
+                        dict(kind='Delta', origin=1000, srcType=3),
+                        dict(kind='RunLength', srcType=3, srcSize=5),
+                        dict(kind='ByteArray', type=3),
+                    ],
+                    data=np.array([0, 1, 1, 3, -2, 1], np.int32).tobytes(),
+                ),
+                [1000, 1001, 1002, 1003, 1001],
+            ), (
+                dict(
+                    encoding=[
+                        dict(kind='FixedPoint', factor=100, srcType=33),
+                        dict(kind='ByteArray', type=3),
+                    ],
+                    data=np.array([125, -1, 0], np.int32).tobytes(),
+                ),
+                [1.25, -0.01, 0.0],
+            ), (
+                dict(
+                    encoding=[
+                        dict(kind='IntervalQuantization', min=1, max=2, numSteps=5, srcType=32),
+                        dict(kind='ByteArray', type=4),
+                    ],
+                    data=np.array([0, 1, 4], np.uint8).tobytes(),
+                ),
+                [1.0, 1.25, 2.0],
+            ), (
+                dict(
+                    encoding=[
+                        dict(
+                            kind='StringArray',
+                            dataEncoding=[dict(kind='ByteArray', type=1)],
+                            stringData='ABCDEF',
+                            offsetEncoding=[dict(kind='ByteArray', type=4)],
+                            offsets=np.array([0, 1, 3, 6], np.uint8).tobytes(),
+                        ),
+                    ],
+                    data=np.array([2, 0, -1, 1, 0], np.int8).tobytes(),
+                ),
+                ['DEF', 'A', '', 'BC', 'A'],
+            ),
+        ],
+)
+def test_decode(encoded_data, expected):
+    assert list(_decode(encoded_data)) == expected
+
+@given(arrays(np.int32, 20, elements=dict(min_value=-10**6, max_value=10**6)))
+def test_encode_integers(values):
+    np.testing.assert_array_equal(_decode(_encode_integers(values)), values)
+
+@given(arrays(np.int32, 20, elements=dict(min_value=0, max_value=3)))
+def test_encode_integers_small(values):
+    encoded = _encode_integers(values)
+    np.testing.assert_array_equal(_decode(encoded), values)
+
+    # Small values should never need more than one byte each.
+    assert len(encoded['data']) <= len(values)
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@given(values=arrays(
+    float, 20,
+    elements=dict(allow_nan=False, allow_infinity=False),
+))
+def test_encode_floats(dtype, values):
+    values = values.astype(dtype)
+    np.testing.assert_array_equal(_decode(_encode_floats(values)), values)
+
+def test_encode_strings():
+    strings = pl.Series(['B', 'A', None, 'CD', 'B', ''])
+    decoded = _decode(_encode_strings(strings))
+    assert decoded.to_list() == ['B', 'A', '', 'CD', 'B', '']
@@ -0,0 +1,234 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import numpy as np
+import pytest
+
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+def bonds(*rows):
+    return pl.DataFrame(
+            rows,
+            schema=mmdf.BONDS_SCHEMA,
+            orient='row',
+    )
+
+def test_find_bonds():
+    atoms = pl.DataFrame(
+            [
+                dict(subchain_id='A', seq_id=1, alt_id=None, comp_id='GLY', atom_id='N'),
+                dict(subchain_id='A', seq_id=1, alt_id=None, comp_id='GLY', atom_id='CA'),
+                dict(subchain_id='A', seq_id=1, alt_id=None, comp_id='GLY', atom_id='C'),
+                dict(subchain_id='A', seq_id=1, alt_id=None, comp_id='GLY', atom_id='O'),
+                dict(subchain_id='A', seq_id=2, alt_id=None, comp_id='SER', atom_id='N'),
+                dict(subchain_id='A', seq_id=2, alt_id=None, comp_id='SER', atom_id='CA'),
+                dict(subchain_id='A', seq_id=2, alt_id='A',  comp_id='SER', atom_id='CB'),
+                dict(subchain_id='A', seq_id=2, alt_id='B',  comp_id='SER', atom_id='CB'),
+                dict(subchain_id='A', seq_id=2, alt_id='A',  comp_id='SER', atom_id='OG'),
+                dict(subchain_id='A', seq_id=2, alt_id='B',  comp_id='SER', atom_id='OG'),
+
+                # Not consecutive, so no peptide bond.
+                dict(subchain_id='A', seq_id=4, alt_id=None, comp_id='GLY', atom_id='N'),
+
+                # Different chain, so no peptide bond.
+                dict(subchain_id='B', seq_id=2, alt_id=None, comp_id='GLY', atom_id='N'),
+                dict(subchain_id='B', seq_id=2, alt_id=None, comp_id='GLY', atom_id='CA'),
+
+                # Same residue name but different residue, so no bond.
+                dict(subchain_id='C', seq_id=None, alt_id=None, comp_id='GLY', atom_id='N'),
+            ],
+    )
+    pl.testing.assert_frame_equal(
+            mmdf.find_bonds(atoms),
+            bonds(
+                (0, 1, 'residue'),
+                (1, 2, 'residue'),
+                (2, 3, 'residue'),
+                (2, 4, 'polymer'),
+                (4, 5, 'residue'),
+                (5, 6, 'residue'),
+                (5, 7, 'residue'),
+                (6, 8, 'residue'),
+                (7, 9, 'residue'),
+                (11, 12, 'residue'),
+            ),
+    )
+
+def test_find_bonds_models():
+    atoms = pl.DataFrame(
+            [
+                dict(model_id='1', subchain_id='A', seq_id=1, comp_id='GLY', atom_id='N'),
+                dict(model_id='1', subchain_id='A', seq_id=1, comp_id='GLY', atom_id='CA'),
+                dict(model_id='2', subchain_id='A', seq_id=1, comp_id='GLY', atom_id='N'),
+                dict(model_id='2', subchain_id='A', seq_id=1, comp_id='GLY', atom_id='CA'),
+            ],
+    )
+    pl.testing.assert_frame_equal(
+            mmdf.find_bonds(atoms),
+            bonds(
+                (0, 1, 'residue'),
+                (2, 3, 'residue'),
+            ),
+    )
+
+def test_find_bonds_struct_conn():
+    atoms = pl.DataFrame(
+            [
+                dict(subchain_id='A', seq_id=1, seq_label='1', comp_id='CYS', atom_id='SG'),
+                dict(subchain_id='A', seq_id=5, seq_label='5', comp_id='CYS', atom_id='SG'),
+                dict(subchain_id='B', seq_id=None, seq_label='101', comp_id='ZN', atom_id='ZN'),
+                dict(subchain_id='C', seq_id=None, seq_label='201', comp_id='HOH', atom_id='O'),
+                dict(subchain_id='C', seq_id=None, seq_label='202', comp_id='HOH', atom_id='O'),
+            ],
+    )
+    struct_conn = pl.DataFrame(
+            [
+                dict(
+                    type='disulf',
+                    subchain_id_1='A', seq_id_1=1, seq_label_1='1',
+                    comp_id_1='CYS', atom_id_1='SG', alt_id_1=None,
+                    symmetry_1='1_555',
+                    subchain_id_2='A', seq_id_2=5, seq_label_2='5',
+                    comp_id_2='CYS', atom_id_2='SG', alt_id_2=None,
+                    symmetry_2='1_555',
+                ),
+                dict(
+                    type='metalc',
+                    subchain_id_1='B', seq_id_1=None, seq_label_1='101',
+                    comp_id_1='ZN', atom_id_1='ZN', alt_id_1=None,
+                    symmetry_1='1_555',
+                    subchain_id_2='C', seq_id_2=None, seq_label_2='202',
+                    comp_id_2='HOH', atom_id_2='O', alt_id_2=None,
+                    symmetry_2='1_555',
+                ),
+                dict(
+                    type='metalc',
+                    subchain_id_1='B', seq_id_1=None, seq_label_1='101',
+                    comp_id_1='ZN', atom_id_1='ZN', alt_id_1=None,
+                    symmetry_1='1_555',
+                    subchain_id_2='C', seq_id_2=None, seq_label_2='201',
+                    comp_id_2='HOH', atom_id_2='O', alt_id_2=None,
+                    symmetry_2='2_555',
+                ),
+            ],
+            schema_overrides=dict(seq_id_1=pl.Int64, seq_id_2=pl.Int64),
+    )
+    pl.testing.assert_frame_equal(
+            mmdf.find_bonds(atoms, struct_conn),
+            bonds(
+                (0, 1, 'disulf'),
+                (2, 4, 'metalc'),
+            ),
+    )
+
+def test_find_bonds_chem_comp_bonds():
+    struct = mmdf.read_mmcif(PDB_DIR / '1fav.cif.gz', bonds=True)
+    atoms = struct.asym_atoms
+
+    bonds_std = mmdf.find_bonds(atoms, struct.struct_conn)
+    bonds_ccb = mmdf.find_bonds(
+            atoms,
+            struct.struct_conn,
+            struct.chem_comp_bonds,
+    )
+
+    # The bonds given in the file should include all of the standard bonds.
+    assert bonds_std.join(bonds_ccb, on=['atom_i', 'atom_j'], how='anti').is_empty()
+    assert bonds_ccb.height > bonds_std.height
+
+    # With the bonds from the file, every non-water atom should be bonded to
+    # something.
+    offsets, _ = mmdf.make_bond_csr(bonds_ccb, atoms.height)
+    num_bonds = np.diff(offsets)
+    is_water = atoms['comp_id'].is_in(['HOH']).to_numpy()
+    assert np.all(num_bonds[~is_water] > 0)
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '2gtl', '4ous', '4rek'])
+def test_find_bonds_lengths(pdb_id):
+    struct = mmdf.read_mmcif(PDB_DIR / f'{pdb_id}.cif.gz', bonds=True)
+    atoms = mmdf.select_model(struct.asym_atoms, '1')
+    found = mmdf.find_bonds(atoms, struct.struct_conn, struct.chem_comp_bonds)
+
+    coords = mmdf.get_atom_coords(atoms)
+    lengths = np.linalg.norm(
+            coords[found['atom_i'].to_numpy()] -
+            coords[found['atom_j'].to_numpy()],
+            axis=1,
+    )
+    is_covalent = found['type'].is_in(['residue', 'polymer']).to_numpy()
+
+    assert np.all(lengths[is_covalent] < 2.0)
+    assert np.all(lengths < 3.5)
+
+def test_select_bonds():
+    struct = mmdf.read_mmcif(PDB_DIR / '4rek.cif.gz', bonds=True)
+    atoms = struct.asym_atoms
+    all_bonds = mmdf.find_bonds(
+            atoms,
+            struct.struct_conn,
+            struct.chem_comp_bonds,
+    )
+
+    pruned = mmdf.prune_hydrogen(atoms.with_row_index('i'))
+
+    pl.testing.assert_frame_equal(
+            mmdf.select_bonds(all_bonds, pruned['i']),
+            mmdf.find_bonds(
+                pruned.drop('i'),
+                struct.struct_conn,
+                struct.chem_comp_bonds,
+            ),
+    )
+
+    # Reordering the atoms:
+    pl.testing.assert_frame_equal(
+            mmdf.select_bonds(
+                bonds(
+                    (0, 1, 'residue'),
+                    (1, 2, 'residue'),
+                    (2, 3, 'polymer'),
+                ),
+                [3, 1, 2],
+            ),
+            bonds(
+                (0, 2, 'polymer'),
+                (1, 2, 'residue'),
+            ),
+    )
+
+def test_make_bond_csr():
+    offsets, neighbors = mmdf.make_bond_csr(
+            bonds(
+                (0, 1, 'residue'),
+                (0, 3, 'residue'),
+                (1, 3, 'residue'),
+            ),
+            5,
+    )
+    np.testing.assert_array_equal(offsets, [0, 2, 4, 4, 6, 6])
+    np.testing.assert_array_equal(neighbors, [1, 3, 0, 3, 0, 1])
+
+@pytest.mark.parametrize(
+        'pdb_id, assembly_id', [
+            ('1fav', '1'),
+            ('2gtl', '1'),
+            ('4ous', '1'),
+        ],
+)
+def test_assembly_template_make_bonds(pdb_id, assembly_id):
+    struct = mmdf.read_mmcif(PDB_DIR / f'{pdb_id}.cif.gz', bonds=True)
+    asym_atoms = mmdf.select_model(struct.asym_atoms, '1')
+    asym_bonds = mmdf.find_bonds(asym_atoms, struct.struct_conn)
+
+    template = mmdf.AssemblyTemplate(
+            asym_atoms,
+            struct.assembly_gen,
+            struct.oper_map,
+            assembly_id,
+    )
+    pl.testing.assert_frame_equal(
+            template.make_bonds(asym_bonds),
+            mmdf.find_bonds(template.atoms, struct.struct_conn),
+    )
@@ -0,0 +1,208 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import numpy as np
+import multiprocessing
+import subprocess
+import shutil
+import os
+
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+def test_structure_cache(tmp_path):
+    cif_path = tmp_path / '4ous.cif.gz'
+    shutil.copy(PDB_DIR / '4ous.cif.gz', cif_path)
+
+    cache = mmdf.StructureCache(max_bytes=10**9)
+    assert cache.stats == mmdf.CacheStats()
+
+    struct_1 = cache.read_mmcif(cif_path)
+    struct_2 = cache.read_mmcif(cif_path)
+    assert struct_1 is struct_2
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.num_entries == 1
+    assert cache.stats.size_bytes > 0
+
+    atoms_1 = cache.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1',
+    )
+    atoms_2 = cache.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1',
+    )
+    assert atoms_1 is atoms_2
+
+    pl.testing.assert_frame_equal(
+            atoms_1,
+            mmdf.read_biological_assembly(
+                cif_path, model_id='1', assembly_id='1',
+            ),
+    )
+
+    # Each request is counted once.  The structure the assembly is built from 
+    # is cached, but looking it up doesn't count as a separate hit.
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 2
+    assert cache.stats.num_entries == 2
+
+    cache.read_mmcif(cif_path)
+    assert cache.stats.hits == 3
+    assert cache.stats.misses == 2
+
+    asym_atoms = cache.read_asymmetric_unit(cif_path)
+    assert asym_atoms is struct_1.asym_atoms
+
+    # Modifying the file should invalidate the cache.
+    st = cif_path.stat()
+    os.utime(cif_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    struct_3 = cache.read_mmcif(cif_path)
+    assert struct_3 is not struct_1
+    assert cache.stats.misses == 3
+
+    cache.clear()
+    assert cache.stats.num_entries == 0
+    assert cache.stats.size_bytes == 0
+
+def test_structure_cache_evict():
+    cif_paths = [
+            PDB_DIR / '1fav.cif.gz',
+            PDB_DIR / '4ous.cif.gz',
+    ]
+
+    cache = mmdf.StructureCache(max_bytes=10**9)
+    sizes = [
+            mmdf.cache._estimate_size(cache.read_mmcif(p))
+            for p in cif_paths
+    ]
+    assert cache.stats.num_entries == 2
+    assert cache.stats.size_bytes == sum(sizes)
+
+    # Only enough room for the larger of the two structures.
+    cache = mmdf.StructureCache(max_bytes=max(sizes))
+
+    cache.read_mmcif(cif_paths[0])
+    cache.read_mmcif(cif_paths[1])
+    assert cache.stats.evictions == 1
+    assert cache.stats.num_entries == 1
+
+    cache.read_mmcif(cif_paths[1])
+    assert cache.stats.hits == 1
+
+    # Entries bigger than the whole budget are never cached.
+    cache = mmdf.StructureCache(max_bytes=1)
+    cache.read_mmcif(cif_paths[0])
+    cache.read_mmcif(cif_paths[0])
+    assert cache.stats.misses == 2
+    assert cache.stats.num_entries == 0
+
+def _read_assembly_in_worker(cache, cif_path):
+    atoms = cache.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1',
+    )
+    return atoms.height, cache.stats.misses
+
+def _close_cache_in_worker(cache):
+    cache.close()
+    del cache
+
+def test_shared_structure_cache(tmp_path):
+    cif_path = PDB_DIR / '4ous.cif.gz'
+
+    cache = mmdf.SharedStructureCache()
+    root = cache.root
+    assert root.is_dir()
+
+    struct = cache.read_mmcif(cif_path)
+    expected = mmdf.read_mmcif(cif_path)
+
+    assert struct.id == expected.id
+    pl.testing.assert_frame_equal(struct.asym_atoms, expected.asym_atoms)
+    pl.testing.assert_frame_equal(struct.assembly_gen, expected.assembly_gen)
+    pl.testing.assert_frame_equal(struct.entities, expected.entities)
+    assert struct.oper_map.keys() == expected.oper_map.keys()
+    for k in expected.oper_map:
+        np.testing.assert_array_equal(struct.oper_map[k], expected.oper_map[k])
+
+    assert cache.stats.misses == 1
+    cache.read_mmcif(cif_path)
+    assert cache.stats.hits == 1
+
+    # Load the same assembly from several processes.  Only the first should 
+    # need to parse the file.
+    atoms = cache.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1',
+    )
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+    pl.testing.assert_frame_equal(
+            atoms,
+            mmdf.read_biological_assembly(
+                cif_path, model_id='1', assembly_id='1',
+            ),
+    )
+
+    # Quantized coordinates take up less space in the cache.
+    atoms_i32 = cache.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1', coord_dtype=pl.Int32,
+    )
+    assert atoms_i32.schema['x'] == pl.Int32
+    assert atoms_i32.estimated_size() < atoms.estimated_size()
+    pl.testing.assert_frame_equal(
+            mmdf.dequantize_atom_coords(atoms_i32),
+            atoms,
+            check_exact=False,
+            atol=1e-3,
+    )
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(2) as pool:
+        results = pool.starmap(
+                _read_assembly_in_worker,
+                [(cache, cif_path)] * 2,
+        )
+
+    assert results == [(atoms.height, 0)] * 2
+
+    # Workers must not delete the cache when they exit.
+    assert root.is_dir()
+
+    # This includes forked workers, which inherit the owner's finalizer.
+    ctx = multiprocessing.get_context('fork')
+    proc = ctx.Process(target=_close_cache_in_worker, args=(cache,))
+    proc.start()
+    proc.join()
+
+    assert proc.exitcode == 0
+    assert root.is_dir()
+
+    cache.close()
+    assert not root.exists()
+
+def test_shared_structure_cache_stale_files(tmp_path):
+    root = tmp_path / 'cache'
+    root.mkdir()
+
+    # Find a pid that doesn't belong to any running process.
+    proc = subprocess.Popen(['true'])
+    proc.wait()
+
+    stale = root / f'abc.tmp-{proc.pid}'
+    stale.mkdir()
+    live = root / f'def.tmp-{os.getpid()}'
+    live.mkdir()
+
+    # Files that don't follow the naming convention are left alone.
+    unrelated = root / 'notes.tmp-old'
+    unrelated.touch()
+
+    cache = mmdf.SharedStructureCache(root)
+    assert not stale.exists()
+    assert live.exists()
+    assert unrelated.exists()
+
+    # Directories that already existed are never deleted.
+    cache.close()
+    assert root.exists()
@@ -0,0 +1,168 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import pytest
+
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+def test_canonicalize_atoms():
+    atoms = pl.DataFrame(
+            [
+                dict(model_id='1', subchain_id='B', seq_id=1, alt_id=None, atom_id='N'),
+                dict(model_id='1', subchain_id='A', seq_id=2, alt_id=None, atom_id='N'),
+                dict(model_id='1', subchain_id='A', seq_id=1, alt_id='B', atom_id='CB'),
+                dict(model_id='1', subchain_id='A', seq_id=1, alt_id='A', atom_id='CB'),
+                dict(model_id='1', subchain_id='A', seq_id=1, alt_id=None, atom_id='N'),
+                dict(model_id='1', subchain_id='A', seq_id=1, alt_id=None, atom_id='CA'),
+                dict(model_id='1', subchain_id='C', seq_id=None, alt_id=None, atom_id='O'),
+                dict(model_id='0', subchain_id='A', seq_id=1, alt_id=None, atom_id='N'),
+            ],
+            schema_overrides=dict(seq_id=pl.Int64),
+    )
+    assert not mmdf.is_canonical_atoms(atoms)
+
+    canonical = mmdf.canonicalize_atoms(atoms)
+    assert mmdf.is_canonical_atoms(canonical)
+
+    pl.testing.assert_frame_equal(canonical, atoms[[7, 5, 4, 3, 2, 1, 0, 6]])
+
+    # Filtering and slicing preserve the canonical order:
+    assert mmdf.is_canonical_atoms(canonical.filter(pl.col('atom_id') != 'CA'))
+    assert mmdf.is_canonical_atoms(canonical[2:5])
+    assert mmdf.is_canonical_atoms(canonical.with_columns(x=pl.lit(1.0)))
+
+    # Operations that might reorder the rows don't:
+    assert not mmdf.is_canonical_atoms(canonical.sort('atom_id'))
+    assert not mmdf.is_canonical_atoms(pl.concat([canonical, canonical]))
+
+    # Canonicalizing twice has no effect:
+    assert mmdf.canonicalize_atoms(canonical) is canonical
+
+def test_canonicalize_atoms_keep_order():
+    atoms = pl.DataFrame(
+            [
+                dict(subchain_id='B', seq_id=None, atom_id='O', x=1.0),
+                dict(subchain_id='A', seq_id=1, atom_id='N', x=2.0),
+                dict(subchain_id='B', seq_id=None, atom_id='O', x=3.0),
+                dict(subchain_id='B', seq_id=None, atom_id='O', x=4.0),
+            ],
+            schema_overrides=dict(seq_id=pl.Int64),
+    )
+    pl.testing.assert_frame_equal(
+            mmdf.canonicalize_atoms(atoms),
+            atoms[[1, 0, 2, 3]],
+    )
+
+def test_is_canonical_atoms_first_col_only():
+    # The first key column being sorted isn't enough, so the flag that 
+    # polars sets on that column can't be trusted by itself.
+    atoms = pl.DataFrame([
+        dict(model_id='1', subchain_id='B', seq_id=1, atom_id='N'),
+        dict(model_id='1', subchain_id='A', seq_id=1, atom_id='N'),
+    ])
+    atoms = atoms.sort('model_id')
+
+    assert atoms.get_column('model_id').flags['SORTED_ASC']
+    assert not mmdf.is_canonical_atoms(atoms)
+
+def test_is_canonical_atoms_missing_cols():
+    # Some functions that check for canonical order, e.g. 
+    # `assign_residue_ids()`, don't otherwise require every key column.
+    atoms = pl.DataFrame([
+        dict(structure_id=0, subchain_id='A', seq_id=1),
+    ])
+    assert atoms.get_column('structure_id').flags['SORTED_ASC']
+    assert not mmdf.is_canonical_atoms(atoms)
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '4rek'])
+def test_atom_index(pdb_id):
+    atoms = mmdf.read_asymmetric_unit(PDB_DIR / f'{pdb_id}.cif.gz')
+    index = mmdf.AtomIndex(atoms)
+
+    assert len(index) == atoms.height
+    assert mmdf.is_canonical_atoms(index.atoms)
+
+    def filter_atoms(**ids):
+        return index.atoms.filter(
+                pl.col(k).eq_missing(v) for k, v in ids.items()
+        )
+
+    for subchain_id in atoms['subchain_id'].unique():
+        pl.testing.assert_frame_equal(
+                index.get_chain(subchain_id),
+                filter_atoms(subchain_id=subchain_id),
+        )
+
+    residues = atoms.select('subchain_id', 'seq_id').unique()
+    for subchain_id, seq_id in residues.iter_rows():
+        pl.testing.assert_frame_equal(
+                index.get_residue(subchain_id, seq_id),
+                filter_atoms(subchain_id=subchain_id, seq_id=seq_id),
+        )
+
+    atom_ids = atoms.select('subchain_id', 'seq_id', 'atom_id', 'alt_id').unique()
+    for subchain_id, seq_id, atom_id, alt_id in atom_ids.head(200).iter_rows():
+        pl.testing.assert_frame_equal(
+                index.get_atom(subchain_id, seq_id, atom_id),
+                filter_atoms(
+                    subchain_id=subchain_id,
+                    seq_id=seq_id,
+                    atom_id=atom_id,
+                ),
+        )
+        pl.testing.assert_frame_equal(
+                index.get_atom(subchain_id, seq_id, atom_id, alt_id=alt_id),
+                filter_atoms(
+                    subchain_id=subchain_id,
+                    seq_id=seq_id,
+                    atom_id=atom_id,
+                    alt_id=alt_id,
+                ),
+        )
+
+def test_atom_index_alt_ids():
+    atoms = pl.DataFrame([
+        dict(subchain_id='A', seq_id=1, alt_id=None, atom_id='N'),
+        dict(subchain_id='A', seq_id=1, alt_id='A', atom_id='CB'),
+        dict(subchain_id='A', seq_id=1, alt_id='A', atom_id='CG'),
+        dict(subchain_id='A', seq_id=1, alt_id='B', atom_id='CB'),
+        dict(subchain_id='A', seq_id=1, alt_id='B', atom_id='CG'),
+    ])
+    index = mmdf.AtomIndex(atoms)
+
+    pl.testing.assert_frame_equal(index.get_atom('A', 1, 'CG'), atoms[[2, 4]])
+    pl.testing.assert_frame_equal(index.get_atom('A', 1, 'CG', alt_id='B'), atoms[[4]])
+    pl.testing.assert_frame_equal(index.get_atom('A', 1, 'N', alt_id=None), atoms[[0]])
+    pl.testing.assert_frame_equal(index.get_atom('A', 1, 'N', alt_id='A'), atoms.clear())
+
+def test_atom_index_models():
+    atoms = pl.DataFrame([
+        dict(model_id='1', symmetry_mate=0, subchain_id='A', seq_id=1, atom_id='N'),
+        dict(model_id='1', symmetry_mate=1, subchain_id='A', seq_id=1, atom_id='N'),
+        dict(model_id='2', symmetry_mate=0, subchain_id='A', seq_id=1, atom_id='N'),
+        dict(model_id='2', symmetry_mate=0, subchain_id='B', seq_id=1, atom_id='N'),
+    ])
+    index = mmdf.AtomIndex(atoms)
+
+    pl.testing.assert_frame_equal(index.get_chain('A'), atoms[[0, 1, 2]])
+    pl.testing.assert_frame_equal(index.get_chain('A', model_id='2'), atoms[[2]])
+    pl.testing.assert_frame_equal(index.get_chain('A', symmetry_mate=0), atoms[[0, 2]])
+    pl.testing.assert_frame_equal(index.get_residue('B', 1), atoms[[3]])
+    pl.testing.assert_frame_equal(index.get_residue('B', 2), atoms.clear())
+    pl.testing.assert_frame_equal(index.get_chain('C'), atoms.clear())
+    pl.testing.assert_frame_equal(index.select(model_id='1'), atoms[[0, 1]])
+
+def test_atom_index_err_unknown_col():
+    atoms = pl.DataFrame([
+        dict(subchain_id='A', seq_id=1, atom_id='N'),
+    ])
+    index = mmdf.AtomIndex(atoms)
+
+    with pytest.raises(ValueError, match="can't look up atoms by: comp_id"):
+        index.select(comp_id='GLY')
+
+    # This column is a canonical key, but it's not in this dataframe.
+    with pytest.raises(ValueError, match="can't look up atoms by: model_id"):
+        index.get_chain('A', model_id='1')
@@ -0,0 +1,244 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import json
+import shutil
+import pytest
+
+from macromol_dataframe.cli import main
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+PDB_IDS = ['1fav', '2gtl', '4ous', '4rek']
+
+@pytest.fixture
+def pdb_mirror(tmp_path):
+    mirror = tmp_path / 'pdb'
+    for pdb_id in PDB_IDS:
+        cif_path = mmdf.get_pdb_path(mirror, pdb_id)
+        cif_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(PDB_DIR / f'{pdb_id}.cif.gz', cif_path)
+    return mirror
+
+def read_checkpoint(path):
+    checkpoint = {}
+
+    for line in path.read_text().splitlines():
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        checkpoint[entry['id']] = entry
+
+    return checkpoint
+
+def read_shards(out_dir):
+    return pl.read_parquet(out_dir / 'shard-*.parquet')
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_convert(pdb_mirror, tmp_path, processes):
+    out_dir = tmp_path / 'out'
+    main([
+        'convert', str(pdb_mirror), str(out_dir),
+        '--processes', str(processes),
+        '--shard-size', '3',
+    ])
+
+    assert sorted(x.name for x in out_dir.glob('shard-*')) == [
+            'shard-000000.parquet',
+            'shard-000001.parquet',
+    ]
+    assert read_checkpoint(out_dir / 'checkpoint.jsonl') == {
+            'fa/1fav.cif.gz': dict(id='fa/1fav.cif.gz', status='done', shard='shard-000000'),
+            'gt/2gtl.cif.gz': dict(id='gt/2gtl.cif.gz', status='done', shard='shard-000000'),
+            'ou/4ous.cif.gz': dict(id='ou/4ous.cif.gz', status='done', shard='shard-000000'),
+            're/4rek.cif.gz': dict(id='re/4rek.cif.gz', status='done', shard='shard-000001'),
+    }
+
+    atoms = read_shards(out_dir)
+
+    for pdb_id in PDB_IDS:
+        pl.testing.assert_frame_equal(
+                atoms
+                .filter(structure_id=pdb_id.upper())
+                .drop('structure_id'),
+                mmdf.read_asymmetric_unit(PDB_DIR / f'{pdb_id}.cif.gz'),
+        )
+
+def test_convert_assembly(pdb_mirror, tmp_path):
+    out_dir = tmp_path / 'out'
+    main([
+        'convert', str(pdb_mirror), str(out_dir),
+        '--processes', '1',
+        '--assembly', '1',
+        '--coord-dtype', 'float32',
+    ])
+
+    atoms = read_shards(out_dir)
+
+    for pdb_id in PDB_IDS:
+        pl.testing.assert_frame_equal(
+                atoms
+                .filter(structure_id=pdb_id.upper())
+                .drop('structure_id'),
+                mmdf.read_biological_assembly(
+                    PDB_DIR / f'{pdb_id}.cif.gz',
+                    model_id='1',
+                    assembly_id='1',
+                    coord_dtype=pl.Float32,
+                ),
+        )
+
+def test_convert_resume(pdb_mirror, tmp_path, capsys):
+    out_dir = tmp_path / 'out'
+    args = [
+        'convert', str(pdb_mirror), str(out_dir),
+        '--processes', '1',
+        '--shard-size', '1',
+    ]
+
+    # Start with only two of the structures, to simulate a run that was 
+    # interrupted partway through.
+    hidden_dir = tmp_path / 'hidden'
+    hidden_dir.mkdir()
+    for pdb_id in ['4ous', '4rek']:
+        shutil.move(mmdf.get_pdb_path(pdb_mirror, pdb_id), hidden_dir)
+
+    main(args)
+    capsys.readouterr()
+
+    for pdb_id in ['4ous', '4rek']:
+        shutil.move(
+                hidden_dir / f'{pdb_id}.cif.gz',
+                mmdf.get_pdb_path(pdb_mirror, pdb_id),
+        )
+
+    # Leave behind the kind of files that would be left by an interrupted 
+    # run.  These should be cleaned up.
+    (out_dir / 'shard-000002.parquet.tmp-1234').touch()
+    (out_dir / 'shard-000009.parquet').touch()
+    with open(out_dir / 'checkpoint.jsonl', 'a') as f:
+        f.write('\n{"id": "ou/4ous.cif.gz", "sta')
+
+    main(args)
+
+    assert "processing 2 files (2 already done)" in capsys.readouterr().err
+    assert sorted(x.name for x in out_dir.glob('shard-*')) == [
+            'shard-000000.parquet',
+            'shard-000001.parquet',
+            'shard-000002.parquet',
+            'shard-000003.parquet',
+    ]
+
+    checkpoint = read_checkpoint(out_dir / 'checkpoint.jsonl')
+    assert checkpoint['ou/4ous.cif.gz']['shard'] == 'shard-000002'
+    assert checkpoint['re/4rek.cif.gz']['shard'] == 'shard-000003'
+
+    atoms = read_shards(out_dir)
+    pl.testing.assert_frame_equal(
+            atoms.group_by('structure_id').len().sort('structure_id'),
+            pl.DataFrame(
+                {
+                    'structure_id': [x.upper() for x in PDB_IDS],
+                    'len': [
+                        mmdf.read_asymmetric_unit(PDB_DIR / f'{x}.cif.gz').height
+                        for x in PDB_IDS
+                    ],
+                },
+                schema_overrides={'len': pl.UInt32},
+            ),
+    )
+
+def test_convert_failed(pdb_mirror, tmp_path, capsys):
+    bad_cif_path = pdb_mirror / 'xx' / '9bad.cif'
+    bad_cif_path.parent.mkdir()
+    bad_cif_path.write_text('data_9bad\n_atom_site.id 1\n')
+
+    out_dir = tmp_path / 'out'
+    args = [
+        'convert', str(pdb_mirror), str(out_dir),
+        '--suffix', '.cif',
+        '--processes', '1',
+    ]
+    main(args)
+
+    checkpoint = read_checkpoint(out_dir / 'checkpoint.jsonl')
+    assert checkpoint == {
+            'xx/9bad.cif': {
+                'id': 'xx/9bad.cif',
+                'status': 'failed',
+                'error': {
+                    'type': 'MmcifError',
+                    'brief': 'missing required column(s)',
+                    'info': [
+                        f'path: {bad_cif_path}',
+                        'category: _atom_site.*',
+                    ],
+                    'blame': [
+                        "missing column(s): ['type_symbol', 'Cartn_x', 'Cartn_y', 'Cartn_z']",
+                    ],
+                },
+            },
+    }
+    assert "1 failed" in capsys.readouterr().err
+    assert not list(out_dir.glob('shard-*'))
+
+    # By default, failed files aren't tried again.
+    main(args)
+    assert "processing 0 files (1 already done)" in capsys.readouterr().err
+
+    main([*args, '--retry-failed'])
+    assert "processing 1 files (0 already done)" in capsys.readouterr().err
+
+def test_index(pdb_mirror, tmp_path):
+    out_dir = tmp_path / 'out'
+    main([
+        'index', str(pdb_mirror), str(out_dir),
+        '--processes', '1',
+    ])
+
+    pl.testing.assert_frame_equal(
+            read_shards(out_dir),
+            mmdf.index_pdb(pdb_mirror, processes=1),
+    )
+
+def test_index_hashes(pdb_mirror, tmp_path):
+    out_dir = tmp_path / 'out'
+    main([
+        'index', str(pdb_mirror), str(out_dir),
+        '--processes', '1',
+        '--hashes',
+    ])
+
+    pl.testing.assert_frame_equal(
+            read_shards(out_dir),
+            mmdf.index_pdb(pdb_mirror, processes=1, hashes=True),
+    )
+
+def test_cache(pdb_mirror, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    main([
+        'cache', str(pdb_mirror), str(cache_dir),
+        '--processes', '1',
+        '--assembly', '1',
+    ])
+
+    assert cache_dir.exists()
+
+    cache = mmdf.SharedStructureCache(cache_dir)
+    cif_path = mmdf.get_pdb_path(pdb_mirror, '4ous')
+
+    pl.testing.assert_frame_equal(
+            cache.read_biological_assembly(
+                cif_path,
+                model_id='1',
+                assembly_id='1',
+            ),
+            mmdf.read_biological_assembly(
+                cif_path,
+                model_id='1',
+                assembly_id='1',
+            ),
+    )
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 0
@@ -0,0 +1,255 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import numpy as np
+import pytest
+
+from macromol_dataframe.testing import atoms_fwf
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+def test_collate_atoms_padded():
+    atoms_1 = atoms_fwf('''\
+            subchain resi resn atom e  x  y  z
+            A        1    GLY  N    N  1  2  3
+            A        1    GLY  CA   C  4  5  6
+            A        2    XYZ  C1   C  7  8  9
+            B        .    HOH  O    O  0  1  2''')
+    atoms_2 = atoms_fwf('''\
+            subchain resi resn atom e  x  y  z
+            A        5    DA   P    P  3  2  1
+            A        6    DA   P    ZN 6  5  4''')
+    batch = mmdf.collate_atoms(
+            [atoms_1, atoms_2],
+            vocabs=dict(
+                element=['C', 'N', 'O', 'P'],
+                comp_id=['GLY', 'DA'],
+            ),
+    )
+
+    assert batch.is_padded
+    assert batch.batch_size == 2
+    assert batch.coords.dtype == np.float32
+    assert batch.batch_index is None
+
+    np.testing.assert_array_equal(
+            batch.coords,
+            [
+                [[1, 2, 3], [4, 5, 6], [7, 8, 9], [0, 1, 2]],
+                [[3, 2, 1], [6, 5, 4], [0, 0, 0], [0, 0, 0]],
+            ],
+    )
+    np.testing.assert_array_equal(
+            batch.mask,
+            [[1, 1, 1, 1], [1, 1, 0, 0]],
+    )
+    np.testing.assert_array_equal(batch.offsets, [0, 4, 6])
+
+    assert set(batch.tokens) == {'element', 'comp_id'}
+    np.testing.assert_array_equal(
+            batch.tokens['element'],
+            [[2, 1, 1, 3], [4, 5, 0, 0]],
+    )
+    np.testing.assert_array_equal(
+            batch.tokens['comp_id'],
+            [[1, 1, 3, 3], [2, 2, 0, 0]],
+    )
+    np.testing.assert_array_equal(
+            batch.residue_index,
+            [[0, 0, 1, -1], [0, 1, -1, -1]],
+    )
+
+def test_collate_atoms_null():
+    # Null values should be encoded as unknown, not as padding.
+    atoms = atoms_fwf('''\
+            subchain resi resn atom e  x  y  z
+            A        1    GLY  N    N  1  2  3
+            A        1    GLY  CA   C  4  5  6''').with_columns(
+            element=pl.Series(['N', None]),
+            atom_id=pl.Series([None, 'CA']),
+    )
+    vocabs = dict(element=['C', 'N'], atom_id=['N', 'CA'])
+
+    for layout in ['padded', 'packed']:
+        batch = mmdf.collate_atoms(
+                [atoms, atoms.head(1)],
+                layout=layout,
+                vocabs=vocabs,
+        )
+        element = batch.tokens['element']
+        atom_id = batch.tokens['atom_id']
+
+        if batch.is_padded:
+            np.testing.assert_array_equal(element, [[2, 3], [2, 0]])
+            np.testing.assert_array_equal(atom_id, [[3, 2], [3, 0]])
+        else:
+            np.testing.assert_array_equal(element, [2, 3, 2])
+            np.testing.assert_array_equal(atom_id, [3, 2, 3])
+
+def test_collate_atoms_packed():
+    atoms = [
+            mmdf.read_asymmetric_unit(PDB_DIR / f'{pdb_id}.cif.gz')
+            for pdb_id in ['1fav', '4rek', '4ous']
+    ]
+    padded = mmdf.collate_atoms(atoms)
+    packed = mmdf.collate_atoms(atoms, layout='packed')
+
+    assert not packed.is_padded
+    assert packed.mask is None
+    assert packed.coords.shape == (sum(x.height for x in atoms), 3)
+
+    np.testing.assert_array_equal(packed.offsets, padded.offsets)
+    np.testing.assert_array_equal(
+            packed.batch_index,
+            np.repeat([0, 1, 2], [x.height for x in atoms]),
+    )
+
+    for i, atoms_i in enumerate(atoms):
+        start, end = packed.offsets[i:i+2]
+        n = end - start
+
+        assert padded.mask[i].sum() == n
+        np.testing.assert_array_equal(
+                packed.coords[start:end],
+                padded.coords[i, :n],
+        )
+        np.testing.assert_allclose(
+                packed.coords[start:end],
+                mmdf.get_atom_coords(atoms_i),
+                atol=1e-3,
+        )
+
+        for k in packed.tokens:
+            np.testing.assert_array_equal(
+                    packed.tokens[k][start:end],
+                    padded.tokens[k][i, :n],
+            )
+
+        # The residue indices should match those assigned to each structure 
+        # on its own.
+        residue_ids = (
+                mmdf.assign_residue_ids(
+                    atoms_i.with_row_index('atom_i'),
+                )
+                .select('atom_i', 'residue_id')
+        )
+        expected = np.full(n, -1)
+        expected[residue_ids['atom_i']] = residue_ids['residue_id']
+
+        np.testing.assert_array_equal(
+                packed.residue_index[start:end],
+                expected,
+        )
+
+    # Every array should be suitable for wrapping without a copy.
+    for x in [packed.coords, packed.residue_index, *packed.tokens.values()]:
+        assert x.flags['C_CONTIGUOUS']
+        assert x.flags['WRITEABLE']
+
+def test_collate_atoms_default_vocabs():
+    atoms = mmdf.read_asymmetric_unit(PDB_DIR / '2gtl.cif.gz')
+    batch = mmdf.collate_atoms([atoms], layout='packed', residue_index=False)
+
+    assert batch.residue_index is None
+
+    def decode(tokens, vocab):
+        lookup = np.array(['', *vocab, '?'], dtype=object)
+        return lookup[tokens]
+
+    expected = atoms.select(
+            pl.col('element').replace_strict(
+                mmdf.ELEMENT_VOCAB, mmdf.ELEMENT_VOCAB, default='?',
+            ),
+            pl.col('comp_id').replace_strict(
+                mmdf.COMP_ID_VOCAB, mmdf.COMP_ID_VOCAB, default='?',
+            ),
+            pl.col('atom_id').replace_strict(
+                mmdf.ATOM_ID_VOCAB, mmdf.ATOM_ID_VOCAB, default='?',
+            ),
+    )
+
+    np.testing.assert_array_equal(
+            decode(batch.tokens['element'], mmdf.ELEMENT_VOCAB),
+            expected['element'].to_numpy(),
+    )
+    np.testing.assert_array_equal(
+            decode(batch.tokens['comp_id'], mmdf.COMP_ID_VOCAB),
+            expected['comp_id'].to_numpy(),
+    )
+    np.testing.assert_array_equal(
+            decode(batch.tokens['atom_id'], mmdf.ATOM_ID_VOCAB),
+            expected['atom_id'].to_numpy(),
+    )
+
+    # The heme and ligand atoms aren't in the default vocabularies.
+    assert (batch.tokens['comp_id'] == len(mmdf.COMP_ID_VOCAB) + 1).any()
+
+def test_collate_atoms_batch_key():
+    atoms = mmdf.read_asymmetric_unit(PDB_DIR / '1fav.cif.gz')
+    atoms_0 = atoms.filter(subchain_id='A')
+    atoms_2 = atoms.filter(subchain_id='B')
+
+    # The same subchain appears in two different structures, and the rows 
+    # aren't grouped by structure.
+    combined = pl.concat([
+        atoms_2.with_columns(batch=2),
+        atoms_0.with_columns(batch=0),
+        atoms_2.head(10).with_columns(batch=3),
+    ])
+
+    actual = mmdf.collate_atoms(combined, batch_key='batch', batch_size=5)
+    expected = mmdf.collate_atoms(
+            [atoms_0, atoms.clear(), atoms_2, atoms_2.head(10), atoms.clear()],
+    )
+
+    assert actual.batch_size == 5
+    np.testing.assert_array_equal(actual.offsets, expected.offsets)
+    np.testing.assert_array_equal(actual.mask, expected.mask)
+    np.testing.assert_array_equal(actual.coords, expected.coords)
+    np.testing.assert_array_equal(actual.residue_index, expected.residue_index)
+
+    for k in expected.tokens:
+        np.testing.assert_array_equal(actual.tokens[k], expected.tokens[k])
+
+def test_collate_atoms_pad_to():
+    atoms = atoms_fwf('''\
+            subchain resi resn atom e  x  y  z
+            A        1    GLY  N    N  1  2  3
+            A        1    GLY  CA   C  4  5  6''')
+    batch = mmdf.collate_atoms(
+            [atoms, atoms.head(1)],
+            pad_to=3,
+            coord_dtype=np.float64,
+    )
+
+    assert batch.coords.shape == (2, 3, 3)
+    assert batch.coords.dtype == np.float64
+    np.testing.assert_array_equal(batch.mask, [[1, 1, 0], [1, 0, 0]])
+
+    with pytest.raises(ValueError, match="can't pad to 1 atoms"):
+        mmdf.collate_atoms([atoms], pad_to=1)
+
+def test_collate_atoms_err():
+    atoms = atoms_fwf('''\
+            subchain resi resn atom e  x  y  z
+            A        1    GLY  N    N  1  2  3''')
+
+    with pytest.raises(ValueError, match="batch_key"):
+        mmdf.collate_atoms(atoms)
+
+    with pytest.raises(ValueError, match="batch_key"):
+        mmdf.collate_atoms([atoms], batch_key='batch')
+
+    with pytest.raises(ValueError, match="unknown layout: 'ragged'"):
+        mmdf.collate_atoms([atoms], layout='ragged')
+
+    batch_atoms = atoms.with_columns(batch=2)
+
+    with pytest.raises(ValueError, match="batch_size=2 is too small"):
+        mmdf.collate_atoms(batch_atoms, batch_key='batch', batch_size=2)
+
+    with pytest.raises(ValueError, match="negative"):
+        mmdf.collate_atoms(
+                batch_atoms.with_columns(batch=-1),
+                batch_key='batch',
+        )
@@ -105,3 +105,147 @@ def test_invert_coord_frame(origin, rot_vec_rad, coords_x):
     assert coords_x2 == approx(coords_x)
 
 
+@settings(deadline=None)
+@given(
+        arrays(float, (5, 3), elements=float_bounds()),
+        arrays(float, (5, 3), elements=float_bounds(2*pi)),
+        arrays(float, (7, 3), elements=float_bounds()),
+)
+def test_make_coord_frames(origins, rot_vecs_rad, coords_x):
+    frames_xy = mmdf.make_coord_frame_from_rotation_vector(origins, rot_vecs_rad)
+    assert frames_xy.shape == (5, 4, 4)
+
+    coords_x = mmdf.homogenize_coords(coords_x)
+    coords_y = mmdf.transform_coords(coords_x, frames_xy)
+    assert coords_y.shape == (5, 7, 4)
+
+    rotations = Rotation.from_rotvec(rot_vecs_rad)
+    frames_rot_xy = mmdf.make_coord_frame(origins, rotations)
+    frames_mat_xy = mmdf.make_coord_frame_from_rotation_matrix(
+            origins, rotations.as_matrix(),
+    )
+    np.testing.assert_allclose(frames_rot_xy, frames_xy)
+    np.testing.assert_allclose(frames_mat_xy, frames_xy)
+
+    frames_yx = mmdf.invert_coord_frame(frames_xy)
+    coords_x2 = mmdf.transform_coords(coords_y, frames_yx)
+
+    for i in range(5):
+        frame_xy = mmdf.make_coord_frame_from_rotation_vector(
+                origins[i], rot_vecs_rad[i],
+        )
+        np.testing.assert_allclose(frames_xy[i], frame_xy)
+        np.testing.assert_allclose(frames_yx[i], mmdf.invert_coord_frame(frame_xy))
+
+        assert coords_x2[i] == approx(coords_x)
+
+    np.testing.assert_allclose(
+            mmdf.get_origin(frames_xy),
+            origins,
+            atol=1e-8,
+    )
+    np.testing.assert_allclose(
+            mmdf.get_rotation_matrix(frames_xy),
+            rotations.as_matrix(),
+            atol=1e-8,
+    )
+
+def test_make_coord_frames_no_rotation():
+    origins = np.array([
+        [1, 2, 3],
+        [4, 5, 6],
+    ])
+    frames_xy = mmdf.make_coord_frame(origins)
+
+    coords_x = mmdf.homogenize_coords(origins)[:, np.newaxis]
+    coords_y = mmdf.transform_coords(coords_x, frames_xy)
+    assert coords_y == approx(np.array([[[0, 0, 0, 1]], [[0, 0, 0, 1]]]))
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_coord_precision(dtype):
+    origin = np.array([1, 2, 3], dtype=dtype)
+    rot_vec_rad = np.array([0, 0, pi/2])
+    coords_x = np.array([[1, 2, 3], [4, 5, 6]], dtype=dtype)
+
+    frames_xy = [
+            mmdf.make_coord_frame(origin),
+            mmdf.make_coord_frame_from_rotation_vector(origin, rot_vec_rad),
+            mmdf.make_coord_frame_from_rotation_matrix(origin, np.eye(3)),
+    ]
+    for frame_xy in frames_xy:
+        assert frame_xy.dtype == dtype
+        assert mmdf.invert_coord_frame(frame_xy).dtype == dtype
+        assert mmdf.get_origin(frame_xy).dtype == dtype
+
+    coords_x = mmdf.homogenize_coords(coords_x)
+    assert coords_x.dtype == dtype
+
+    # A double-precision frame shouldn't upcast single-precision coordinates.
+    frame_xy = mmdf.make_coord_frame(origin, dtype=np.float64)
+    coords_y = mmdf.transform_coords(coords_x, frame_xy)
+    assert coords_y.dtype == dtype
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_superimpose_coords(seed):
+    rng = np.random.default_rng(seed)
+
+    origins = rng.uniform(-10, 10, size=(4, 3))
+    rotations = Rotation.random(4, random_state=rng)
+    frames_xy = mmdf.make_coord_frame(origins, rotations)
+
+    coords_x = rng.uniform(-10, 10, size=(4, 20, 3))
+    coords_y = mmdf.transform_coords(
+            mmdf.homogenize_coords(coords_x),
+            frames_xy,
+    )[..., 0:3]
+
+    frames_fit_xy = mmdf.superimpose_coords(coords_x, coords_y)
+    assert frames_fit_xy.shape == (4, 4, 4)
+    np.testing.assert_allclose(frames_fit_xy, frames_xy, atol=1e-8)
+    np.testing.assert_allclose(
+            mmdf.calc_rmsd(coords_x, coords_y),
+            np.sqrt(np.mean(np.sum((coords_x - coords_y)**2, axis=-1), axis=-1)),
+    )
+
+    # Points with zero weight shouldn't affect the superposition at all.
+    coords_y[:, 0:5] += rng.uniform(-10, 10, size=(4, 5, 3))
+    weights = np.ones((4, 20))
+    weights[:, 0:5] = 0
+
+    frames_fit_xy = mmdf.superimpose_coords(coords_x, coords_y, weights)
+    np.testing.assert_allclose(frames_fit_xy, frames_xy, atol=1e-8)
+
+    coords_fit_y = mmdf.transform_coords(
+            mmdf.homogenize_coords(coords_x),
+            frames_fit_xy,
+    )[..., 0:3]
+    np.testing.assert_allclose(
+            mmdf.calc_rmsd(coords_fit_y, coords_y, weights),
+            0,
+            atol=1e-8,
+    )
+
+def test_superimpose_coords_reflection():
+    # The mirror image of a chiral point cloud can't be superimposed by a 
+    # proper rotation, so make sure we don't return an improper one.
+    coords_x = np.array([
+        [0, 0, 0],
+        [1, 0, 0],
+        [0, 2, 0],
+        [0, 0, 3],
+    ], dtype=float)
+    coords_y = coords_x * [1, 1, -1]
+
+    frame_xy = mmdf.superimpose_coords(coords_x, coords_y)
+    rot_matrix = mmdf.get_rotation_matrix(frame_xy)
+
+    assert np.linalg.det(rot_matrix) == approx(1)
+
+def test_calc_rmsd():
+    coords_x = np.array([[0, 0, 0], [0, 0, 0]], dtype=float)
+    coords_y = np.array([[1, 0, 0], [0, 3, 0]], dtype=float)
+
+    assert mmdf.calc_rmsd(coords_x, coords_y) == approx(np.sqrt(5))
+    assert mmdf.calc_rmsd(coords_x, coords_y, [1, 0]) == approx(1)
+    assert mmdf.calc_rmsd(coords_x, coords_y, [1, 3]) == approx(np.sqrt(7))
@@ -0,0 +1,166 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import numpy as np
+import pytest
+
+from macromol_dataframe.crystal import _parse_unit_cell, _make_frame
+from scipy.spatial import cKDTree
+from itertools import product
+from pathlib import Path
+
+def make_unit_cell(a, b, c, alpha=90, beta=90, gamma=90, space_group='P 1'):
+    return pl.DataFrame([
+        dict(
+            a_A=float(a),
+            b_A=float(b),
+            c_A=float(c),
+            alpha_deg=float(alpha),
+            beta_deg=float(beta),
+            gamma_deg=float(gamma),
+            space_group=space_group,
+        ),
+    ])
+
+def test_make_crystal_packing_p1():
+    asym_atoms = pl.DataFrame([
+        dict(atom_id='A', x=1.0, y=1.0, z=1.0),
+        dict(atom_id='B', x=2.0, y=1.0, z=1.0),
+    ])
+    unit_cell = make_unit_cell(10, 20, 30)
+
+    # The nearest atoms in the neighboring cells along the x-axis are 9Å away.  
+    # The nearest atoms along the other axes are further.
+    atoms = mmdf.make_crystal_packing(asym_atoms, unit_cell, cutoff_A=9.5)
+    expected = pl.DataFrame([
+        dict(atom_id='A', x=1.0, y=1.0, z=1.0, symmetry_mate=0),
+        dict(atom_id='B', x=2.0, y=1.0, z=1.0, symmetry_mate=0),
+        dict(atom_id='A', x=-9.0, y=1.0, z=1.0, symmetry_mate=1),
+        dict(atom_id='B', x=-8.0, y=1.0, z=1.0, symmetry_mate=1),
+        dict(atom_id='A', x=11.0, y=1.0, z=1.0, symmetry_mate=2),
+        dict(atom_id='B', x=12.0, y=1.0, z=1.0, symmetry_mate=2),
+    ], schema_overrides=dict(symmetry_mate=pl.Int32))
+
+    pl.testing.assert_frame_equal(atoms, expected)
+
+    atoms = mmdf.make_crystal_packing(asym_atoms, unit_cell, cutoff_A=8.5)
+    assert atoms['symmetry_mate'].unique().to_list() == [0]
+
+def test_make_crystal_packing_template():
+    asym_atoms = pl.DataFrame([
+        dict(atom_id='A', x=1.0, y=1.0, z=1.0),
+        dict(atom_id='B', x=2.0, y=1.0, z=1.0),
+    ])
+    unit_cell = make_unit_cell(10, 20, 30)
+    frames_xy = mmdf.find_crystal_symmetry_mates(
+            asym_atoms, unit_cell,
+            cutoff_A=9.5,
+    )
+
+    # The template should give the same packing, and should be able to give 
+    # new packings when the asymmetric unit moves.
+    template = mmdf.AssemblyTemplate.from_frames(asym_atoms, frames_xy)
+    pl.testing.assert_frame_equal(
+            template.atoms,
+            mmdf.make_crystal_packing(asym_atoms, unit_cell, cutoff_A=9.5),
+    )
+
+    asym_atoms_2 = asym_atoms.with_columns(pl.col('y') + 1)
+    expected = pl.DataFrame([
+        dict(atom_id='A', x=1.0, y=2.0, z=1.0, symmetry_mate=0),
+        dict(atom_id='B', x=2.0, y=2.0, z=1.0, symmetry_mate=0),
+        dict(atom_id='A', x=-9.0, y=2.0, z=1.0, symmetry_mate=1),
+        dict(atom_id='B', x=-8.0, y=2.0, z=1.0, symmetry_mate=1),
+        dict(atom_id='A', x=11.0, y=2.0, z=1.0, symmetry_mate=2),
+        dict(atom_id='B', x=12.0, y=2.0, z=1.0, symmetry_mate=2),
+    ], schema_overrides=dict(symmetry_mate=pl.Int32))
+
+    pl.testing.assert_frame_equal(
+            template.replace_coords(asym_atoms_2),
+            expected,
+    )
+
+def test_make_crystal_packing_p21():
+    # A 2-fold screw axis along y maps (x, y, z) to (-x, y + ½, -z).
+    asym_atoms = pl.DataFrame([
+        dict(x=1.0, y=0.0, z=1.0),
+    ])
+    unit_cell = make_unit_cell(100, 10, 100, space_group='P 1 21 1')
+
+    frames_xy = mmdf.find_crystal_symmetry_mates(
+            asym_atoms, unit_cell,
+            cutoff_A=6,
+    )
+    coords_y = mmdf.transform_coords(
+            mmdf.homogenize_coords(mmdf.get_atom_coords(asym_atoms)),
+            frames_xy,
+    )[:, 0, 0:3]
+
+    # Sort the mates so the test doesn't depend on the order in which they 
+    # were generated.  The first mate is always the asymmetric unit itself.
+    np.testing.assert_allclose(coords_y[0], [1, 0, 1])
+    np.testing.assert_allclose(
+            sorted(coords_y[1:].tolist()),
+            [
+                [-1, -5, -1],
+                [-1,  5, -1],
+            ],
+            atol=1e-8,
+    )
+
+def test_make_crystal_packing_errors():
+    asym_atoms = pl.DataFrame([
+        dict(x=1.0, y=0.0, z=1.0),
+    ])
+
+    with pytest.raises(ValueError, match='no unit cell'):
+        mmdf.make_crystal_packing(
+                asym_atoms,
+                make_unit_cell(10, 10, 10).clear(),
+                cutoff_A=5,
+        )
+
+    with pytest.raises(ValueError, match='unknown space group'):
+        mmdf.make_crystal_packing(
+                asym_atoms,
+                make_unit_cell(10, 10, 10, space_group='X 9'),
+                cutoff_A=5,
+        )
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '4ous', '4rek'])
+def test_find_crystal_symmetry_mates_brute_force(pdb_id):
+    # Compare against an exhaustive search, with no culling.
+    cif_path = Path(__file__).parent / 'pdb' / f'{pdb_id}.cif.gz'
+    struct = mmdf.read_mmcif(cif_path, unit_cell=True)
+    asym_atoms = mmdf.select_model(struct.asym_atoms, '1')
+    cutoff_A = 5
+
+    frames_xy = mmdf.find_crystal_symmetry_mates(
+            asym_atoms, struct.unit_cell,
+            cutoff_A=cutoff_A,
+    )
+    np.testing.assert_allclose(frames_xy[0], np.eye(4))
+
+    cell, space_group = _parse_unit_cell(struct.unit_cell)
+    frac_xf = _make_frame(cell.frac)
+    orth_fx = _make_frame(cell.orth)
+
+    coords_x = mmdf.get_atom_coords(asym_atoms, homogeneous=True)
+    tree = cKDTree(coords_x[:, 0:3])
+    expected = 0
+
+    for op in space_group.operations():
+        for shift in product(range(-2, 3), repeat=3):
+            frame_f = np.eye(4)
+            frame_f[0:3, 0:3] = np.array(op.rot) / op.DEN
+            frame_f[0:3, 3] = np.array(op.tran) / op.DEN + shift
+            frame_xy = orth_fx @ frame_f @ frac_xf
+
+            coords_y = mmdf.transform_coords(coords_x, frame_xy)[:, 0:3]
+            dists, _ = tree.query(coords_y, distance_upper_bound=cutoff_A)
+
+            if np.isfinite(dists).any():
+                expected += 1
+
+    # The brute-force search also finds the asymmetric unit itself.
+    assert len(frames_xy) == expected
@@ -0,0 +1,214 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import shutil
+import gzip
+import pytest
+
+from io import StringIO
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+PDB_IDS = ['1fav', '2gtl', '4ous', '4rek']
+
+@pytest.fixture
+def cif_paths(tmp_path):
+    # Include two structures with the same prefix, so that one partition has 
+    # multiple structures.
+    cif_paths = []
+
+    for pdb_id in [*PDB_IDS, '5ous']:
+        cif_path = mmdf.get_pdb_path(tmp_path / 'pdb', pdb_id)
+        cif_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(PDB_DIR / f'{pdb_id.replace("5", "4")}.cif.gz', cif_path)
+        cif_paths.append(cif_path)
+
+    return cif_paths
+
+def read_expected(pdb_id, **kwargs):
+    real_pdb_id = pdb_id.replace('5', '4')
+    cif_path = PDB_DIR / f'{real_pdb_id}.cif.gz'
+
+    if 'assembly_id' in kwargs:
+        atoms = mmdf.read_biological_assembly(cif_path, **kwargs)
+    else:
+        atoms = mmdf.read_asymmetric_unit(cif_path, **kwargs)
+
+    return atoms.select(
+            pl.lit(real_pdb_id.upper()).alias('structure_id'),
+            pl.lit(pdb_id[1:3]).alias('prefix'),
+            *atoms.columns,
+    )
+
+def test_write_atoms_dataset(cif_paths, tmp_path):
+    out_dir = tmp_path / 'atoms'
+    paths = mmdf.write_atoms_dataset(cif_paths, out_dir)
+
+    assert [x.relative_to(out_dir).as_posix() for x in paths] == [
+            'prefix=fa/part-00000.parquet',
+            'prefix=gt/part-00000.parquet',
+            'prefix=ou/part-00000.parquet',
+            'prefix=re/part-00000.parquet',
+    ]
+
+    for pdb_id in ['1fav', '2gtl', '4rek']:
+        pl.testing.assert_frame_equal(
+                mmdf.scan_atoms_dataset(out_dir, [pdb_id])
+                .select('structure_id', 'prefix', pl.exclude('structure_id', 'prefix'))
+                .collect(),
+                read_expected(pdb_id),
+        )
+
+    # Both structures with the "ou" prefix are in the same file, and the 
+    # structure ids come from the files themselves, so they both have the 
+    # same id.
+    ou = pl.read_parquet(out_dir / 'prefix=ou' / 'part-00000.parquet')
+    assert ou.height == 2 * read_expected('4ous').height
+
+def test_write_atoms_dataset_assembly(cif_paths, tmp_path):
+    out_dir = tmp_path / 'atoms'
+    mmdf.write_atoms_dataset(
+            cif_paths,
+            out_dir,
+            model_id='1',
+            assembly_id='1',
+            coord_dtype=pl.Float32,
+            processes=2,
+    )
+
+    for pdb_id in ['1fav', '2gtl', '4rek']:
+        pl.testing.assert_frame_equal(
+                mmdf.scan_atoms_dataset(out_dir, [pdb_id.upper()])
+                .select('structure_id', 'prefix', pl.exclude('structure_id', 'prefix'))
+                .collect(),
+                read_expected(
+                    pdb_id,
+                    model_id='1',
+                    assembly_id='1',
+                    coord_dtype=pl.Float32,
+                ),
+        )
+
+def test_write_atoms_dataset_files(cif_paths, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    out_dir = tmp_path / 'atoms'
+    paths = mmdf.write_atoms_dataset(
+            cif_paths,
+            out_dir,
+            rows_per_file=1,
+            row_group_size=1000,
+    )
+
+    # Every structure gets its own file, because structures are never split.
+    assert len(paths) == 5
+    assert (out_dir / 'prefix=ou' / 'part-00001.parquet').exists()
+
+    metadata = pq.ParquetFile(out_dir / 'prefix=re' / 'part-00000.parquet').metadata
+    num_atoms = read_expected('4rek').height
+
+    assert metadata.num_rows == num_atoms
+    assert metadata.num_row_groups == -(-num_atoms // 1000)
+
+    row_group = metadata.row_group(0)
+    column_stats = {
+            row_group.column(i).path_in_schema: row_group.column(i).statistics
+            for i in range(row_group.num_columns)
+    }
+    for col in ['element', 'comp_id', 'x', 'y', 'z']:
+        assert column_stats[col].has_min_max
+
+def test_write_atoms_dataset_append(cif_paths, tmp_path):
+    out_dir = tmp_path / 'atoms'
+    mmdf.write_atoms_dataset(cif_paths[:2], out_dir)
+
+    with pytest.raises(FileExistsError):
+        mmdf.write_atoms_dataset(cif_paths[2:], out_dir)
+
+    paths = mmdf.write_atoms_dataset(cif_paths[1:], out_dir, append=True)
+
+    assert [x.relative_to(out_dir).as_posix() for x in paths] == [
+            'prefix=gt/part-00001.parquet',
+            'prefix=ou/part-00000.parquet',
+            'prefix=re/part-00000.parquet',
+    ]
+
+    counts = (
+            mmdf.scan_atoms_dataset(out_dir)
+            .group_by('prefix')
+            .agg(pl.col('structure_id').n_unique(), pl.len())
+            .sort('prefix')
+            .collect()
+    )
+    assert counts['prefix'].to_list() == ['fa', 'gt', 'ou', 're']
+    assert counts['len'][1] == 2 * read_expected('2gtl').height
+
+    # New parts should be numbered after the highest existing part, even if 
+    # an earlier part was deleted, so that no existing part is overwritten.
+    (out_dir / 'prefix=gt' / 'part-00000.parquet').unlink()
+    paths = mmdf.write_atoms_dataset(cif_paths[1:2], out_dir, append=True)
+
+    assert [x.relative_to(out_dir).as_posix() for x in paths] == [
+            'prefix=gt/part-00002.parquet',
+    ]
+    assert sorted(x.name for x in (out_dir / 'prefix=gt').iterdir()) == [
+            'part-00001.parquet',
+            'part-00002.parquet',
+    ]
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_write_atoms_dataset_err(cif_paths, tmp_path, processes):
+    # One unreadable file shouldn't prevent the rest of the dataset from 
+    # being written.
+    bad_path = mmdf.get_pdb_path(tmp_path / 'pdb', '3ous')
+    bad_path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(bad_path, 'wt') as f:
+        f.write("""\
+data_3OUS 
+loop_ 
+_atom_site.id 
+_atom_site.type_symbol 
+1 C
+""")
+
+    # Files without any atoms should be reported, not written as empty 
+    # partitions.
+    empty_path = mmdf.get_pdb_path(tmp_path / 'pdb', '1xyz')
+    empty_path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(empty_path, 'wt') as f:
+        f.write("data_1XYZ\n_entry.id 1XYZ\n")
+
+    out_dir = tmp_path / 'atoms'
+    log = StringIO()
+    paths = mmdf.write_atoms_dataset(
+            [*cif_paths, bad_path, empty_path],
+            out_dir,
+            processes=processes,
+            log=log,
+    )
+
+    assert len(paths) == 4
+    assert f'skipping {bad_path}: MmcifError' in log.getvalue()
+    assert f'skipping {empty_path}: ValueError: no atoms found' in log.getvalue()
+    assert not (out_dir / 'prefix=xy').exists()
+
+    ou = pl.read_parquet(out_dir / 'prefix=ou' / 'part-00000.parquet')
+    assert ou.height == 2 * read_expected('4ous').height
+
+def test_scan_atoms_dataset_partition_pruning(cif_paths, tmp_path):
+    out_dir = tmp_path / 'atoms'
+    mmdf.write_atoms_dataset(cif_paths, out_dir)
+
+    # Corrupt one of the partitions.  Queries that don't involve that 
+    # partition should never read it, and so should still work.
+    (out_dir / 'prefix=re' / 'part-00000.parquet').write_bytes(b'garbage')
+
+    pl.testing.assert_frame_equal(
+            mmdf.scan_atoms_dataset(out_dir, ['2gtl'])
+            .select('structure_id', 'prefix', pl.exclude('structure_id', 'prefix'))
+            .collect(),
+            read_expected('2gtl'),
+    )
+
+    with pytest.raises(Exception):
+        mmdf.scan_atoms_dataset(out_dir, ['4rek']).collect()
@@ -0,0 +1,255 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import numpy as np
+import pytest
+
+from macromol_dataframe.testing import *
+from scipy.spatial.transform import Rotation
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+def make_fake_nmr_structure(num_models, *, coord_dtype=pl.Float64):
+    # None of the structures in the test suite have multiple models, so make 
+    # some extra models by moving the first one around.
+    struct = mmdf.read_mmcif(PDB_DIR / '4ous.cif.gz', coord_dtype=coord_dtype)
+    asym_atoms = struct.asym_atoms
+
+    rng = np.random.default_rng(0)
+    frames = mmdf.make_coord_frame(
+            rng.uniform(-10, 10, size=(num_models, 3)),
+            Rotation.random(num_models, random_state=0),
+    )
+    frames[0] = np.eye(4)
+
+    models = [
+            mmdf.transform_atom_coords(asym_atoms, frame)
+            .with_columns(model_id=pl.lit(str(i + 1)))
+            for i, frame in enumerate(frames)
+    ]
+
+    # Remove a few atoms from the last model.
+    models[-1] = models[-1].filter(pl.col('seq_id').ne_missing(10))
+
+    struct.asym_atoms = pl.concat(models)
+    return struct, frames
+
+def test_make_ensemble():
+    atoms = pl.DataFrame([
+        dict(model_id='1', atom_id='N', x=1.0, y=2.0, z=3.0),
+        dict(model_id='1', atom_id='CA', x=2.0, y=3.0, z=4.0),
+        dict(model_id='2', atom_id='CA', x=5.0, y=6.0, z=7.0),
+        dict(model_id='2', atom_id='C', x=6.0, y=7.0, z=8.0),
+        dict(model_id='2', atom_id='N', x=4.0, y=5.0, z=6.0),
+    ])
+    ensemble = mmdf.make_ensemble(atoms)
+
+    assert ensemble.num_models == 2
+    assert ensemble.num_atoms == 3
+    assert ensemble.model_ids == ['1', '2']
+
+    pl.testing.assert_frame_equal(
+            ensemble.atoms,
+            pl.DataFrame([
+                dict(atom_id='N', x=1.0, y=2.0, z=3.0),
+                dict(atom_id='CA', x=2.0, y=3.0, z=4.0),
+                dict(atom_id='C', x=6.0, y=7.0, z=8.0),
+            ]),
+    )
+    np.testing.assert_array_equal(
+            ensemble.coords,
+            [
+                [[1, 2, 3], [2, 3, 4], [np.nan, np.nan, np.nan]],
+                [[4, 5, 6], [5, 6, 7], [6, 7, 8]],
+            ],
+    )
+    np.testing.assert_array_equal(
+            ensemble.mask,
+            [
+                [True, True, False],
+                [True, True, True],
+            ],
+    )
+
+    pl.testing.assert_frame_equal(
+            ensemble.select_model('1'),
+            atoms[0:2].drop('model_id'),
+    )
+    pl.testing.assert_frame_equal(
+            ensemble.select_model('2'),
+            atoms[[4, 2, 3]].drop('model_id'),
+    )
+    pl.testing.assert_frame_equal(
+            ensemble.to_atoms(),
+            atoms[[0, 1, 4, 2, 3]],
+    )
+
+    with pytest.raises(ValueError, match="unknown model: '3'"):
+        ensemble.select_model('3')
+
+def test_make_ensemble_no_models():
+    atoms = pl.DataFrame(
+            [
+                dict(model_id=None, atom_id='N', x=1.0, y=2.0, z=3.0),
+                dict(model_id=None, atom_id='CA', x=2.0, y=3.0, z=4.0),
+            ],
+            schema_overrides=dict(model_id=pl.String),
+    )
+    ensemble = mmdf.make_ensemble(atoms)
+
+    assert ensemble.model_ids == [None]
+    pl.testing.assert_frame_equal(
+            ensemble.select_model('1'),
+            mmdf.select_model(atoms, '1'),
+    )
+
+def test_make_ensemble_err_duplicate_atoms():
+    atoms = pl.DataFrame([
+        dict(model_id='1', atom_id='N', x=1.0, y=2.0, z=3.0),
+        dict(model_id='1', atom_id='N', x=2.0, y=3.0, z=4.0),
+    ])
+    with pytest.raises(ValueError, match="unique"):
+        mmdf.make_ensemble(atoms)
+
+def test_make_ensemble_key_cols():
+    # B-factors and occupancies differ between models, but by default they 
+    # shouldn't prevent atoms from being matched.
+    atoms = pl.DataFrame([
+        dict(model_id='1', atom_id='N', b_factor=10.0, x=1.0, y=2.0, z=3.0),
+        dict(model_id='1', atom_id='CA', b_factor=20.0, x=2.0, y=3.0, z=4.0),
+        dict(model_id='2', atom_id='N', b_factor=30.0, x=4.0, y=5.0, z=6.0),
+        dict(model_id='2', atom_id='CA', b_factor=40.0, x=5.0, y=6.0, z=7.0),
+    ])
+    ensemble = mmdf.make_ensemble(atoms)
+
+    assert ensemble.num_atoms == 2
+    assert ensemble.mask.all()
+    assert ensemble.atoms['b_factor'].to_list() == [10.0, 20.0]
+    np.testing.assert_array_equal(
+            ensemble.coords[1],
+            [[4, 5, 6], [5, 6, 7]],
+    )
+
+    # Callers can choose the columns to match on.
+    ensemble = mmdf.make_ensemble(atoms, key_cols=['atom_id', 'b_factor'])
+
+    assert ensemble.num_atoms == 4
+    np.testing.assert_array_equal(
+            ensemble.mask,
+            [
+                [True, True, False, False],
+                [False, False, True, True],
+            ],
+    )
+
+@pytest.mark.parametrize('coord_dtype', [pl.Float64, pl.Float32, pl.Int32])
+def test_ensemble_select_model(coord_dtype):
+    struct, _ = make_fake_nmr_structure(3, coord_dtype=coord_dtype)
+    ensemble = mmdf.make_ensemble(struct.asym_atoms)
+
+    assert ensemble.model_ids == ['1', '2', '3']
+    assert ensemble.coords.shape == (3, 1196, 3)
+    assert ensemble.mask.sum(axis=1).tolist() == [1196, 1196, 1191]
+
+    for model_id in ensemble.model_ids:
+        pl.testing.assert_frame_equal(
+                ensemble.select_model(model_id),
+                mmdf.select_model(struct.asym_atoms, model_id),
+                check_exact=True,
+        )
+
+    pl.testing.assert_frame_equal(
+            ensemble.to_atoms(),
+            struct.asym_atoms,
+            check_exact=True,
+    )
+
+def test_ensemble_superimpose():
+    struct, frames = make_fake_nmr_structure(4)
+    ensemble = mmdf.make_ensemble(struct.asym_atoms)
+
+    rmsd = ensemble.calc_rmsd()
+    assert rmsd[0] == 0
+    assert np.all(rmsd[1:] > 1)
+
+    superimposed = ensemble.superimpose()
+    np.testing.assert_allclose(superimposed.calc_rmsd(), 0, atol=1e-6)
+    np.testing.assert_allclose(
+            superimposed.calc_rmsd(weights='occupancy'), 0, atol=1e-6,
+    )
+
+    mask = ensemble.mask
+    np.testing.assert_allclose(
+            superimposed.coords[mask],
+            np.broadcast_to(ensemble.coords[0], ensemble.coords.shape)[mask],
+            atol=1e-6,
+    )
+
+    # Superimposing onto a different model is the same as transforming 
+    # everything by that model's frame.
+    superimposed = ensemble.superimpose('2')
+    np.testing.assert_allclose(
+            superimposed.coords[mask],
+            np.broadcast_to(
+                ensemble.transform(frames[1]).coords[0],
+                ensemble.coords.shape,
+            )[mask],
+            atol=1e-6,
+    )
+
+    # The coordinates in the atoms dataframe are kept in sync.
+    np.testing.assert_allclose(
+            mmdf.get_atom_coords(superimposed.atoms),
+            superimposed.coords[0],
+    )
+
+def test_ensemble_transform():
+    struct, frames = make_fake_nmr_structure(3)
+    ensemble = mmdf.make_ensemble(struct.asym_atoms)
+
+    frame = mmdf.make_coord_frame([1, 2, 3], Rotation.from_euler('z', 90, degrees=True))
+    transformed = ensemble.transform(frame)
+
+    for model_id in ensemble.model_ids:
+        pl.testing.assert_frame_equal(
+                transformed.select_model(model_id),
+                mmdf.transform_atom_coords(
+                    ensemble.select_model(model_id),
+                    frame,
+                ),
+        )
+
+    transformed = ensemble.transform(frames)
+
+    for model_id, frame in zip(ensemble.model_ids, frames):
+        pl.testing.assert_frame_equal(
+                transformed.select_model(model_id),
+                mmdf.transform_atom_coords(
+                    ensemble.select_model(model_id),
+                    frame,
+                ),
+        )
+
+def test_ensemble_make_biological_assembly():
+    struct, _ = make_fake_nmr_structure(3)
+    ensemble = mmdf.make_ensemble(struct.asym_atoms)
+
+    assembly = ensemble.make_biological_assembly(
+            struct.assembly_gen,
+            struct.oper_map,
+            '1',
+    )
+    assert assembly.model_ids == ensemble.model_ids
+
+    for model_id in ensemble.model_ids:
+        expected = mmdf.make_biological_assembly(
+                mmdf.select_model(struct.asym_atoms, model_id),
+                struct.assembly_gen,
+                struct.oper_map,
+                '1',
+        )
+        pl.testing.assert_frame_equal(
+                assembly.select_model(model_id),
+                expected,
+        )
@@ -0,0 +1,84 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import pytest
+
+from macromol_dataframe.testing import atoms_fwf
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+def test_hash_atoms():
+    atoms = atoms_fwf('''\
+            subchain resi resn atom e  x      y      z
+            A        1    GLY  N    N  1.000  2.000  3.000
+            A        1    GLY  CA   C  4.000  5.000  6.000
+            B        .    HOH  O    O  7.000  8.000  9.000
+            B        .    HOH  O    O  0.000  1.000  2.000''')
+    h = mmdf.hash_atoms(atoms)
+
+    assert len(h) == 32
+
+    # The hash doesn't depend on the order of the rows (even for atoms with 
+    # identical metadata), on the way the coordinates are stored, or on 
+    # columns that aren't part of the hash.
+    assert mmdf.hash_atoms(atoms.reverse()) == h
+    assert mmdf.hash_atoms(atoms[[0, 1, 3, 2]]) == h
+    assert mmdf.hash_atoms(mmdf.quantize_atom_coords(atoms)) == h
+    assert mmdf.hash_atoms(atoms.with_columns(x=pl.col('x') + 1e-6)) == h
+    assert mmdf.hash_atoms(atoms.with_columns(structure_id=pl.lit('1abc'))) == h
+    assert mmdf.hash_atoms(atoms.drop('occupancy')) == h
+
+    # Any change to the atoms themselves changes the hash.
+    assert mmdf.hash_atoms(atoms.with_columns(x=pl.col('x') + 0.001)) != h
+    assert mmdf.hash_atoms(atoms.with_columns(subchain_id=pl.lit('A'))) != h
+    assert mmdf.hash_atoms(atoms.with_columns(element=pl.lit('C'))) != h
+    assert mmdf.hash_atoms(atoms.with_columns(alt_id=pl.lit('A'))) != h
+    assert mmdf.hash_atoms(atoms.with_columns(alt_id=pl.lit(''))) != \
+            mmdf.hash_atoms(atoms.with_columns(alt_id=pl.lit(None, pl.String)))
+    assert mmdf.hash_atoms(atoms.head(3)) != h
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '4rek'])
+def test_fingerprint_atoms(pdb_id):
+    atoms = mmdf.read_asymmetric_unit(PDB_DIR / f'{pdb_id}.cif.gz')
+    fp = mmdf.fingerprint_atoms(atoms)
+
+    frame = mmdf.make_coord_frame_from_rotation_vector(
+            [0.5, -1.2, 2.0],
+            [10, -20, 30],
+    )
+    moved = mmdf.transform_atom_coords(atoms, frame)
+    renamed = atoms.with_columns(subchain_id=pl.col('subchain_id') + 'x')
+
+    assert mmdf.hash_atoms(moved) != mmdf.hash_atoms(atoms)
+    assert mmdf.hash_atoms(renamed) != mmdf.hash_atoms(atoms)
+
+    assert mmdf.fingerprint_atoms(moved) == fp
+    assert mmdf.fingerprint_atoms(renamed) == fp
+    assert mmdf.fingerprint_atoms(atoms.reverse()) == fp
+
+    # Removing atoms or changing the residue names changes the fingerprint.
+    assert mmdf.fingerprint_atoms(atoms.head(-1)) != fp
+    assert mmdf.fingerprint_atoms(
+            atoms.with_columns(comp_id=pl.lit('UNK'))
+    ) != fp
+    assert mmdf.fingerprint_atoms(atoms, max_distance_A=4) != fp
+
+def test_fingerprint_atoms_chain_order():
+    # Swapping the coordinates of two chains with the same sequence doesn't 
+    # change the fingerprint, even though it changes the hash.
+    atoms = atoms_fwf('''\
+            subchain resi resn atom x  y  z
+            A        1    GLY  N    0  0  0
+            A        1    GLY  CA   1  0  0
+            B        1    GLY  N    0  5  0
+            B        1    GLY  CA   0  7  0''')
+    swapped = atoms.with_columns(
+            subchain_id=pl.col('subchain_id').replace({'A': 'B', 'B': 'A'}),
+    )
+    stretched = atoms.with_columns(
+            x=pl.when(pl.col('atom_id') == 'CA').then(3.0).otherwise('x'),
+    )
+
+    assert mmdf.hash_atoms(swapped) != mmdf.hash_atoms(atoms)
+    assert mmdf.fingerprint_atoms(swapped) == mmdf.fingerprint_atoms(atoms)
+    assert mmdf.fingerprint_atoms(stretched) != mmdf.fingerprint_atoms(atoms)
@@ -0,0 +1,154 @@
+import macromol_dataframe as mmdf
+import macromol_dataframe.index
+import polars as pl
+import polars.testing
+import pytest
+import shutil
+import os
+
+from io import StringIO
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '2gtl', '4ous', '4rek'])
+def test_read_mmcif_header(pdb_id):
+    cif_path = PDB_DIR / f'{pdb_id}.cif.gz'
+    header = mmdf.read_mmcif_header(cif_path)
+    struct = mmdf.read_mmcif(cif_path)
+
+    assert header.schema == mmdf.INDEX_SCHEMA
+    assert header['pdb_id'].unique().to_list() == [struct.id]
+    assert header['path'].unique().to_list() == [str(cif_path)]
+
+    # Make sure the atom counts match those of the actual assemblies.
+    for row in header.iter_rows(named=True):
+        asym_atoms = mmdf.select_model(struct.asym_atoms, row['model_id'])
+        atoms = mmdf.make_biological_assembly(
+                asym_atoms,
+                struct.assembly_gen,
+                struct.oper_map,
+                row['assembly_id'],
+        )
+        assert row['num_asym_atoms'] == asym_atoms.height
+        assert row['num_assembly_atoms'] == atoms.height
+
+def test_read_mmcif_header_2gtl():
+    header = mmdf.read_mmcif_header(PDB_DIR / '2gtl.cif.gz')
+    assert header.select('model_id', 'assembly_id', 'polymer_count').rows() == [
+            ('1', '1', 180),
+            ('1', '2', 15),
+            ('1', '3', 15),
+            ('1', '4', 360),
+    ]
+
+def test_index_pdb(tmp_path, monkeypatch):
+    for pdb_id in ['1fav', '4ous']:
+        cif_path = mmdf.get_pdb_path(tmp_path, pdb_id)
+        cif_path.parent.mkdir(exist_ok=True)
+        shutil.copy(PDB_DIR / f'{pdb_id}.cif.gz', cif_path)
+
+    index = mmdf.index_pdb(tmp_path, processes=2)
+    assert index['pdb_id'].to_list() == ['1FAV', '4OUS']
+
+    # Rescanning shouldn't read any files that haven't changed.
+    scanned = []
+    def read_mmcif_header(cif_path, **kwargs):
+        scanned.append(Path(cif_path).name)
+        return mmdf.read_mmcif_header(cif_path, **kwargs)
+
+    monkeypatch.setattr(
+            mmdf.index, 'read_mmcif_header', read_mmcif_header,
+    )
+
+    index_2 = mmdf.index_pdb(tmp_path, previous=index, processes=1)
+    pl.testing.assert_frame_equal(index_2, index)
+    assert scanned == []
+
+    cif_path = mmdf.get_pdb_path(tmp_path, '4ous')
+    st = cif_path.stat()
+    os.utime(cif_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    index_3 = mmdf.index_pdb(tmp_path, previous=index, processes=1)
+    assert scanned == ['4ous.cif.gz']
+    assert index_3['mtime_ns'].to_list() == [
+            index['mtime_ns'][0],
+            index['mtime_ns'][1] + 10**9,
+    ]
+
+    # Deleted files should be dropped from the index.
+    cif_path.unlink()
+
+    index_4 = mmdf.index_pdb(tmp_path, previous=index_3, processes=1)
+    assert index_4['pdb_id'].to_list() == ['1FAV']
+
+def test_read_mmcif_header_err(tmp_path):
+    cif_path = tmp_path / '1abc.cif'
+    cif_path.write_text('data_1ABC\n_entry.id 1ABC\n')
+
+    with pytest.raises(mmdf.MmcifError, match='missing required category'):
+        mmdf.read_mmcif_header(cif_path)
+
+def test_index_pdb_err(tmp_path):
+    # Files that can't be read should be reported and skipped, without 
+    # preventing the rest of the files from being indexed.
+    cif_path = mmdf.get_pdb_path(tmp_path, '1fav')
+    cif_path.parent.mkdir()
+    shutil.copy(PDB_DIR / '1fav.cif.gz', cif_path)
+
+    bad_paths = [
+            mmdf.get_pdb_path(tmp_path, '1fab', '.cif'),
+            mmdf.get_pdb_path(tmp_path, '1fax', '.cif'),
+    ]
+    bad_paths[0].write_text('data_1FAB\n_entry.id 1FAB\n')
+    bad_paths[1].write_text('garbage')
+
+    for processes in [1, 2]:
+        log = StringIO()
+        index = mmdf.index_pdb(
+                tmp_path,
+                suffix='.cif*',
+                processes=processes,
+                log=log,
+        )
+
+        assert index['pdb_id'].to_list() == ['1FAV']
+        assert f'skipping {bad_paths[0]}: MmcifError' in log.getvalue()
+        assert f'skipping {bad_paths[1]}: ' in log.getvalue()
+
+def test_read_mmcif_header_hashes():
+    cif_path = PDB_DIR / '1fav.cif.gz'
+    header = mmdf.read_mmcif_header(cif_path, hashes=True)
+    atoms = mmdf.read_asymmetric_unit(cif_path).drop('model_id')
+
+    assert header.schema == mmdf.INDEX_SCHEMA
+    assert header['asym_hash'].to_list() == [mmdf.hash_atoms(atoms)]
+    assert header['asym_fingerprint'].to_list() == [mmdf.fingerprint_atoms(atoms)]
+
+    # Hashes are only calculated on request.
+    header = mmdf.read_mmcif_header(cif_path)
+    assert header['asym_hash'].to_list() == [None]
+    assert header['asym_fingerprint'].to_list() == [None]
+
+def test_index_pdb_hashes(tmp_path):
+    # Include a copy of one structure, to make sure it's recognized as a 
+    # duplicate.
+    for pdb_id, copy_id in [('1fav', '1fav'), ('4ous', '4ous'), ('4ous', '5ous')]:
+        cif_path = mmdf.get_pdb_path(tmp_path, copy_id)
+        cif_path.parent.mkdir(exist_ok=True)
+        shutil.copy(PDB_DIR / f'{pdb_id}.cif.gz', cif_path)
+
+    # Indices made without hashes should be upgraded when hashes are 
+    # requested.  This includes indices made before the hash columns existed.
+    index = mmdf.index_pdb(tmp_path, processes=1)
+    index = index.drop('asym_hash', 'asym_fingerprint')
+
+    index = mmdf.index_pdb(tmp_path, previous=index, processes=1, hashes=True)
+    assert index.schema == mmdf.INDEX_SCHEMA
+    assert index['asym_hash'].null_count() == 0
+
+    unique = index.unique('asym_hash', keep='first', maintain_order=True)
+    assert unique['path'].to_list() == [
+            str(mmdf.get_pdb_path(tmp_path, '1fav')),
+            str(mmdf.get_pdb_path(tmp_path, '4ous')),
+    ]
@@ -0,0 +1,67 @@
+import macromol_dataframe as mmdf
+import subprocess
+import importlib
+import inspect
+import pytest
+import sys
+
+def test_all():
+    for name in mmdf.__all__:
+        assert getattr(mmdf, name) is not None
+
+    assert set(mmdf.__all__) <= set(dir(mmdf))
+
+def test_all_complete():
+    # Make sure that every public function and class defined in any of the 
+    # submodules is exported.
+    for module_name in mmdf._LAZY_IMPORTS:
+        module = importlib.import_module(f'macromol_dataframe.{module_name}')
+
+        for name, value in vars(module).items():
+            if name.startswith('_'):
+                continue
+            if not (inspect.isfunction(value) or inspect.isclass(value)):
+                continue
+            if value.__module__ != module.__name__:
+                continue
+
+            assert name in mmdf.__all__, module_name
+
+def test_submodules():
+    assert mmdf.mmcif.read_mmcif is mmdf.read_mmcif
+    assert mmdf.coords.transform_coords is mmdf.transform_coords
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError, match='not_a_real_name'):
+        mmdf.not_a_real_name
+
+def test_star_import():
+    namespace = {}
+    exec('from macromol_dataframe import *', namespace)
+    assert namespace['read_mmcif'] is mmdf.read_mmcif
+
+@pytest.mark.parametrize(
+        'name, unexpected_modules', [
+            ('__version__', ['gemmi', 'scipy', 'polars', 'numpy']),
+            ('transform_coords', ['gemmi', 'scipy', 'polars']),
+            ('transform_atom_coords', ['gemmi', 'scipy']),
+        ],
+)
+def test_lazy_imports(name, unexpected_modules):
+    # Use a subprocess, because the modules in question have almost certainly 
+    # already been imported into this process.
+    code = f'''\
+import sys
+import macromol_dataframe
+macromol_dataframe.{name}
+print(*sys.modules)
+'''
+    stdout = subprocess.run(
+            [sys.executable, '-c', code],
+            capture_output=True,
+            check=True,
+            text=True,
+    ).stdout
+
+    modules = {x.split('.')[0] for x in stdout.split()}
+    assert not modules & set(unexpected_modules)
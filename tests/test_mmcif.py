@@ -54,6 +54,7 @@ def test_extract_dataframe(mmcif, prefix, schema, expected, error):
                 oper_map=oper_map,
                 entities=entities,
                 polymers=with_pl.eval,
+                unit_cell=with_pl.eval,
             ),
             pff.defaults(
                 asym_atoms=None,
@@ -62,6 +63,7 @@ def test_extract_dataframe(mmcif, prefix, schema, expected, error):
                 oper_map=None,
                 entities=None,
                 polymers=None,
+                unit_cell=None,
             ),
             with_mmdf.error_or(
                 'pdb_id',
@@ -70,6 +72,7 @@ def test_extract_dataframe(mmcif, prefix, schema, expected, error):
                 'oper_map',
                 'entities',
                 'polymers',
+                'unit_cell',
             ),
         ],
 )
@@ -83,6 +86,7 @@ def test_read_mmcif(
         oper_map,
         entities,
         polymers,
+        unit_cell,
         error,
 ):
     if re.search(r'.cif(\.gz)?$', mmcif):
@@ -92,7 +96,7 @@ def test_read_mmcif(
         cif_path.write_text(mmcif)
 
     with error:
-        struct = mmdf.read_mmcif(cif_path)
+        struct = mmdf.read_mmcif(cif_path, unit_cell=True)
 
     if not error:
         assert repr(struct) == f'<Structure {struct.id}>'
@@ -136,6 +140,12 @@ def test_read_mmcif(
                     check_column_order=False,
             )
 
+        if unit_cell is not None:
+            pl.testing.assert_frame_equal(
+                    struct.unit_cell, unit_cell,
+                    check_exact=False,
+            )
+
 @pff.parametrize(
         schema=[
             pff.cast(expected=atoms_csv),
@@ -218,3 +228,223 @@ def test_parse_oper_expression(oper_expr, expected, error):
         assert _mmdf._parse_oper_expression(oper_expr) == expected
 
 
+def test_scan_mmcif():
+    test_dir = Path(__file__).parent 
+    cif_paths = [
+            test_dir / 'pdb' / '1fav.cif.gz',
+            test_dir / 'pdb' / '4ous.cif.gz',
+    ]
+
+    atoms = mmdf.scan_mmcif(cif_paths[0]).collect()
+    expected = mmdf.read_asymmetric_unit(cif_paths[0])
+    pl.testing.assert_frame_equal(atoms, expected, check_column_order=False)
+
+    atoms = mmdf.scan_mmcif(cif_paths).collect()
+    expected = pl.concat([
+        mmdf.read_asymmetric_unit(p).with_columns(structure_id=pl.lit(id))
+        for p, id in zip(cif_paths, ['1FAV', '4OUS'])
+    ])
+    pl.testing.assert_frame_equal(atoms, expected, check_column_order=False)
+
+def test_scan_mmcif_pushdown():
+    test_dir = Path(__file__).parent 
+    cif_paths = [
+            test_dir / 'pdb' / '1fav.cif.gz',
+            test_dir / 'pdb' / '4ous.cif.gz',
+    ]
+
+    atoms = (
+            mmdf.scan_mmcif(cif_paths)
+            .filter(
+                pl.col('model_id') == '1',
+                pl.col('comp_id') != 'HOH',
+            )
+            .select('structure_id', 'atom_id', 'x')
+    )
+    atoms = atoms.collect()
+
+    expected = (
+            pl.concat([
+                mmdf.read_asymmetric_unit(p).with_columns(structure_id=pl.lit(id))
+                for p, id in zip(cif_paths, ['1FAV', '4OUS'])
+            ])
+            .filter(
+                pl.col('model_id') == '1',
+                pl.col('comp_id') != 'HOH',
+            )
+            .select('structure_id', 'atom_id', 'x')
+    )
+    pl.testing.assert_frame_equal(atoms, expected)
+
+    head = mmdf.scan_mmcif(cif_paths).head(5).collect()
+    assert head.height == 5
+
+def test_scan_mmcif_len():
+    test_dir = Path(__file__).parent
+    cif_paths = [
+            test_dir / 'pdb' / '1fav.cif.gz',
+            test_dir / 'pdb' / '4ous.cif.gz',
+    ]
+    expected = mmdf.scan_mmcif(cif_paths).collect()
+
+    # Queries that don't need any of the parsed columns still need to know
+    # how many atoms there are.
+    n = mmdf.scan_mmcif(cif_paths).select(pl.len()).collect().item()
+    assert n == expected.height
+
+    n = mmdf.scan_mmcif(cif_paths[0]).select(pl.len()).collect().item()
+    assert n == expected.filter(structure_id='1FAV').height
+
+    ids = mmdf.scan_mmcif(cif_paths).select('structure_id').collect()
+    pl.testing.assert_frame_equal(ids, expected.select('structure_id'))
+
+def test_read_biological_assembly_float32():
+    test_dir = Path(__file__).parent 
+    cif_path = test_dir / 'pdb' / '4ous.cif.gz'
+
+    atoms_f64 = mmdf.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1',
+    )
+    atoms_f32 = mmdf.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1', coord_dtype=pl.Float32,
+    )
+
+    assert atoms_f32.schema['x'] == pl.Float32
+    assert atoms_f32.schema['y'] == pl.Float32
+    assert atoms_f32.schema['z'] == pl.Float32
+    assert mmdf.get_atom_coords(atoms_f32).dtype == np.float32
+
+    pl.testing.assert_frame_equal(
+            atoms_f32, atoms_f64,
+            check_dtypes=False,
+            check_exact=False,
+            atol=1e-3,
+    )
+
+def test_assembly_template():
+    test_dir = Path(__file__).parent 
+    cif_path = test_dir / 'pdb' / '4ous.cif.gz'
+
+    struct = mmdf.read_mmcif(cif_path)
+    asym_atoms = mmdf.select_model(struct.asym_atoms, '1')
+
+    template = mmdf.AssemblyTemplate(
+            asym_atoms,
+            struct.assembly_gen,
+            struct.oper_map,
+            '1',
+    )
+    assert template.num_symmetry_mates == 3
+
+    expected = mmdf.make_biological_assembly(
+            asym_atoms,
+            struct.assembly_gen,
+            struct.oper_map,
+            '1',
+    )
+    pl.testing.assert_frame_equal(template.atoms, expected)
+    pl.testing.assert_frame_equal(template.replace_coords(), expected)
+
+    # New asymmetric unit coordinates:
+    asym_atoms_2 = asym_atoms.with_columns(pl.col('x') + 1)
+    expected_2 = mmdf.make_biological_assembly(
+            asym_atoms_2,
+            struct.assembly_gen,
+            struct.oper_map,
+            '1',
+    )
+    pl.testing.assert_frame_equal(
+            template.replace_coords(asym_atoms_2),
+            expected_2,
+    )
+    pl.testing.assert_frame_equal(
+            template.replace_coords(mmdf.get_atom_coords(asym_atoms_2)),
+            expected_2,
+    )
+
+    # New operators:
+    oper_map_3 = {k: np.eye(4) for k in struct.oper_map}
+    np.testing.assert_array_equal(
+            template.make_frames(oper_map=oper_map_3),
+            np.tile(np.eye(4), (3, 1, 1)),
+    )
+
+    atoms_3 = template.replace_coords(oper_map=oper_map_3)
+    np.testing.assert_allclose(
+            mmdf.get_atom_coords(atoms_3),
+            np.tile(mmdf.get_atom_coords(asym_atoms), (3, 1)),
+    )
+
+    # Additional transformation:
+    frame_xy = mmdf.make_coord_frame(np.array([1, 2, 3]))
+    pl.testing.assert_frame_equal(
+            template.replace_coords(frame_xy=frame_xy),
+            mmdf.transform_atom_coords(expected, frame_xy),
+    )
+
+
+def test_read_mmcif_optional_categories():
+    # The bond and unit cell categories are only parsed on request.
+    cif_path = Path(__file__).parent / 'pdb' / '1fav.cif.gz'
+
+    struct = mmdf.read_mmcif(cif_path)
+    assert struct.struct_conn is None
+    assert struct.chem_comp_bonds is None
+    assert struct.unit_cell is None
+
+    struct = mmdf.read_mmcif(cif_path, bonds=True, unit_cell=True)
+    assert struct.struct_conn.height > 0
+    assert struct.chem_comp_bonds.height > 0
+    assert struct.unit_cell.height == 1
+
+@pytest.mark.parametrize('pdb_id', ['1fav', '2gtl', '4ous', '4rek'])
+def test_read_mmcif_quantized(pdb_id):
+    test_dir = Path(__file__).parent 
+    cif_path = test_dir / 'pdb' / f'{pdb_id}.cif.gz'
+
+    atoms_f64 = mmdf.read_asymmetric_unit(cif_path)
+    atoms_f32 = mmdf.read_asymmetric_unit(cif_path, coord_dtype=pl.Float32)
+    atoms_i32 = mmdf.read_asymmetric_unit(cif_path, coord_dtype=pl.Int32)
+
+    assert atoms_i32.schema['x'] == pl.Int32
+    assert atoms_i32.schema['y'] == pl.Int32
+    assert atoms_i32.schema['z'] == pl.Int32
+    assert atoms_i32.estimated_size() < atoms_f64.estimated_size()
+
+    # The round trip should be exact, in both single and double precision.
+    pl.testing.assert_frame_equal(
+            mmdf.dequantize_atom_coords(atoms_i32),
+            atoms_f64,
+            check_exact=True,
+    )
+    pl.testing.assert_frame_equal(
+            mmdf.dequantize_atom_coords(atoms_i32, dtype=pl.Float32),
+            atoms_f32,
+            check_exact=True,
+    )
+    np.testing.assert_array_equal(
+            mmdf.get_atom_coords(atoms_i32),
+            mmdf.get_atom_coords(atoms_f32),
+    )
+
+    atoms_scan = mmdf.scan_mmcif(cif_path, coord_dtype=pl.Int32).collect()
+    pl.testing.assert_frame_equal(atoms_scan, atoms_i32)
+
+def test_read_biological_assembly_quantized():
+    test_dir = Path(__file__).parent 
+    cif_path = test_dir / 'pdb' / '4ous.cif.gz'
+
+    atoms_f64 = mmdf.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1',
+    )
+    atoms_i32 = mmdf.read_biological_assembly(
+            cif_path, model_id='1', assembly_id='1', coord_dtype=pl.Int32,
+    )
+
+    assert atoms_i32.schema['x'] == pl.Int32
+    pl.testing.assert_frame_equal(
+            mmdf.dequantize_atom_coords(atoms_i32),
+            atoms_f64,
+            check_exact=False,
+            atol=1e-3,
+    )
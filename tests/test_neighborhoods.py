@@ -0,0 +1,61 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import polars.testing
+import numpy as np
+
+from pathlib import Path
+
+def test_neighborhood_sampler_4ous():
+    test_dir = Path(__file__).parent 
+    cif_path = test_dir / 'pdb' / '4ous.cif.gz'
+
+    atoms = mmdf.read_biological_assembly(cif_path, model_id='1', assembly_id='1')
+    atoms = mmdf.prune_water(atoms)
+
+    sampler = mmdf.NeighborhoodSampler(atoms, radius_A=8)
+    rng = np.random.default_rng(0)
+
+    frames_xy = sampler.sample_frames(5, rng)
+    assert frames_xy.shape == (5, 4, 4)
+
+    neighborhoods = sampler.make_neighborhoods(frames_xy)
+    assert set(neighborhoods.columns) == {*atoms.columns, 'neighborhood_id'}
+
+    for i, frame_xy in enumerate(frames_xy):
+        # Compare against the naive approach: transform every atom, then 
+        # filter out the ones that are too far from the origin.
+        expected = (
+                mmdf.transform_atom_coords(atoms, frame_xy)
+                .filter(
+                    pl.col('x')**2 + pl.col('y')**2 + pl.col('z')**2 <= 8**2
+                )
+        )
+        actual = (
+                neighborhoods
+                .filter(neighborhood_id=i)
+                .drop('neighborhood_id')
+        )
+
+        assert not actual.is_empty()
+        pl.testing.assert_frame_equal(actual, expected, check_exact=False)
+
+def test_neighborhood_sampler_indices():
+    atoms = pl.DataFrame({
+        'x': [0.0, 1.0, 2.0, 3.0],
+        'y': [0.0, 0.0, 0.0, 0.0],
+        'z': [0.0, 0.0, 0.0, 0.0],
+    })
+    sampler = mmdf.NeighborhoodSampler(atoms, radius_A=1.5)
+
+    indices, offsets = sampler.find_indices(np.array([
+        [0, 0, 0],
+        [10, 0, 0],
+        [2, 0, 0],
+    ]))
+    np.testing.assert_array_equal(indices, [0, 1, 1, 2, 3])
+    np.testing.assert_array_equal(offsets, [0, 2, 2, 5])
+
+    neighborhoods = sampler.make_neighborhoods(mmdf.make_coord_frame(
+        np.array([[10, 0, 0]]),
+    ))
+    assert neighborhoods.is_empty()
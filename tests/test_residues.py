@@ -1,6 +1,8 @@
 import macromol_dataframe as mmdf
 import parametrize_from_file as pff
 import polars as pl
+import numpy as np
+import pytest
 
 from macromol_dataframe.testing import dataframe
 from polars.testing import assert_frame_equal
@@ -15,6 +17,7 @@ from pathlib import Path
                     'symm': int,
                 },
                 col_aliases={
+                    'struct': 'structure_id',
                     'model': 'model_id',
                     'symm': 'symmetry_mate',
                     'chain': 'subchain_id',
@@ -49,6 +52,26 @@ def test_assign_residue_ids(atoms):
 
     assert actual == expected
 
+def test_assign_residue_ids_order():
+    # The rows should be grouped by residue, in order of first appearance, 
+    # even if the atoms from different residues are interleaved.
+    atoms = pl.DataFrame({
+        'subchain_id': ['B', 'A', 'B', 'A', 'A'],
+        'seq_id':      [  1,   2,   1,   1,   2],
+        'atom_id':     ['N', 'N', 'CA', 'N', 'CA'],
+    })
+    expected = pl.DataFrame({
+        'residue_id':  [  0,   0,   1,   1,   2],
+        'subchain_id': ['B', 'B', 'A', 'A', 'A'],
+        'seq_id':      [  1,   1,   2,   2,   1],
+        'atom_id':     ['N', 'CA', 'N', 'CA', 'N'],
+    })
+
+    for kwargs in [{}, {'maintain_order': False}, {'maintain_order': True}]:
+        actual = mmdf.assign_residue_ids(atoms, **kwargs)
+        assert_frame_equal(actual, expected, check_dtypes=False)
+        assert actual.get_column('residue_id').flags['SORTED_ASC']
+
 def test_assign_residue_ids_4ous():
     # I included this test case because it broke an old version of my code by 
     # virtue of having three symmetry mates, each with a calcium atom.  My old 
@@ -74,6 +97,34 @@ def test_assign_residue_ids_4ous():
 
     assert n == 396
 
+def test_assign_residue_ids_canonical():
+    test_dir = Path(__file__).parent 
+    cif_path = test_dir / 'pdb' / '4rek.cif.gz'
+
+    atoms = mmdf.read_asymmetric_unit(cif_path)
+    atoms = mmdf.canonicalize_atoms(atoms)
+
+    actual = mmdf.assign_residue_ids(atoms)
+    assert actual.get_column('residue_id').flags['SORTED_ASC']
+
+    # Shuffle the rows, so that the atoms are no longer in canonical order.  
+    # The residue ids are assigned in order of first appearance, so sort 
+    # the rows back into their original order before comparing.
+    expected = (
+            atoms
+            .with_row_index('i')
+            .sample(fraction=1, shuffle=True, seed=0)
+            .pipe(mmdf.assign_residue_ids)
+            .sort('i')
+    )
+    residue_map = (
+            expected
+            .select('residue_id', actual_id=actual.get_column('residue_id'))
+            .unique()
+    )
+    assert residue_map.height == actual.get_column('residue_id').n_unique()
+    assert residue_map.height == expected.get_column('residue_id').n_unique()
+
 explode_atoms = dataframe(
         exprs={
             'alt_id': pl.col('alt_id').replace({'.': None}),
@@ -85,6 +136,7 @@ explode_atoms = dataframe(
             'z': float,
         },
         col_aliases={
+            'struct': 'structure_id',
             'res_id': 'residue_id',
             'atom': 'atom_id',
         },
@@ -102,6 +154,14 @@ def test_explode_residue_conformations(atoms, expected):
         check_row_order=False,
     )
 
+    # Make sure the results are the same whether or not the residues are 
+    # contiguous:
+    assert_frame_equal(
+        mmdf.explode_residue_conformations(atoms.reverse()),
+        expected,
+        check_row_order=False,
+    )
+
 def test_explode_residue_conformations_4rek():
     # `4rek` is a very high resolution structure, so it has a lot of alternate 
     # conformations, which makes it a good test case:
@@ -211,3 +271,223 @@ chain_id  seq_id  alt_id  comp_id  atom_id  element       x       y       z  occ
        A      50       A  MET      CE       C         5.857  -2.274  12.370       0.19 
        A      50       B  MET      CE       C         5.837  -2.281  12.114       0.81 
 ''')
+
+def test_make_residue_table():
+    atoms = dataframe('''\
+        chain  resi  resn  atom      x    y    z    b    q  residue_id
+        A         1  GLY   N       0.0  0.0  0.0  1.0  1.0           0
+        A         1  GLY   CA      1.0  0.0  0.0  2.0  1.0           0
+        A         1  GLY   C       2.0  0.0  0.0  3.0  1.0           0
+        A         2  MSE   N       0.0  1.0  0.0  4.0  0.5           1
+        A         2  MSE   CA      0.0  2.0  0.0  5.0  0.5           1
+        A         3  HOH   O       0.0  0.0  3.0  6.0  1.0           2''',
+        dtypes={
+            'resi': int,
+            'x': float,
+            'y': float,
+            'z': float,
+            'b': float,
+            'q': float,
+            'residue_id': pl.UInt32,
+        },
+        col_aliases={
+            'chain': 'subchain_id',
+            'resi': 'seq_id',
+            'resn': 'comp_id',
+            'atom': 'atom_id',
+            'b': 'b_factor',
+            'q': 'occupancy',
+        },
+    )
+    residues, offsets = mmdf.make_residue_table(atoms, offsets=True)
+
+    expected = dataframe('''\
+        residue_id  chain  resi  resn  code  n  ca_x  ca_y  ca_z  cen_x  cen_y  cen_z    b    q
+                 0  A         1  GLY   G     3   1.0   0.0   0.0    1.0    0.0    0.0  2.0  1.0
+                 1  A         2  MSE   M     2   0.0   2.0   0.0    0.0    1.5    0.0  4.5  0.5
+                 2  A         3  HOH   X     1  null  null  null    0.0    0.0    3.0  6.0  1.0''',
+        exprs={
+            'ca_x': pl.col('ca_x').replace({'null': None}),
+            'ca_y': pl.col('ca_y').replace({'null': None}),
+            'ca_z': pl.col('ca_z').replace({'null': None}),
+        },
+        dtypes={
+            'residue_id': pl.UInt32,
+            'resi': int,
+            'n': pl.UInt32,
+            'ca_x': float,
+            'ca_y': float,
+            'ca_z': float,
+            'cen_x': float,
+            'cen_y': float,
+            'cen_z': float,
+            'b': float,
+            'q': float,
+        },
+        col_aliases={
+            'chain': 'subchain_id',
+            'resi': 'seq_id',
+            'resn': 'comp_id',
+            'code': 'one_letter_code',
+            'n': 'num_atoms',
+            'cen_x': 'centroid_x',
+            'cen_y': 'centroid_y',
+            'cen_z': 'centroid_z',
+            'b': 'b_factor',
+            'q': 'occupancy',
+        },
+    )
+
+    assert_frame_equal(residues, expected)
+    assert offsets.tolist() == [0, 3, 5, 6]
+
+    for i, residue in enumerate(residues.iter_rows(named=True)):
+        residue_atoms = atoms[offsets[i]:offsets[i+1]]
+        assert residue_atoms['residue_id'].unique().to_list() == [i]
+        assert residue_atoms.height == residue['num_atoms']
+
+def test_make_residue_table_unsorted():
+    atoms = pl.DataFrame({
+        'residue_id': [1, 0],
+        'comp_id': ['ALA', 'GLY'],
+        'atom_id': ['CA', 'CA'],
+        'x': [0.0, 0.0],
+        'y': [0.0, 0.0],
+        'z': [0.0, 0.0],
+    })
+    with pytest.raises(ValueError):
+        mmdf.make_residue_table(atoms)
+
+def test_make_residue_table_4ous():
+    test_dir = Path(__file__).parent 
+    cif_path = test_dir / 'pdb' / '4ous.cif.gz'
+
+    atoms = mmdf.read_biological_assembly(cif_path, model_id='1', assembly_id='1')
+    atoms = mmdf.assign_residue_ids(atoms)
+    residues, offsets = mmdf.make_residue_table(atoms, offsets=True)
+
+    # See `test_assign_residue_ids_4ous()`.
+    assert residues.height == 396
+    assert offsets[-1] == atoms.height
+
+    # Each symmetry mate should have the same sequence.
+    seqs = (
+            residues
+            .group_by('symmetry_mate')
+            .agg(pl.col('one_letter_code').str.join())
+            .get_column('one_letter_code')
+    )
+    assert seqs.n_unique() == 1
+
+select_atoms = dataframe(
+        exprs={
+            'alt_id': pl.col('alt_id').replace({'.': None}),
+        },
+        dtypes={
+            'res_id': int,
+            'q': float,
+        },
+        col_aliases={
+            'struct': 'structure_id',
+            'res_id': 'residue_id',
+            'atom': 'atom_id',
+            'q': 'occupancy',
+        },
+)
+@pff.parametrize(
+        schema=[
+            pff.cast(
+                atoms=select_atoms,
+                expected=select_atoms,
+            ),
+            pff.defaults(
+                strategy='occupancy',
+                group='residue',
+            ),
+        ],
+)
+def test_select_residue_conformations(atoms, strategy, group, expected):
+    assert_frame_equal(
+        mmdf.select_residue_conformations(
+            atoms,
+            strategy=strategy,
+            group=group,
+        ),
+        expected,
+        check_row_order=False,
+    )
+
+@pytest.mark.parametrize('group', ['residue', 'connected'])
+def test_select_residue_conformations_random(group):
+    test_dir = Path(__file__).parent
+    cif_path = test_dir / 'pdb' / '4rek.cif.gz'
+
+    atoms = mmdf.read_asymmetric_unit(cif_path)
+    atoms = mmdf.assign_residue_ids(atoms).with_row_index('i')
+
+    def select(seed):
+        return mmdf.select_residue_conformations(
+                atoms,
+                strategy='random',
+                group=group,
+                rng=np.random.default_rng(seed),
+        )
+
+    selected = select(0)
+
+    # Every atom without an alternate location is kept, in the same order, 
+    # and each residue gets exactly one of its conformations.
+    assert_frame_equal(
+            selected.filter(pl.col('alt_id').is_null()),
+            atoms.filter(pl.col('alt_id').is_null()),
+    )
+    assert (
+            selected
+            .group_by('residue_id')
+            .agg(pl.col('alt_id').drop_nulls().n_unique())
+            .get_column('alt_id')
+            .max()
+    ) == 1
+    assert selected['i'].is_sorted()
+    assert_frame_equal(selected, atoms[selected['i']])
+
+    # The same seed gives the same conformations, and different seeds 
+    # (eventually) give different ones.
+    assert_frame_equal(select(0), selected)
+    assert any(select(i).height != selected.height for i in range(1, 10))
+
+def test_select_residue_conformations_connected_4rek():
+    test_dir = Path(__file__).parent
+    cif_path = test_dir / 'pdb' / '4rek.cif.gz'
+
+    atoms = mmdf.read_asymmetric_unit(cif_path)
+    atoms = mmdf.assign_residue_ids(atoms)
+
+    selected = mmdf.select_residue_conformations(atoms, group='connected')
+    alt_ids = (
+            selected
+            .filter(pl.col('alt_id').is_not_null())
+            .unique(['residue_id', 'alt_id'])
+            .sort('residue_id')
+    )
+
+    # Any two consecutive residues that both have the alternate location 
+    # picked for the first should have both been given that location.
+    all_alt_ids = atoms.select('residue_id', 'alt_id').drop_nulls().unique()
+    for residue_id, alt_id in alt_ids.select('residue_id', 'alt_id').iter_rows():
+        next_alt_ids = all_alt_ids.filter(residue_id=residue_id + 1)
+        if alt_id in next_alt_ids['alt_id']:
+            assert alt_ids.filter(residue_id=residue_id + 1)['alt_id'].item() == alt_id
+
+def test_select_residue_conformations_err():
+    atoms = pl.DataFrame({
+        'residue_id': [1],
+        'alt_id': ['A'],
+        'occupancy': [1.0],
+    })
+
+    with pytest.raises(ValueError, match="unknown conformation strategy: 'best'"):
+        mmdf.select_residue_conformations(atoms, strategy='best')
+
+    with pytest.raises(ValueError, match="unknown residue group: 'chain'"):
+        mmdf.select_residue_conformations(atoms, group='chain')
@@ -0,0 +1,145 @@
+import macromol_dataframe as mmdf
+import macromol_dataframe.sasa
+import polars as pl
+import numpy as np
+
+from macromol_dataframe.testing import atoms_fwf
+from pytest import approx
+from pathlib import Path
+
+PDB_DIR = Path(__file__).parent / 'pdb'
+
+def test_calc_atom_sasa_isolated():
+    atoms = atoms_fwf('''\
+            e   x  y  z
+            C   0  0  0
+            N  20  0  0
+            ZN  0 20  0''')
+    sasa = mmdf.calc_atom_sasa(atoms)
+
+    assert sasa.columns == [*atoms.columns, 'sasa_A2']
+    assert sasa['sasa_A2'].to_list() == approx([
+        4 * np.pi * (1.70 + 1.4)**2,
+        4 * np.pi * (1.55 + 1.4)**2,
+        4 * np.pi * (1.80 + 1.4)**2,
+    ])
+
+    sasa = mmdf.calc_atom_sasa(
+            atoms,
+            probe_radius_A=0,
+            radii_A={'C': 1, 'N': 2},
+            default_radius_A=3,
+    )
+    assert sasa['sasa_A2'].to_list() == approx([
+        4 * np.pi * 1**2,
+        4 * np.pi * 2**2,
+        4 * np.pi * 3**2,
+    ])
+
+def test_calc_atom_sasa_overlap():
+    atoms = atoms_fwf('''\
+            e  x  y  z
+            C  0  0  0
+            C  3  0  0''')
+    sasa = mmdf.calc_atom_sasa(atoms, num_points=2000)
+
+    # Each sphere loses a cap to the other.
+    r = 1.70 + 1.4
+    h = r - 3 / 2
+    expected = 4 * np.pi * r**2 - 2 * np.pi * r * h
+
+    assert sasa['sasa_A2'].to_list() == approx([expected, expected], rel=0.01)
+
+def test_calc_atom_sasa_buried():
+    atoms = atoms_fwf('''\
+            e     x     y     z
+            C     0     0     0
+            C   1.5     0     0
+            C  -1.5     0     0
+            C     0   1.5     0
+            C     0  -1.5     0
+            C     0     0   1.5
+            C     0     0  -1.5''')
+    sasa = mmdf.calc_atom_sasa(atoms)
+
+    assert sasa['sasa_A2'][0] == 0
+    assert (sasa['sasa_A2'][1:] > 0).all()
+
+def test_calc_atom_sasa_empty():
+    atoms = atoms_fwf('''\
+            e  x  y  z
+            C  0  0  0''')
+    sasa = mmdf.calc_atom_sasa(atoms.clear())
+
+    assert sasa.height == 0
+    assert 'sasa_A2' in sasa.columns
+
+def test_calc_atom_sasa_chunks(monkeypatch):
+    atoms = mmdf.read_asymmetric_unit(PDB_DIR / '1fav.cif.gz')
+    expected = mmdf.calc_atom_sasa(atoms)
+
+    # Make sure the atoms are split between many chunks, including some 
+    # chunks with only one atom.
+    monkeypatch.setattr(mmdf.sasa, '_MAX_CHUNK_SIZE', 1000)
+    actual = mmdf.calc_atom_sasa(atoms)
+
+    np.testing.assert_allclose(actual['sasa_A2'], expected['sasa_A2'])
+
+def test_calc_residue_sasa():
+    atoms = mmdf.read_asymmetric_unit(PDB_DIR / '4ous.cif.gz')
+    atoms = mmdf.prune_water(atoms)
+
+    residues = mmdf.calc_residue_sasa(atoms)
+    atom_sasa = mmdf.calc_atom_sasa(atoms)
+
+    assert residues.columns == [
+            'residue_id',
+            'model_id',
+            'chain_id',
+            'subchain_id',
+            'seq_id',
+            'comp_id',
+            'sasa_A2',
+    ]
+    assert residues['residue_id'].to_list() == list(range(residues.height))
+    assert residues['sasa_A2'].sum() == approx(
+            atom_sasa.filter(pl.col('seq_id').is_not_null())['sasa_A2'].sum()
+    )
+
+    # The residues should be in a plausible range: glycine can't be as 
+    # exposed as tryptophan, and no residue can be more exposed than it would 
+    # be on its own.
+    assert residues['sasa_A2'].min() >= 0
+    assert residues.filter(comp_id='GLY')['sasa_A2'].max() < 150
+    assert residues.filter(comp_id='TRP')['sasa_A2'].max() < 300
+
+def test_calc_residue_sasa_assembly():
+    # Burying a chain in an assembly can only reduce its surface area.
+    cif_path = PDB_DIR / '1fav.cif.gz'
+    atoms = mmdf.prune_water(mmdf.read_asymmetric_unit(cif_path))
+    assembly = mmdf.prune_water(
+            mmdf.read_biological_assembly(
+                cif_path,
+                model_id='1',
+                assembly_id='1',
+            )
+    )
+
+    def chain_sasa(atoms):
+        return (
+                mmdf.calc_residue_sasa(atoms)
+                .group_by('symmetry_mate', 'subchain_id')
+                .agg(pl.col('sasa_A2').sum())
+        )
+
+    isolated = chain_sasa(atoms.with_columns(symmetry_mate=0))
+    combined = chain_sasa(assembly)
+
+    assert combined.height == 3 * isolated.height
+
+    compare = combined.join(
+            isolated,
+            on='subchain_id',
+            suffix='_isolated',
+    )
+    assert (compare['sasa_A2'] < compare['sasa_A2_isolated']).all()
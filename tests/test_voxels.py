@@ -0,0 +1,181 @@
+import macromol_dataframe as mmdf
+import polars as pl
+import numpy as np
+import pytest
+
+from macromol_dataframe.testing import atoms_fwf
+from pytest import approx
+
+def test_voxelize_atoms_sphere():
+    atoms = atoms_fwf('''\
+            C  0  0  0
+            N  1  0  0
+            O  0  0 -1
+            X  9  9  9''')
+    grid = mmdf.voxelize_atoms(
+            atoms,
+            length_voxels=3,
+            resolution_A=1,
+            channels=['C', 'N', ['O', 'S'], '*'],
+            radius_A=0.5,
+    )
+    assert grid.shape == (4, 3, 3, 3)
+    assert grid.dtype == np.float32
+
+    expected = np.zeros((4, 3, 3, 3))
+    expected[0, 1, 1, 1] = 1
+    expected[1, 2, 1, 1] = 1
+    expected[2, 1, 1, 0] = 1
+    expected[3, 1, 1, 1] = 1
+    expected[3, 2, 1, 1] = 1
+    expected[3, 1, 1, 0] = 1
+
+    np.testing.assert_array_equal(grid, expected)
+
+def test_voxelize_atoms_sphere_occupancy():
+    # Overlapping atoms shouldn't give occupancies greater than 1.
+    atoms = atoms_fwf('''\
+            C  0.0  0  0
+            C  0.1  0  0''')
+    grid = mmdf.voxelize_atoms(
+            atoms,
+            length_voxels=3,
+            resolution_A=1,
+            radius_A=1,
+    )
+    assert grid.shape == (1, 3, 3, 3)
+    assert grid.max() == 1
+    assert grid.sum() == 7
+
+def test_voxelize_atoms_sphere_small_radius():
+    # With an even number of voxels, an atom at the origin is at the corner 
+    # of 8 voxels, so no voxel center is within the default radius.  The atom 
+    # should still fill the voxel that contains it.
+    atoms = atoms_fwf('''\
+            C  0.0  0.0  0.0
+            C  1.2 -0.7  0.1''')
+    grid = mmdf.voxelize_atoms(
+            atoms,
+            length_voxels=4,
+            resolution_A=1,
+    )
+    assert grid.shape == (1, 4, 4, 4)
+
+    expected = np.zeros((1, 4, 4, 4))
+    expected[0, 2, 2, 2] = 1
+    expected[0, 3, 1, 2] = 1
+
+    np.testing.assert_array_equal(grid, expected)
+
+def test_voxelize_atoms_gaussian():
+    atoms = atoms_fwf('''\
+            C  0.5  0  0''')
+    grid = mmdf.voxelize_atoms(
+            atoms,
+            length_voxels=4,
+            resolution_A=1,
+            kernel='gaussian',
+            radius_A=1,
+    )
+
+    # With an even number of voxels, the origin is at a corner between 
+    # voxels, so the atom is centered on the boundary between the voxels with 
+    # x-indices 2 and 3.
+    y = z = np.exp(-0.5**2 / 2)
+    assert grid[0, 2, 1, 1] == approx(np.exp(-0**2 / 2) * y * z)
+    assert grid[0, 3, 1, 1] == approx(np.exp(-1**2 / 2) * y * z)
+    assert grid[0, 1, 1, 1] == approx(np.exp(-1**2 / 2) * y * z)
+    assert grid[0, 0, 1, 1] == approx(np.exp(-2**2 / 2) * y * z)
+
+def test_voxelize_atoms_batch():
+    atoms = atoms_fwf('''\
+            C  0  0  0
+            C  1  0  0
+            C  0  1  0''').with_columns(
+            neighborhood_id=pl.Series([0, 2, 2]),
+    )
+    grids = mmdf.voxelize_atoms(
+            atoms,
+            length_voxels=3,
+            resolution_A=1,
+            batch_key='neighborhood_id',
+    )
+    assert grids.shape == (3, 1, 3, 3, 3)
+
+    assert grids[0].sum() == 1
+    assert grids[0, 0, 1, 1, 1] == 1
+
+    assert grids[1].sum() == 0
+
+    assert grids[2].sum() == 2
+    assert grids[2, 0, 2, 1, 1] == 1
+    assert grids[2, 0, 1, 2, 1] == 1
+
+def test_voxelize_atoms_center():
+    atoms = atoms_fwf('''\
+            C  10  20  30
+            N  11  20  30
+            O  90  90  90''')
+    grid = mmdf.voxelize_atoms(
+            atoms,
+            length_voxels=3,
+            resolution_A=1,
+            center_A=[10, 20, 30],
+            channels=['C', 'N', 'O'],
+    )
+
+    expected = np.zeros((3, 3, 3, 3))
+    expected[0, 1, 1, 1] = 1
+    expected[1, 2, 1, 1] = 1
+
+    np.testing.assert_array_equal(grid, expected)
+
+def test_voxelize_atoms_center_batch():
+    atoms = atoms_fwf('''\
+            C  10  20  30
+            C  11  20  30
+            C  -5   0   0''').with_columns(
+            neighborhood_id=pl.Series([0, 1, 1]),
+    )
+    grids = mmdf.voxelize_atoms(
+            atoms,
+            length_voxels=3,
+            resolution_A=1,
+            center_A=[[10, 20, 30], [11, 20, 30]],
+            batch_key='neighborhood_id',
+    )
+
+    expected = np.zeros((2, 1, 3, 3, 3))
+    expected[0, 0, 1, 1, 1] = 1
+    expected[1, 0, 1, 1, 1] = 1
+
+    np.testing.assert_array_equal(grids, expected)
+
+def test_voxelize_atoms_err():
+    atoms = atoms_fwf('C 0 0 0')
+    batch_atoms = atoms.with_columns(neighborhood_id=2)
+
+    with pytest.raises(ValueError, match='unknown kernel'):
+        mmdf.voxelize_atoms(
+                atoms,
+                length_voxels=3,
+                resolution_A=1,
+                kernel='xxx',
+        )
+
+    with pytest.raises(ValueError, match='batch_size=2 is too small'):
+        mmdf.voxelize_atoms(
+                batch_atoms,
+                length_voxels=3,
+                resolution_A=1,
+                batch_key='neighborhood_id',
+                batch_size=2,
+        )
+
+    with pytest.raises(ValueError, match='negative'):
+        mmdf.voxelize_atoms(
+                batch_atoms.with_columns(neighborhood_id=-1),
+                length_voxels=3,
+                resolution_A=1,
+                batch_key='neighborhood_id',
+        )